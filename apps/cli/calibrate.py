@@ -26,10 +26,11 @@ for region in covid_calibration.CALIBRATIONS.keys():
     @click.argument("max_seconds", type=int)
     @click.argument("run_id", type=int)
     @click.option("--num-chains", type=int, default=1)
-    def run_region_calibration(max_seconds, run_id, num_chains, region=region):
+    @click.option("--resume", is_flag=True, help="Resume the chain from its last checkpoint.")
+    def run_region_calibration(max_seconds, run_id, num_chains, resume, region=region):
         """Run COVID model calibration for region"""
         calib_func = covid_calibration.get_calibration_func(region)
-        calib_func(max_seconds, run_id, num_chains)
+        calib_func(max_seconds, run_id, num_chains, resume=resume)
 
 
 @calibrate.command("mongolia")
@@ -0,0 +1,32 @@
+"""
+Runs AuTuMN apps
+
+You can access this script from your CLI by running:
+
+    python -m apps --help
+
+"""
+import click
+
+from apps.covid_19.mixing_optimisation.constants import OPTI_REGIONS
+from apps.covid_19.mixing_optimisation.sweep import run_sweep, SWEEP_MODES, SWEEP_CONFIGS
+
+
+@click.command("mixing-sweep")
+@click.argument("db_path", type=str)
+@click.option("--mode", "modes", type=click.Choice(SWEEP_MODES), multiple=True)
+@click.option("--country", "countries", type=click.Choice(OPTI_REGIONS), multiple=True)
+@click.option("--config", "configs", type=int, multiple=True)
+@click.option("--num-workers", type=int, default=None)
+def mixing_sweep(db_path, modes, countries, configs, num_workers):
+    """
+    Run the mixing optimisation objective for all modes, countries, configs and param sets.
+    Results are saved to DB_PATH, and tasks which already have results there are skipped.
+    """
+    run_sweep(
+        db_path,
+        modes=list(modes) or SWEEP_MODES,
+        countries=list(countries) or OPTI_REGIONS,
+        configs=list(configs) or SWEEP_CONFIGS,
+        n_workers=num_workers,
+    )
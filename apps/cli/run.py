@@ -19,30 +19,34 @@ def run():
 @run.command("covid")
 @click.argument("region", type=click.Choice(covid_19.REGION_APPS))
 @click.option("--no-scenarios", is_flag=True)
-def run_covid(region, no_scenarios):
+@click.option("--num-workers", type=int, default=None)
+def run_covid(region, no_scenarios, num_workers):
     """Run the COVID model for some region"""
     region_app = covid_19.get_region_app(region)
-    region_app.run_model(run_scenarios=not no_scenarios)
+    region_app.run_model(run_scenarios=not no_scenarios, n_workers=num_workers)
 
 
 @run.command("sir_example")
 @click.argument("region", type=click.Choice(sir_example.REGION_APPS))
 @click.option("--no-scenarios", is_flag=True)
-def run_sir_example(region, no_scenarios):
+@click.option("--num-workers", type=int, default=None)
+def run_sir_example(region, no_scenarios, num_workers):
     """Run the SIR model for some region"""
     region_app = sir_example.get_region_app(region)
-    region_app.run_model(run_scenarios=not no_scenarios)
+    region_app.run_model(run_scenarios=not no_scenarios, n_workers=num_workers)
 
 
 @run.command("rmi")
 @click.option("--no-scenarios", is_flag=True)
-def run_rmi(no_scenarios):
+@click.option("--num-workers", type=int, default=None)
+def run_rmi(no_scenarios, num_workers):
     """Run the Marshall Islands TB model"""
-    marshall_islands.run_model(run_scenarios=not no_scenarios)
+    marshall_islands.run_model(run_scenarios=not no_scenarios, n_workers=num_workers)
 
 
 @run.command("mongolia")
 @click.option("--no-scenarios", is_flag=True)
-def run_mongolia(no_scenarios):
+@click.option("--num-workers", type=int, default=None)
+def run_mongolia(no_scenarios, num_workers):
     """Run the Mongolia TB model"""
-    mongolia.run_model(run_scenarios=not no_scenarios)
+    mongolia.run_model(run_scenarios=not no_scenarios, n_workers=num_workers)
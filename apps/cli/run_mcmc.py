@@ -25,5 +25,6 @@ for region in covid_calibration.CALIBRATIONS.keys():
     @click.argument("burn_in", type=int)
     @click.argument("src_db_path", type=str)
     @click.argument("dest_db_path", type=str)
-    def run_mcmc_func(burn_in, src_db_path, dest_db_path, region=region):
-        run_full_models_for_mcmc(region, burn_in, src_db_path, dest_db_path)
+    @click.option("--num-workers", type=int, default=None)
+    def run_mcmc_func(burn_in, src_db_path, dest_db_path, num_workers, region=region):
+        run_full_models_for_mcmc(region, burn_in, src_db_path, dest_db_path, n_workers=num_workers)
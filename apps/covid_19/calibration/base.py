@@ -18,14 +18,18 @@ N_CHAINS = 1
 logger = logging.getLogger(__name__)
 
 
-def run_full_models_for_mcmc(region: str, burn_in: int, src_db_path: str, dest_db_path: str):
+def run_full_models_for_mcmc(
+    region: str, burn_in: int, src_db_path: str, dest_db_path: str, n_workers=None
+):
     """
     Run the full baseline model and all scenarios for all accepted MCMC runs in src db.
     """
     region_model = RegionApp(region)
     build_model = region_model.build_model
     params = region_model.params
-    _run_full_models_for_mcmc(burn_in, src_db_path, dest_db_path, build_model, params)
+    _run_full_models_for_mcmc(
+        burn_in, src_db_path, dest_db_path, build_model, params, n_workers=n_workers
+    )
 
 
 def run_calibration_chain(
@@ -38,6 +42,7 @@ def run_calibration_chain(
     mode="autumn_mcmc",
     _grid_info=None,
     _multipliers={},
+    resume=False,
 ):
     """
     Run a calibration chain for the covid model
@@ -45,6 +50,7 @@ def run_calibration_chain(
     num_iters: Maximum number of iterations to run.
     available_time: Maximum time, in seconds, to run the calibration.
     mode is either 'lsm' or 'autumn_mcmc'
+    resume: Whether to resume the chain from its last checkpoint.
     """
     logger.info(f"Preparing to run covid model calibration for region {region}")
 
@@ -61,6 +67,7 @@ def run_calibration_chain(
         run_id,
         num_chains,
         param_set_name=region,
+        resume=resume,
     )
     logger.info("Starting calibration.")
     calib.run_fitting_algorithm(
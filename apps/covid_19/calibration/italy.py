@@ -28,9 +28,16 @@ MULTIPLIERS = {}
 
 PAR_PRIORS = add_dispersion_param_prior_for_gaussian(PAR_PRIORS, TARGET_OUTPUTS, MULTIPLIERS)
 
-def run_calibration_chain(max_seconds: int, run_id: int, num_chains: int):
+def run_calibration_chain(max_seconds: int, run_id: int, num_chains: int, resume=False):
     base.run_calibration_chain(
-        max_seconds, run_id, num_chains, country, PAR_PRIORS, TARGET_OUTPUTS, mode="autumn_mcmc",
+        max_seconds,
+        run_id,
+        num_chains,
+        country,
+        PAR_PRIORS,
+        TARGET_OUTPUTS,
+        mode="autumn_mcmc",
+        resume=resume,
     )
 
 
@@ -2,7 +2,7 @@ from autumn.constants import Region
 from apps.covid_19.calibration import base
 
 
-def run_calibration_chain(max_seconds: int, run_id: int, num_chains: int):
+def run_calibration_chain(max_seconds: int, run_id: int, num_chains: int, resume=False):
     base.run_calibration_chain(
         max_seconds,
         run_id,
@@ -11,6 +11,7 @@ def run_calibration_chain(max_seconds: int, run_id: int, num_chains: int):
         PAR_PRIORS,
         TARGET_OUTPUTS,
         mode="autumn_mcmc",
+        resume=resume,
     )
 
 
@@ -2,9 +2,16 @@ from autumn.constants import Region
 from apps.covid_19.calibration import base
 
 
-def run_calibration_chain(max_seconds: int, run_id: int, num_chains: int):
+def run_calibration_chain(max_seconds: int, run_id: int, num_chains: int, resume=False):
     base.run_calibration_chain(
-        max_seconds, run_id, num_chains, Region.NSW, PAR_PRIORS, TARGET_OUTPUTS, mode="autumn_mcmc",
+        max_seconds,
+        run_id,
+        num_chains,
+        Region.NSW,
+        PAR_PRIORS,
+        TARGET_OUTPUTS,
+        mode="autumn_mcmc",
+        resume=resume,
     )
 
 
@@ -43,9 +43,16 @@ for target in TARGET_OUTPUTS:
 MULTIPLIERS = {}
 
 
-def run_calibration_chain(max_seconds: int, run_id: int, num_chains: int):
+def run_calibration_chain(max_seconds: int, run_id: int, num_chains: int, resume=False):
     base.run_calibration_chain(
-        max_seconds, run_id, num_chains, country, PAR_PRIORS, TARGET_OUTPUTS, mode="autumn_mcmc",
+        max_seconds,
+        run_id,
+        num_chains,
+        country,
+        PAR_PRIORS,
+        TARGET_OUTPUTS,
+        mode="autumn_mcmc",
+        resume=resume,
     )
 
 
@@ -4,12 +4,15 @@ import copy
 import yaml
 import pandas as pd
 
+from autumn.constants import IntegrationType
 from autumn.model_runner import build_model_runner
-from autumn.tool_kit.scenarios import Scenario
+from autumn.tool_kit import schema_builder as sb
+from autumn.tool_kit.scenarios import Scenario, get_scenario_start_index
 from autumn.tool_kit.params import update_params
 from datetime import date, timedelta
 
 from apps.covid_19 import RegionApp
+from apps.covid_19.model import build_dynamic_mixing_matrix
 from apps.covid_19.mixing_optimisation.constants import *
 
 
@@ -31,25 +34,39 @@ def run_root_model(country=Region.UNITED_KINGDOM, calibrated_params={}):
     Returns an integrated model for the past epidemic.
     """
     running_model = RegionApp(country)
-    build_model = running_model.build_model
+    params = build_optimisation_params(running_model.params, calibrated_params)
+    return run_root_model_with_params(running_model.build_model, params)
 
-    params = copy.deepcopy(running_model.params)
+
+def build_optimisation_params(app_params, calibrated_params={}):
+    """
+    Returns a copy of the app params, updated with the optimisation default config and the calibrated parameters.
+    """
+    params = copy.deepcopy(app_params)
     # update params with optimisation default config
     params["default"].update(opti_params["default"])
     # update params with calibrated parameters
     params["default"] = update_params(params['default'], calibrated_params)
+    params["scenario_start_time"] = PHASE_2_START_TIME - 1
+    return params
+
+
+def run_root_model_with_params(build_model, params, use_cache=False):
+    """
+    Runs the root model for the past epidemic, given the optimisation params.
+    If the run cache is used, the root model's outputs may be returned instead of the model, see Scenario.run.
+    """
+    root_params = copy.deepcopy(params)
 
     # prepare importation rates for herd immunity testing
-    params["default"]["data"] = {
+    root_params["default"]["data"] = {
         'times_imported_cases': [0],
         'n_imported_cases': [0]
     }
-    params["default"]["end_time"] = PHASE_2_START_TIME
-    params["scenario_start_time"] = PHASE_2_START_TIME - 1
-
+    root_params["default"]["end_time"] = PHASE_2_START_TIME
 
-    scenario_0 = Scenario(build_model, idx=0, params=params)
-    scenario_0.run()
+    scenario_0 = Scenario(build_model, idx=0, params=root_params)
+    scenario_0.run(use_cache=use_cache)
 
     return scenario_0.model
 
@@ -126,11 +143,29 @@ def objective_function(decision_variables, root_model, mode="by_age", country=Re
     :param country: the country name
     :param config: the id of the configuration being considered
     :param calibrated_params: a dictionary containing a set of calibrated parameters
+    See OptimisationContext for evaluating the objective many times for the same country, config and params.
     """
     running_model = RegionApp(country)
     build_model = running_model.build_model
-    params = copy.deepcopy(running_model.params)
+    params = build_optimisation_params(running_model.params, calibrated_params)
+
+    # Create scenario 1
+    params["scenarios"][1] = build_scenario_1_params(params, decision_variables, config, mode)
+    scenario_1 = Scenario(build_model, idx=1, params=params)
+
+    # Run scenario 1
+    scenario_1.run(base_model=root_model)
+    models = [root_model, scenario_1.model]
+    herd_immunity, total_nb_deaths, years_of_life_lost, prop_immune = get_objective_outputs(
+        models[1], config
+    )
+    return herd_immunity, total_nb_deaths, years_of_life_lost, prop_immune, models
+
 
+def build_scenario_1_params(params, decision_variables, config=0, mode="by_age"):
+    """
+    Returns the params for scenario 1, which includes Phases 2 and 3, given the optimisation params.
+    """
     # reformat decision vars if locations
     if mode == "by_location":
         new_decision_variables = {
@@ -142,42 +177,120 @@ def objective_function(decision_variables, root_model, mode="by_age", country=Re
 
     # Define scenario-1-specific params
     sc_1_params_update = build_params_for_phases_2_and_3(decision_variables, config, mode)
+    return update_params(params['default'], sc_1_params_update)
 
-    # Rebuild the default parameters
-    params["default"].update(opti_params["default"])
-    params["default"] = update_params(params['default'], calibrated_params)
-    params['scenario_start_time'] = PHASE_2_START_TIME - 1
-
-    # Create scenario 1
-    sc_1_params = update_params(params['default'], sc_1_params_update)
-    params["scenarios"][1] = sc_1_params
-    scenario_1 = Scenario(build_model, idx=1, params=params)
-
-    # Run scenario 1
-    scenario_1.run(base_model=root_model)
-    models = [root_model, scenario_1.model]
 
+def get_objective_outputs(model, config=0):
+    """
+    Returns whether herd immunity has been reached, the number of deaths, the years of life lost
+    and the proportion immune for a model run with Phases 2 and 3.
+    """
     #____________________________       Perform diagnostics         ______________________
     # How many deaths and years of life lost during Phase 2 and 3
-    start_phase2_index = models[1].derived_outputs["times"].index(PHASE_2_START_TIME)
-    end_phase2_index = models[1].derived_outputs["times"].index(phase_2_end[config])
-    total_nb_deaths = sum(models[1].derived_outputs["infection_deathsXall"][start_phase2_index:])
-    years_of_life_lost = sum(models[1].derived_outputs["years_of_life_lost"][start_phase2_index:])
+    start_phase2_index = model.derived_outputs["times"].index(PHASE_2_START_TIME)
+    end_phase2_index = model.derived_outputs["times"].index(phase_2_end[config])
+    total_nb_deaths = sum(model.derived_outputs["infection_deathsXall"][start_phase2_index:])
+    years_of_life_lost = sum(model.derived_outputs["years_of_life_lost"][start_phase2_index:])
 
     # What proportion immune at end of Phase 2
     recovered_indices = [
         i
-        for i in range(len(models[1].compartment_names))
-        if "recovered" in models[1].compartment_names[i]
+        for i in range(len(model.compartment_names))
+        if "recovered" in model.compartment_names[i]
     ]
-    nb_reco = sum([models[1].outputs[end_phase2_index, i] for i in recovered_indices])
-    total_pop = sum([models[1].outputs[end_phase2_index, i] for i in range(len(models[1].compartment_names))])
+    nb_reco = sum([model.outputs[end_phase2_index, i] for i in recovered_indices])
+    total_pop = sum([model.outputs[end_phase2_index, i] for i in range(len(model.compartment_names))])
     prop_immune = nb_reco / total_pop
 
     # Has herd immunity been reached?
-    herd_immunity = has_immunity_been_reached(models[1], end_phase2_index)
+    herd_immunity = has_immunity_been_reached(model, end_phase2_index)
 
-    return herd_immunity, total_nb_deaths, years_of_life_lost, prop_immune, models
+    return herd_immunity, total_nb_deaths, years_of_life_lost, prop_immune
+
+
+class OptimisationContext:
+    """
+    Evaluates the objective function many times for a given country, configuration, mode and calibrated param set.
+
+    The params, the root model's state at the end of Phase 1 and a model template for Phases 2 and 3
+    are all prepared once. The root model run can be shared by contexts for different modes and configs,
+    through the run cache. Each evaluation then copies the model template and only re-binds the mixing matrix,
+    which is the only part of the model that depends on the decision variables, before it is integrated.
+    """
+
+    def __init__(
+        self, country=Region.UNITED_KINGDOM, config=0, mode="by_age", calibrated_params={}, use_cache=False
+    ):
+        running_model = RegionApp(country)
+        self.build_model = running_model.build_model
+        self.config = config
+        self.mode = mode
+        self.params = build_optimisation_params(running_model.params, calibrated_params)
+        self.root_model = run_root_model_with_params(self.build_model, self.params, use_cache)
+
+        # Find the root model's state at the start of scenario 1.
+        start_index = get_scenario_start_index(
+            self.root_model.times, self.params["scenario_start_time"]
+        )
+        self.start_compartment_values = self.root_model.outputs[start_index, :]
+
+        # Build the model template with decision variables that do not change mixing.
+        reference_decision_variables = [1.] * 16 if mode == "by_age" else [1.] * 3
+        self.model_template = self.build_model(
+            self.get_scenario_params(reference_decision_variables)
+        )
+
+    def get_scenario_params(self, decision_variables):
+        """
+        Returns the params used to build the scenario 1 model, for a set of decision variables.
+        """
+        params = {**self.params, "scenarios": {}}
+        params["scenarios"][1] = build_scenario_1_params(
+            self.params, decision_variables, self.config, self.mode
+        )
+        scenario_1 = Scenario(self.build_model, idx=1, params=params)
+        scenario_params, _ = scenario_1.get_model_inputs(
+            start_compartment_values=self.start_compartment_values
+        )
+        return scenario_params
+
+    def build_scenario_model(self, decision_variables):
+        """
+        Returns a model for Phases 2 and 3, ready to run, for a set of decision variables.
+        """
+        # The model template was validated when it was built, and only the decision variables change here.
+        with sb.trusted_validation():
+            scenario_params = self.get_scenario_params(decision_variables)
+
+        model = copy.deepcopy(self.model_template)
+        model.find_dynamic_mixing_matrix = build_dynamic_mixing_matrix(scenario_params)
+        model.dynamic_mixing_matrix = model.find_dynamic_mixing_matrix is not None
+        model.parameters["mixing"] = scenario_params["mixing"]
+        model.parameters["mixing_age_adjust"] = scenario_params["mixing_age_adjust"]
+        model.compartment_values = copy.copy(self.start_compartment_values)
+        return model
+
+    def evaluate(self, decision_variables):
+        """
+        Evaluates the objective function for a set of decision variables.
+        Returns the same outputs as objective_function.
+        """
+        return self.evaluate_batch([decision_variables])[0]
+
+    def evaluate_batch(self, decision_variables_list):
+        """
+        Evaluates the objective function for a batch of decision variables, eg. the population of a
+        population-based optimiser. Each model is integrated on its own, so that the objective for a set of
+        decision variables doesn't depend on the other decision variables in the batch.
+        """
+        models = [self.build_scenario_model(dvs) for dvs in decision_variables_list]
+        for model in models:
+            model.run_model(IntegrationType.SOLVE_IVP)
+
+        return [
+            (*get_objective_outputs(model, self.config), [self.root_model, model])
+            for model in models
+        ]
 
 
 def read_list_of_param_sets_from_csv(country):
@@ -188,7 +301,7 @@ def read_list_of_param_sets_from_csv(country):
     :param config: integer used to refer to different sensitivity analyses
     :return: a list of dictionaries
     """
-    path_to_csv = os.path.join('calibrated_param_sets', country + "_calibrated_params.csv")
+    path_to_csv = os.path.join(FILE_DIR, 'calibrated_param_sets', country + "_calibrated_params.csv")
     table = pd.read_csv(path_to_csv)
 
     col_names_to_skip = ["idx", "loglikelihood", "best_deaths", "all_vars_to_1_deaths",
@@ -265,13 +378,12 @@ if __name__ == "__main__":
                 param_set_list = read_list_of_param_sets_from_csv(_country)
                 # param_set_list = [param_set_list[-1]]
                 for param_set in param_set_list:
-                    # Run this line of code every time we use a new param_set and before performing optimisation
+                    # Create this context every time we use a new param_set and before performing optimisation
                     # This is an initialisation step
-                    _root_model = run_root_model(_country, param_set)
+                    context = OptimisationContext(_country, _config, _mode, param_set)
 
                     # The following line is the one to be run again and again during optimisation
-                    h, d, yoll, p_immune, m = objective_function(decision_vars[_mode], _root_model, _mode, _country, _config,
-                                                           param_set)
+                    h, d, yoll, p_immune, m = context.evaluate(decision_vars[_mode])
                     print("Immunity: " + str(h) + "\n" + "Deaths: " + str(round(d)) + "\n" + "Years of life lost: " +
                           str(round(yoll)) + "\n" + "Prop immune: " + str(round(p_immune, 3))
                           )
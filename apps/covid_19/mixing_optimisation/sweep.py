@@ -0,0 +1,125 @@
+"""
+Runs the mixing optimisation objective over a sweep of modes, countries, configurations
+and calibrated param sets.
+
+Each combination is a task, and tasks are run in parallel in a pool of worker processes.
+Each task's result is saved to the results database as soon as it completes,
+so that an interrupted sweep can be re-run and will skip the tasks that have already finished.
+"""
+import json
+import logging
+import multiprocessing
+from concurrent import futures
+from typing import List
+
+import pandas as pd
+
+from autumn.db import Database
+
+from apps.covid_19.mixing_optimisation.constants import OPTI_REGIONS
+from apps.covid_19.mixing_optimisation.mixing_opti import (
+    OptimisationContext,
+    read_list_of_param_sets_from_csv,
+)
+
+logger = logging.getLogger(__name__)
+
+SWEEP_TABLE = "mixing_sweep"
+SWEEP_TASK_COLS = ["mode", "country", "config", "param_set_idx"]
+SWEEP_MODES = ["by_age", "by_location"]
+SWEEP_CONFIGS = [2, 3]
+
+# Decision variables evaluated for each mode.
+SWEEP_DECISION_VARIABLES = {
+    "by_age": [1.0] * 16,
+    "by_location": [1.0, 1.0, 1.0],
+}
+
+
+def get_sweep_tasks(modes: List[str], countries: List[str], configs: List[int]) -> List[dict]:
+    """
+    Returns a task for each combination of mode, country, configuration and calibrated param set.
+    """
+    tasks = []
+    for country in countries:
+        param_sets = read_list_of_param_sets_from_csv(country)
+        for mode in modes:
+            for config in configs:
+                for param_set_idx, param_set in enumerate(param_sets):
+                    task = {
+                        "mode": mode,
+                        "country": country,
+                        "config": config,
+                        "param_set_idx": param_set_idx,
+                        "param_set": param_set,
+                    }
+                    tasks.append(task)
+
+    return tasks
+
+
+def get_finished_task_keys(db: Database) -> set:
+    """
+    Returns the keys of the tasks which have results in the database.
+    """
+    if SWEEP_TABLE not in db.table_names():
+        return set()
+
+    results_df = db.query(SWEEP_TABLE, column=SWEEP_TASK_COLS)
+    return set(results_df.itertuples(index=False, name=None))
+
+
+def get_task_key(task: dict) -> tuple:
+    return tuple(task[col] for col in SWEEP_TASK_COLS)
+
+
+def run_sweep(
+    db_path: str,
+    modes=SWEEP_MODES,
+    countries=OPTI_REGIONS,
+    configs=SWEEP_CONFIGS,
+    n_workers=None,
+):
+    """
+    Runs all sweep tasks which do not have results in the database yet, in parallel,
+    saving each result to the database as it completes.
+    """
+    db = Database(db_path)
+    requested_tasks = get_sweep_tasks(modes, countries, configs)
+    finished_keys = get_finished_task_keys(db)
+    tasks = [t for t in requested_tasks if get_task_key(t) not in finished_keys]
+    num_skipped = len(requested_tasks) - len(tasks)
+    logger.info("Running %s sweep tasks, skipping %s finished tasks", len(tasks), num_skipped)
+    if not tasks:
+        return
+
+    n_workers = n_workers or multiprocessing.cpu_count()
+    with futures.ProcessPoolExecutor(max_workers=n_workers) as pool:
+        task_futures = [pool.submit(run_sweep_task, task) for task in tasks]
+        for num_done, future in enumerate(futures.as_completed(task_futures), start=1):
+            result = future.result()
+            db.dump_df(SWEEP_TABLE, pd.DataFrame([result]))
+            logger.info("Finished sweep task %s of %s: %s", num_done, len(tasks), result)
+
+
+def run_sweep_task(task: dict) -> dict:
+    """
+    Evaluates the mixing optimisation objective for a task, in a worker process.
+    The root model is read from the run cache if another task has already run it.
+    """
+    mode = task["mode"]
+    decision_variables = SWEEP_DECISION_VARIABLES[mode]
+    context = OptimisationContext(
+        task["country"], task["config"], mode, task["param_set"], use_cache=True
+    )
+    herd_immunity, deaths, years_of_life_lost, prop_immune, _ = context.evaluate(
+        decision_variables
+    )
+    return {
+        **{col: task[col] for col in SWEEP_TASK_COLS},
+        "decision_variables": json.dumps(decision_variables),
+        "herd_immunity": bool(herd_immunity),
+        "deaths": float(deaths),
+        "years_of_life_lost": float(years_of_life_lost),
+        "prop_immune": float(prop_immune),
+    }
@@ -90,28 +90,7 @@ def build_model(params: dict) -> StratifiedModel:
 
     # Build mixing matrix.
     static_mixing_matrix = preprocess.mixing_matrix.build_static(country_iso3)
-    dynamic_mixing_matrix = None
-    dynamic_location_mixing_params = params["mixing"]
-    dynamic_age_mixing_params = params["mixing_age_adjust"]
-    microdistancing = params["microdistancing"]
-
-    if dynamic_location_mixing_params or dynamic_age_mixing_params:
-        npi_effectiveness_params = params["npi_effectiveness"]
-        google_mobility_locations = params["google_mobility_locations"]
-        is_periodic_intervention = params.get("is_periodic_intervention")
-        periodic_int_params = params.get("periodic_intervention")
-        dynamic_mixing_matrix = preprocess.mixing_matrix.build_dynamic(
-            country_iso3,
-            region,
-            dynamic_location_mixing_params,
-            dynamic_age_mixing_params,
-            npi_effectiveness_params,
-            google_mobility_locations,
-            is_periodic_intervention,
-            periodic_int_params,
-            end_time,
-            microdistancing,
-        )
+    dynamic_mixing_matrix = build_dynamic_mixing_matrix(params)
 
     # FIXME: Remove params from model_parameters
     model_parameters = {**params, **compartment_exit_flow_rates}
@@ -209,19 +188,48 @@ def build_model(params: dict) -> StratifiedModel:
         **progress_connections,
     }
 
+    model.death_output_categories = list_all_strata_for_mortality(model.compartment_names)
+
     # Add notifications to derived_outputs
     implement_importation = model.parameters["implement_importation"]
     model.derived_output_functions["notifications"] = outputs.get_calc_notifications_covid(
-        implement_importation, modelled_abs_detection_proportion_imported,
+        model, implement_importation, modelled_abs_detection_proportion_imported,
     )
-    model.derived_output_functions["incidence_icu"] = outputs.calculate_incidence_icu_covid
-    model.derived_output_functions["prevXlateXclinical_icuXamong"] = outputs.calculate_icu_prev
+    model.derived_output_functions["incidence_icu"] = outputs.get_calc_incidence_icu_covid(model)
+    model.derived_output_functions["prevXlateXclinical_icuXamong"] = outputs.get_calc_icu_prev(model)
 
-    model.derived_output_functions["hospital_occupancy"] = outputs.calculate_hospital_occupancy
-    model.derived_output_functions["proportion_seropositive"] = outputs.calculate_proportion_seropositive
+    model.derived_output_functions["hospital_occupancy"] = outputs.get_calc_hospital_occupancy(model)
+    model.derived_output_functions["proportion_seropositive"] = outputs.get_calc_proportion_seropositive(model)
 
-    model.death_output_categories = list_all_strata_for_mortality(model.compartment_names)
     model.derived_output_functions["years_of_life_lost"] = outputs.get_calculate_years_of_life_lost(
-        life_expectancy_latest)
+        model, life_expectancy_latest)
+
+    # Declare which outputs each derived output function reads, so that lean model runs
+    # only need to calculate the outputs that are targeted.
+    model.derived_output_dependencies = outputs.get_derived_output_dependencies(model)
 
     return model
+
+
+def build_dynamic_mixing_matrix(params: dict):
+    """
+    Build the time-variant mixing matrix function for the model,
+    or return None if the mixing matrix is not time-variant.
+    """
+    dynamic_location_mixing_params = params["mixing"]
+    dynamic_age_mixing_params = params["mixing_age_adjust"]
+    if not (dynamic_location_mixing_params or dynamic_age_mixing_params):
+        return None
+
+    return preprocess.mixing_matrix.build_dynamic(
+        params["iso3"],
+        params["region"],
+        dynamic_location_mixing_params,
+        dynamic_age_mixing_params,
+        params["npi_effectiveness"],
+        params["google_mobility_locations"],
+        params.get("is_periodic_intervention"),
+        params.get("periodic_intervention"),
+        params["end_time"],
+        params["microdistancing"],
+    )
@@ -1,88 +1,162 @@
+import numpy as np
+
 from autumn.constants import Compartment
 
 from datetime import date
 from summer.model import StratifiedModel
-from summer.model.utils.string import find_name_components
+from summer.model.utils import vectorised_derived_output
+from summer.model.utils.string import find_name_components, get_death_output_name
 
 NOTIFICATION_STRATUM = ["sympt_isolate", "hospital_non_icu", "icu"]
 
 
 def get_calc_notifications_covid(
-    implement_importation, prop_detected_func,
+    model: StratifiedModel, implement_importation, prop_detected_func,
 ):
-    def calculate_notifications_covid(model: StratifiedModel, time: float):
+    notification_keys = find_notification_outputs(get_connection_and_death_output_keys(model))
+
+    @vectorised_derived_output
+    def calculate_notifications_covid(model, times, outputs, derived_outputs):
         """
-        Returns the number of notifications for a given time.
+        Returns the number of notifications at each time.
         The fully stratified incidence outputs must be available before calling this function
         """
-        notifications_count = 0.0
-        time_idx = model.times.index(time)
-        for key, value in model.derived_outputs.items():
-            is_progress = "progressX" in key
-            is_notify_stratum = any([stratum in key for stratum in NOTIFICATION_STRATUM])
-            if is_progress and is_notify_stratum:
-                notifications_count += value[time_idx]
+        notifications = np.zeros(len(times))
+        for key in notification_keys:
+            notifications += derived_outputs[key]
 
         if implement_importation:
-            notifications_count += (
-                    model.time_variants["crude_birth_rate"](time)
-                    * sum(model.compartment_values)
-                    * prop_detected_func(time)
+            import_rate_func = model.time_variants["crude_birth_rate"]
+            notifications += outputs.sum(axis=1) * np.array(
+                [import_rate_func(time) * prop_detected_func(time) for time in times]
             )
 
-        return notifications_count
+        return notifications
 
     return calculate_notifications_covid
 
 
-def calculate_incidence_icu_covid(model, time):
-    time_idx = model.times.index(time)
-    incidence_icu = 0.0
-    for key, value in model.derived_outputs.items():
-        if "incidence" in find_name_components(key) and "clinical_icu" in find_name_components(key):
-            incidence_icu += value[time_idx]
-    return incidence_icu
+def get_calc_incidence_icu_covid(model: StratifiedModel):
+    icu_incidence_keys = find_icu_incidence_outputs(get_connection_and_death_output_keys(model))
+
+    @vectorised_derived_output
+    def calculate_incidence_icu_covid(model, times, outputs, derived_outputs):
+        incidence_icu = np.zeros(len(times))
+        for key in icu_incidence_keys:
+            incidence_icu += derived_outputs[key]
+
+        return incidence_icu
+
+    return calculate_incidence_icu_covid
+
+
+def get_calc_icu_prev(model: StratifiedModel):
+    icu_idxs = [
+        i for i, c in enumerate(model.compartment_names) if "late" in c and "clinical_icu" in c
+    ]
+
+    @vectorised_derived_output
+    def calculate_icu_prev(model, times, outputs, derived_outputs):
+        return outputs[:, icu_idxs].sum(axis=1)
 
+    return calculate_icu_prev
 
-def calculate_icu_prev(model, time):
-    icu_prev = 0
-    for i, comp_name in enumerate(model.compartment_names):
-        if "late" in comp_name and "clinical_icu" in comp_name:
-            icu_prev += model.compartment_values[i]
-    return icu_prev
 
+def get_calc_hospital_occupancy(model: StratifiedModel):
+    # "icu" used to map ["clinical_hospital_non_icu", "clinical_icu"]
+    hospital_idxs = [i for i, c in enumerate(model.compartment_names) if "late" in c and "icu" in c]
 
-def calculate_hospital_occupancy(model, time):
-    hospital_prev = 0
-    for i, comp_name in enumerate(model.compartment_names):
-        if "late" in comp_name and "icu" in comp_name:  # "icu" used to map ["clinical_hospital_non_icu", "clinical_icu"]
-            hospital_prev += model.compartment_values[i]
-    return hospital_prev
+    @vectorised_derived_output
+    def calculate_hospital_occupancy(model, times, outputs, derived_outputs):
+        return outputs[:, hospital_idxs].sum(axis=1)
 
+    return calculate_hospital_occupancy
 
-def calculate_proportion_seropositive(model, time):
-    n_seropositive = 0
-    for i, comp_name in enumerate(model.compartment_names):
-        if "recovered" in comp_name:
-            n_seropositive += model.compartment_values[i]
-    return n_seropositive / sum(model.compartment_values)
 
+def get_calc_proportion_seropositive(model: StratifiedModel):
+    recovered_idxs = [i for i, c in enumerate(model.compartment_names) if "recovered" in c]
 
-def get_calculate_years_of_life_lost(life_expectancy_by_agegroup):
+    @vectorised_derived_output
+    def calculate_proportion_seropositive(model, times, outputs, derived_outputs):
+        return outputs[:, recovered_idxs].sum(axis=1) / outputs.sum(axis=1)
 
-    def calculate_years_of_life_lost(model, time):
-        time_idx = model.times.index(time)
-        total_yoll = 0.
-        for i, agegroup in enumerate(model.all_stratifications['agegroup']):
-            for derived_output in model.derived_outputs:
-                if "infection_deathsXagegroup_" + agegroup in derived_output:
-                    total_yoll += model.derived_outputs[derived_output][time_idx] * life_expectancy_by_agegroup[i]
+    return calculate_proportion_seropositive
+
+
+def get_calculate_years_of_life_lost(model: StratifiedModel, life_expectancy_by_agegroup):
+    death_weights = find_death_outputs_by_agegroup(
+        get_connection_and_death_output_keys(model),
+        model.all_stratifications.get("agegroup", []),
+        life_expectancy_by_agegroup,
+    )
+
+    @vectorised_derived_output
+    def calculate_years_of_life_lost(model, times, outputs, derived_outputs):
+        total_yoll = np.zeros(len(times))
+        for key, life_expectancy in death_weights.items():
+            total_yoll += derived_outputs[key] * life_expectancy
 
         return total_yoll
 
     return calculate_years_of_life_lost
 
 
+def get_connection_and_death_output_keys(model: StratifiedModel):
+    """
+    Returns the keys of the derived outputs that are calculated before the derived output functions.
+    """
+    return [
+        *model.output_connections.keys(),
+        *[get_death_output_name(d) for d in model.death_output_categories],
+    ]
+
+
+def find_notification_outputs(output_keys):
+    return [
+        k for k in output_keys
+        if "progressX" in k and any([stratum in k for stratum in NOTIFICATION_STRATUM])
+    ]
+
+
+def find_icu_incidence_outputs(output_keys):
+    return [
+        k for k in output_keys
+        if "incidence" in find_name_components(k) and "clinical_icu" in find_name_components(k)
+    ]
+
+
+def find_death_outputs_by_agegroup(output_keys, agegroups, life_expectancy_by_agegroup):
+    """
+    Returns the life expectancy to apply to each agegroup's death outputs,
+    summed over any agegroups whose names match the output.
+    """
+    death_weights = {}
+    for agegroup, life_expectancy in zip(agegroups, life_expectancy_by_agegroup):
+        for k in output_keys:
+            if "infection_deathsXagegroup_" + agegroup in k:
+                death_weights[k] = death_weights.get(k, 0.0) + life_expectancy
+
+    return death_weights
+
+
+def get_derived_output_dependencies(model: StratifiedModel):
+    """
+    Returns the derived outputs that each of the derived output functions read.
+    """
+    output_keys = get_connection_and_death_output_keys(model)
+    agegroups = model.all_stratifications.get("agegroup", [])
+    return {
+        "notifications": find_notification_outputs(output_keys),
+        "incidence_icu": find_icu_incidence_outputs(output_keys),
+        "prevXlateXclinical_icuXamong": [],
+        "hospital_occupancy": [],
+        "proportion_seropositive": [],
+        "years_of_life_lost": list(
+            find_death_outputs_by_agegroup(output_keys, agegroups, [0.0] * len(agegroups)).keys()
+        ),
+    }
+
+
 def get_progress_connections(stratum_names: str):
     """
     Track "progress": flow from early infectious cases to late infectious cases.
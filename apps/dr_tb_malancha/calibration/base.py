@@ -13,14 +13,18 @@ N_BURNED = 0
 N_CHAINS = 1
 
 
-def run_full_models_for_mcmc(region: str, burn_in: int, src_db_path: str, dest_db_path: str):
+def run_full_models_for_mcmc(
+    region: str, burn_in: int, src_db_path: str, dest_db_path: str, n_workers=None
+):
     """
     Run the full baseline model and all scenarios for all accepted MCMC runs in src db.
     """
     region_model = RegionApp(region)
     build_model = region_model.build_model
     params = region_model.params
-    _run_full_models_for_mcmc(burn_in, src_db_path, dest_db_path, build_model, params)
+    _run_full_models_for_mcmc(
+        burn_in, src_db_path, dest_db_path, build_model, params, n_workers=n_workers
+    )
 
 
 def run_calibration_chain(
@@ -1,6 +1,7 @@
 import os
 
 from summer.model import StratifiedModel
+from summer.model.utils import vectorised_derived_output
 
 from autumn import constants
 from autumn.constants import Compartment
@@ -212,14 +213,13 @@ def build_model(params: dict) -> StratifiedModel:
         )
 
     # Capture reported prevalence in Majuro assuming over-reporting (needed for calibration)
-    def calculate_reported_majuro_prevalence(model, time):
-        true_prev = 0.0
-        pop_majuro = 0.0
-        for i, compartment in enumerate(model.compartment_names):
-            if "majuro" in compartment:
-                pop_majuro += model.compartment_values[i]
-                if "infectious" in compartment:
-                    true_prev += model.compartment_values[i]
+    majuro_idxs = [i for i, c in enumerate(tb_model.compartment_names) if "majuro" in c]
+    majuro_infectious_idxs = [i for i in majuro_idxs if "infectious" in tb_model.compartment_names[i]]
+
+    @vectorised_derived_output
+    def calculate_reported_majuro_prevalence(model, times, outputs, derived_outputs):
+        true_prev = outputs[:, majuro_infectious_idxs].sum(axis=1)
+        pop_majuro = outputs[:, majuro_idxs].sum(axis=1)
         return (
             1.0e5
             * true_prev
@@ -230,5 +230,6 @@ def build_model(params: dict) -> StratifiedModel:
     tb_model.derived_output_functions.update(
         {"reported_majuro_prevalence": calculate_reported_majuro_prevalence}
     )
+    tb_model.derived_output_dependencies["reported_majuro_prevalence"] = []
 
     return tb_model
@@ -9,6 +9,7 @@ from summer.model import (
     find_name_components,
     find_stem,
 )
+from summer.model.utils import vectorised_derived_output
 from summer.model.utils.parameter_processing import (
     get_parameter_dict_from_function,
     logistic_scaling_function,
@@ -506,35 +507,45 @@ def build_model(params: dict) -> StratifiedModel:
             """
                 example of stratum: "Xage_0Xstrain_mdr"
             """
-
-            def calculate_notifications(model, time):
-
-                total_notifications = 0.0
-                dict_flows = model.transition_flows_dict
-
-                comp_ind = model.compartment_names.index("infectious" + stratum)
-                infectious_pop = model.compartment_values[comp_ind]
-                detection_indices = [
-                    index
-                    for index, val in dict_flows["parameter"].items()
-                    if "case_detection" in val
-                ]
-                flow_index = [
-                    index
-                    for index in detection_indices
-                    if dict_flows["origin"][index] == model.compartment_names[comp_ind]
-                ][0]
-                param_name = dict_flows["parameter"][flow_index]
-                detection_tx_rate = model.get_parameter_value(param_name, time)
-                tsr = mongolia_tsr(time) + external_params["reduction_negative_tx_outcome"] * (
-                    1.0 - mongolia_tsr(time)
+            # Find the infectious compartment and its case detection flow once, rather than at every time.
+            comp_name = "infectious" + stratum
+            comp_ind = tb_model.compartment_names.index(comp_name)
+            flows = tb_model.transition_flows
+            is_detection_flow = flows["parameter"].str.contains("case_detection", na=False) & (
+                flows["origin"] == comp_name
+            )
+            param_name = flows["parameter"][is_detection_flow].iloc[0]
+            is_mdr = "strain_mdr" in comp_name
+
+            @vectorised_derived_output
+            def calculate_notifications(model, times, outputs, derived_outputs):
+                infectious_pop = outputs[:, comp_ind]
+                detection_tx_rate = numpy.array(
+                    [model.get_parameter_value(param_name, time) for time in times]
                 )
-                if "strain_mdr" in model.compartment_names[comp_ind]:
-                    tsr = external_params["mdr_tsr"] * external_params["prop_mdr_detected_as_mdr"]
-                if tsr > 0.0:
-                    total_notifications += infectious_pop * detection_tx_rate / tsr
-
-                return total_notifications
+                if is_mdr:
+                    tsr = numpy.full(
+                        len(times),
+                        external_params["mdr_tsr"] * external_params["prop_mdr_detected_as_mdr"],
+                    )
+                else:
+                    tsr = numpy.array(
+                        [
+                            mongolia_tsr(time)
+                            + external_params["reduction_negative_tx_outcome"]
+                            * (1.0 - mongolia_tsr(time))
+                            for time in times
+                        ]
+                    )
+
+                notifications = numpy.zeros(len(times))
+                is_positive_tsr = tsr > 0.0
+                notifications[is_positive_tsr] = (
+                    infectious_pop[is_positive_tsr]
+                    * detection_tx_rate[is_positive_tsr]
+                    / tsr[is_positive_tsr]
+                )
+                return notifications
 
             return calculate_notifications
 
@@ -544,6 +555,7 @@ def build_model(params: dict) -> StratifiedModel:
                 tb_model.derived_output_functions[
                     "notifications" + stratum
                 ] = notification_function_builder(stratum)
+                tb_model.derived_output_dependencies["notifications" + stratum] = []
                 # tb_model.derived_output_functions['popsize_treatment_support' + stratum] = notification_function_builder(stratum)
 
     if "incidence" in derived_output_types:
@@ -559,13 +571,14 @@ def build_model(params: dict) -> StratifiedModel:
             late_name = f"incidence_late{rootname}"
             combined_name = f"incidence{rootname}"
 
-            def add_combined_incidence(model, time, e=early_name, l=late_name):
-                time_idx = model.times.index(time)
-                early_incidence = model.derived_outputs[e][time_idx]
-                late_incidence = model.derived_outputs[l][time_idx]
-                return early_incidence + late_incidence
+            @vectorised_derived_output
+            def add_combined_incidence(
+                model, times, outputs, derived_outputs, e=early_name, l=late_name
+            ):
+                return derived_outputs[e] + derived_outputs[l]
 
             tb_model.derived_output_functions[combined_name] = add_combined_incidence
+            tb_model.derived_output_dependencies[combined_name] = [early_name, late_name]
 
     if "mortality" in derived_output_types:
         # prepare death outputs for all strata
@@ -580,16 +593,20 @@ def build_model(params: dict) -> StratifiedModel:
             """
                 example of tag: "starin_mdr" or "organ_smearpos"
             """
+            notification_keys = [
+                key
+                for key in [*tb_model.output_connections, *tb_model.derived_output_functions]
+                if "notifications" in key and tag in key
+            ]
 
-            def calculate_nb_detected(model, time):
-                nb_treated = 0.0
-                for key, value in model.derived_outputs.items():
-                    if "notifications" in key and tag in key:
-                        this_time_index = model.times.index(time)
-                        nb_treated += value[this_time_index]
+            @vectorised_derived_output
+            def calculate_nb_detected(model, times, outputs, derived_outputs):
+                nb_treated = numpy.zeros(len(times))
+                for key in notification_keys:
+                    nb_treated += derived_outputs[key]
                 return nb_treated
 
-            return calculate_nb_detected
+            return calculate_nb_detected, notification_keys
 
         for tag in [
             "strain_mdr",
@@ -598,24 +615,24 @@ def build_model(params: dict) -> StratifiedModel:
             "organ_smearneg",
             "organ_extrapul",
         ]:
-            tb_model.derived_output_functions[
-                "popsizeXnb_detectedX" + tag
-            ] = detected_popsize_function_builder(tag)
+            calculate_nb_detected, notification_keys = detected_popsize_function_builder(tag)
+            tb_model.derived_output_functions["popsizeXnb_detectedX" + tag] = calculate_nb_detected
+            tb_model.derived_output_dependencies["popsizeXnb_detectedX" + tag] = notification_keys
 
         # ACF popsize: number of people screened
-        def popsize_acf(model, time):
+        urban_ger_idxs = [
+            i for i, c_name in enumerate(tb_model.compartment_names) if "location_urban_ger" in c_name
+        ]
+
+        @vectorised_derived_output
+        def popsize_acf(model, times, outputs, derived_outputs):
             if external_params["acf_coverage"] == 0.0:
-                return 0.0
-            pop_urban_ger = sum(
-                [
-                    model.compartment_values[i]
-                    for i, c_name in enumerate(model.compartment_names)
-                    if "location_urban_ger" in c_name
-                ]
-            )
+                return numpy.zeros(len(times))
+            pop_urban_ger = outputs[:, urban_ger_idxs].sum(axis=1)
             return external_params["acf_coverage"] * pop_urban_ger
 
         tb_model.derived_output_functions["popsizeXnb_screened_acf"] = popsize_acf
+        tb_model.derived_output_dependencies["popsizeXnb_screened_acf"] = []
 
     return tb_model
 
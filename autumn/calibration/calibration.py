@@ -1,8 +1,12 @@
 import yaml
 import os
+import glob
+import pickle
 import logging
+import multiprocessing
+from concurrent import futures
 from time import time
-from itertools import chain, product
+from itertools import chain, product, islice
 from datetime import datetime
 from typing import Dict, List, Callable
 
@@ -16,15 +20,20 @@ from scipy import stats, special
 
 from summer.model import StratifiedModel
 from autumn import constants
-from autumn.db.models import store_database
+from autumn.db import Database
+from autumn.db.models import store_database, format_output_df, delete_runs
+from autumn.db.writer import BackgroundWriter
 from autumn.plots.calibration_plots import plot_all_priors
-from autumn.tool_kit.scenarios import Scenario
+from autumn.tool_kit import schema_builder as sb
+from autumn.tool_kit.scenarios import Scenario, ModelOutputs
 from autumn.tool_kit.params import update_params
 from autumn.tool_kit.utils import (
     get_git_branch,
     get_git_hash,
     get_data_hash,
 )
+from .emulator import LikelihoodEmulator
+from .likelihood import TargetLikelihood
 from .utils import (
     find_decent_starting_point,
     calculate_prior,
@@ -36,6 +45,28 @@ from .utils import (
 BEST_LL = "best_ll"
 BEST_START = "best_start_time"
 
+# Minimum time, in seconds, between MCMC chain checkpoints.
+CHECKPOINT_SECONDS = 60
+
+# Relative step size used to estimate gradients with finite differences in least squares calibration.
+FINITE_DIFFERENCE_STEP = np.sqrt(np.finfo(float).eps)
+
+# Number of grid points sent to the worker processes at a time in grid based calibration.
+GRID_BATCH_SIZE = 256
+# Number of decimal places used to match grid points to those already stored.
+GRID_PRECISION = 10
+
+# Temperature of the hottest chain in parallel tempering.
+MAX_TEMPERATURE = 20.0
+
+# Effective sample size, as a fraction of the number of particles, kept at each SMC tempering step.
+SMC_ESS_FRACTION = 0.5
+# Number of MCMC moves applied to the particles after each SMC resampling step.
+SMC_N_MOVES = 3
+
+# Fraction of the calibration period used to screen proposals in delayed acceptance MCMC.
+SCREENING_FRACTION = 0.5
+
 logger = logging.getLogger(__name__)
 
 
@@ -43,9 +74,14 @@ class CalibrationMode:
     """Different ways to run the calibration."""
 
     AUTUMN_MCMC = "autumn_mcmc"
+    DELAYED_ACCEPTANCE_MCMC = "delayed_acceptance_mcmc"
+    EMULATED_MCMC = "emulated_mcmc"
+    PARALLEL_TEMPERING = "parallel_tempering"
     LEAST_SQUARES = "lsm"
     GRID_BASED = "grid_based"
-    MODES = [AUTUMN_MCMC, LEAST_SQUARES, GRID_BASED]
+    SMC = "smc"
+    MCMC_MODES = [AUTUMN_MCMC, DELAYED_ACCEPTANCE_MCMC, EMULATED_MCMC]
+    MODES = [*MCMC_MODES, PARALLEL_TEMPERING, LEAST_SQUARES, GRID_BASED, SMC]
 
 
 def get_parameter_bounds_from_priors(prior_dict):
@@ -86,6 +122,7 @@ class Calibration:
         chain_index: int,
         total_nb_chains: int,
         param_set_name: str = "main",
+        resume: bool = False,
     ):
         self.model_name = model_name
         self.model_builder = model_builder  # a function that builds a new model without running it
@@ -131,8 +168,15 @@ class Calibration:
             constants.OUTPUT_DATA_PATH, "calibrate", model_name, param_set_name
         )
         run_hash = get_data_hash(model_name, priors, targeted_outputs, multipliers)
-        timestamp = datetime.now().strftime("%Y-%m-%d")
-        output_dir = os.path.join(project_dir, f"{run_hash}-{timestamp}")
+        output_dir = None
+        if resume:
+            # Continue writing to the latest output dir for this calibration.
+            output_dir = find_latest_output_dir(project_dir, run_hash)
+
+        if not output_dir:
+            timestamp = datetime.now().strftime("%Y-%m-%d")
+            output_dir = os.path.join(project_dir, f"{run_hash}-{timestamp}")
+
         os.makedirs(output_dir, exist_ok=True)
 
         # Save metadata output dir.
@@ -150,16 +194,26 @@ class Calibration:
 
         db_name = f"outputs_calibration_chain_{self.chain_index}.db"
         self.output_db_path = os.path.join(output_dir, db_name)
+        self.checkpoint_path = os.path.join(output_dir, f"checkpoint-{self.chain_index}.pkl")
+        self.resume = resume
 
+        self.output_writer = None  # writes outputs in the background while a calibration is running
         self.data_as_array = None  # will contain all targeted data points in a single array
 
         self.format_data_as_array()
         self.workout_unspecified_target_sds()  # for likelihood definition
         self.workout_unspecified_time_weights()  # for likelihood weighting
         self.workout_unspecified_jumping_sds()  # for proposal function definition
+        self.target_likelihood = TargetLikelihood(self.targeted_outputs, self.param_list)
+
+        # Truncated targets, used to screen proposals in delayed acceptance MCMC.
+        self.screening_targets = None
+        self.screening_end_time = None
+        self.screening_likelihood = None
 
         self.iter_num = 0
         self.latest_scenario = None
+        self.has_validated_run = False  # whether a model run has been validated, see run_model_with_params
         self.run_mode = None
         self.main_table = {}
         self.mcmc_trace = None  # will store the results of the MCMC model calibration
@@ -175,29 +229,55 @@ class Calibration:
         with open(file_path, "w") as f:
             yaml.dump(data, f)
 
-    def store_model_outputs(self):
+    def store_output_df(self, df: pd.DataFrame, table_name: str, **kwargs):
         """
-        Record the model outputs in the database
+        Store a dataframe of outputs in the output database.
+        Outputs are written in the background while a calibration is running.
+        """
+        if self.output_writer:
+            df = format_output_df(df, table_name=table_name, **kwargs)
+            self.output_writer.write(table_name, df)
+        else:
+            store_database(df, table_name=table_name, database_path=self.output_db_path, **kwargs)
+
+    def store_table(self, df: pd.DataFrame, table_name: str):
         """
-        scenario = self.latest_scenario
-        assert scenario, "No model has been run"
-        model = scenario.model
+        Store a dataframe in the output database, as is.
+        """
+        if self.output_writer:
+            self.output_writer.write(table_name, df)
+        else:
+            Database(self.output_db_path).dump_df(table_name, df)
+
+    def store_model_outputs(self, model_outputs: ModelOutputs = None):
+        """
+        Record the model outputs in the database.
+        By default the latest model run is stored, otherwise the outputs of a run in a worker process can be given,
+        see _evaluate_loglikelihood_and_outputs.
+        """
+        if model_outputs:
+            model = model_outputs
+        else:
+            assert self.latest_scenario, "No model has been run"
+            model = self.latest_scenario.model
+
+            # Calibration runs only calculate the targeted derived outputs, so calculate all of them before storing.
+            model.calculate_derived_outputs()
+
         out_df = pd.DataFrame(model.outputs, columns=model.compartment_names)
         derived_output_df = pd.DataFrame.from_dict(model.derived_outputs)
-        store_database(
+        self.store_output_df(
             derived_output_df,
             table_name="derived_outputs",
             run_idx=self.iter_num,
-            database_path=self.output_db_path,
-            scenario=scenario.idx,
+            scenario=0,
         )
-        store_database(
+        self.store_output_df(
             out_df,
             table_name="outputs",
             run_idx=self.iter_num,
             times=model.times,
-            database_path=self.output_db_path,
-            scenario=scenario.idx,
+            scenario=0,
         )
 
     def store_mcmc_iteration_info(self, proposed_params, proposed_loglike, accept, i_run):
@@ -215,28 +295,43 @@ class Calibration:
         mcmc_run_colnames.append("loglikelihood")
         mcmc_run_colnames.append("accept")
         mcmc_run_df = pd.DataFrame(mcmc_run_dict, columns=mcmc_run_colnames, index=[i_run])
-        store_database(
-            mcmc_run_df, table_name="mcmc_run", run_idx=i_run, database_path=self.output_db_path,
-        )
+        self.store_output_df(mcmc_run_df, table_name="mcmc_run", run_idx=i_run)
 
-    def run_model_with_params(self, proposed_params: dict):
+    def run_model_with_params(self, proposed_params: dict, end_time=None, targeted_outputs=None):
         """
         Run the model with a set of params.
+        By default the model is run until the calibration end time, and the outputs for all targets are calculated.
+        The params and the model are validated for the first run in each process. Later runs only change
+        the values of the calibrated params, so they skip validation.
         """
         logger.info(f"Running iteration {self.iter_num}...")
+        end_time = end_time or self.end_time
+        targeted_outputs = targeted_outputs or self.targeted_outputs
 
         # Update default parameters to use calibration params.
-        param_updates = {"end_time": self.end_time}
+        param_updates = {"end_time": end_time}
         for i, param_name in enumerate(self.param_list):
             param_updates[param_name] = proposed_params[i]
 
-        params = copy.deepcopy(self.model_parameters)
-        params["default"] = update_params(params["default"], param_updates)
+        # The calibration params are layered over the model params, without copying them.
+        params = {
+            **self.model_parameters,
+            "default": update_params(self.model_parameters["default"], param_updates),
+        }
         scenario = Scenario(self.model_builder, 0, params)
-        scenario.run()
+
+        # Only calculate the derived outputs that are targeted, at the target times.
+        _derived_outs = [o for o in targeted_outputs if "prevX" not in o["output_key"]]
+        with sb.trusted_validation(is_trusted=self.has_validated_run):
+            scenario.run(
+                derived_output_keys=[o["output_key"] for o in _derived_outs],
+                derived_output_times=set(chain(*[o["years"] for o in _derived_outs])),
+            )
+
+        self.has_validated_run = True
         self.latest_scenario = scenario
 
-        _req_outs = [o for o in self.targeted_outputs if "prevX" in o["output_key"]]
+        _req_outs = [o for o in targeted_outputs if "prevX" in o["output_key"]]
         requested_outputs = [o["output_key"] for o in _req_outs]
         requested_times = {o["output_key"]: o["years"] for o in _req_outs}
         pp = post_proc.PostProcessing(
@@ -252,6 +347,20 @@ class Calibration:
         """
         Calculate the loglikelihood for a set of parameters
         """
+        best_ll, best_start_time = self.evaluate_loglikelihood(params)
+        self.record_loglikelihood(params, best_ll)
+        if to_return == BEST_LL:
+            return best_ll
+        elif to_return == BEST_START:
+            return best_start_time
+        else:
+            raise ValueError("to_return not recognised")
+
+    def evaluate_loglikelihood(self, params):
+        """
+        Run the model and calculate the loglikelihood for a set of parameters, without recording it.
+        Returns the best loglikelihood and the associated start time.
+        """
         scenario, pp = self.run_model_with_params(params)
 
         model_start_time = pp.derived_outputs["times"][0]
@@ -266,57 +375,15 @@ class Calibration:
 
         for considered_start_time in considered_start_times:
             time_shift = considered_start_time - model_start_time
-            ll = 0  # loglikelihood if using bayesian approach. Sum of squares if using lsm mode
-            for target in self.targeted_outputs:
-                key = target["output_key"]
-                data = np.array(target["values"])
-                time_weigths = target["time_weights"]
-                if key in pp.generated_outputs:
-                    model_output = np.array(pp.generated_outputs[key])
-                else:
-                    indices = []
-                    for year in target["years"]:
-                        time_idx = scenario.model.times.index(year - time_shift)
-                        indices.append(time_idx)
-
-                    model_output = np.array([pp.derived_outputs[key][index] for index in indices])
-
-                if self.run_mode == CalibrationMode.LEAST_SQUARES:
-                    squared_distance = (data - model_output) ** 2
-                    ll += np.sum([w * d for (w, d) in zip(time_weigths, squared_distance)])
-                else:
-                    if "loglikelihood_distri" not in target:  # default distribution
-                        target["loglikelihood_distri"] = "normal"
-                    if target["loglikelihood_distri"] == "normal":
-                        if key + "_dispersion_param" in self.param_list:
-                            normal_sd = params[self.param_list.index(key + "_dispersion_param")]
-                        else:
-                            normal_sd = target["sd"]
-                        squared_distance = (data - model_output) ** 2
-                        ll += -(0.5 / normal_sd ** 2) * np.sum([w * d for (w, d) in zip(time_weigths, squared_distance)])
-                    elif target["loglikelihood_distri"] == "poisson":
-                        for i in range(len(data)):
-                            ll += (
-                                round(data[i]) * math.log(abs(model_output[i]))
-                                - model_output[i]
-                                - math.log(math.factorial(round(data[i])))
-                            ) * time_weigths[i]
-                    elif target["loglikelihood_distri"] == "negative_binomial":
-                        assert key + "_dispersion_param" in self.param_list
-                        # the dispersion parameter varies during the MCMC. We need to retrieve its value
-                        n = [
-                            params[i]
-                            for i in range(len(params))
-                            if self.param_list[i] == key + "_dispersion_param"
-                        ][0]
-                        for i in range(len(data)):
-                            # We use the parameterisation based on mean and variance and assume define var=mean**delta
-                            mu = model_output[i]
-                            # work out parameter p to match the distribution mean with the model output
-                            p = mu / (mu + n)
-                            ll += stats.nbinom.logpmf(round(data[i]), n, 1.0 - p) * time_weigths[i]
-                    else:
-                        raise ValueError("Distribution not supported in loglikelihood_distri")
+            # Loglikelihood if using bayesian approach. Sum of squares if using lsm mode
+            ll = self.target_likelihood.evaluate(
+                params,
+                scenario.model.times,
+                pp.derived_outputs,
+                pp.generated_outputs,
+                is_least_squares=self.run_mode == CalibrationMode.LEAST_SQUARES,
+                time_shift=time_shift,
+            )
 
             if self.run_mode == CalibrationMode.LEAST_SQUARES:
                 is_new_best_ll = ll < best_ll
@@ -326,6 +393,12 @@ class Calibration:
             if is_new_best_ll:
                 best_ll, best_start_time = (ll, considered_start_time)
 
+        return best_ll, best_start_time
+
+    def record_loglikelihood(self, params, best_ll):
+        """
+        Record the loglikelihood evaluated for a set of parameters.
+        """
         if self.run_mode == CalibrationMode.LEAST_SQUARES:
             mcmc_run_dict = {k: v for k, v in zip(self.param_list, params)}
             mcmc_run_dict["loglikelihood"] = best_ll
@@ -334,21 +407,47 @@ class Calibration:
             mcmc_run_df = pd.DataFrame(
                 mcmc_run_dict, columns=mcmc_run_colnames, index=[self.iter_num]
             )
-            store_database(
-                mcmc_run_df,
-                table_name="mcmc_run",
-                run_idx=self.iter_num,
-                database_path=self.output_db_path,
-            )
+            self.store_output_df(mcmc_run_df, table_name="mcmc_run", run_idx=self.iter_num)
 
         self.evaluated_params_ll.append((copy.copy(params), copy.copy(best_ll)))
 
-        if to_return == BEST_LL:
-            return best_ll
-        elif to_return == BEST_START:
-            return best_start_time
-        else:
-            raise ValueError("to_return not recognised")
+    def screening_loglikelihood(self, params):
+        """
+        Calculate a cheap approximation of the loglikelihood, used to screen proposals in delayed acceptance MCMC.
+        The model is only run until the end of the screening period, and only the targets in that period are used.
+        """
+        if not self.screening_targets:
+            return 0.0
+
+        scenario, pp = self.run_model_with_params(
+            params, end_time=self.screening_end_time, targeted_outputs=self.screening_targets
+        )
+        return self.screening_likelihood.evaluate(
+            params, scenario.model.times, pp.derived_outputs, pp.generated_outputs
+        )
+
+    def setup_screening_targets(self, screening_fraction=SCREENING_FRACTION):
+        """
+        Select the target data points used to screen proposals in delayed acceptance MCMC.
+        These are the data points in the first part of the calibration period.
+        """
+        model_start = self.model_parameters["default"]["start_time"]
+        last_target_year = max([max(t["years"]) for t in self.targeted_outputs])
+        cutoff_time = model_start + screening_fraction * (last_target_year - model_start)
+        self.screening_targets = []
+        for target in self.targeted_outputs:
+            idxs = [i for i, year in enumerate(target["years"]) if year <= cutoff_time]
+            if idxs:
+                screening_target = copy.copy(target)
+                for key in ["years", "values", "time_weights"]:
+                    screening_target[key] = [target[key][i] for i in idxs]
+
+                self.screening_targets.append(screening_target)
+
+        if self.screening_targets:
+            self.screening_end_time = max([max(t["years"]) for t in self.screening_targets])
+
+        self.screening_likelihood = TargetLikelihood(self.screening_targets, self.param_list)
 
     def format_data_as_array(self):
         """
@@ -436,16 +535,22 @@ class Calibration:
         n_chains=1,
         available_time=None,
         grid_info=None,
+        n_starts=1,
+        n_refinements=0,
     ):
         """
         master method to run model calibration.
 
         :param run_mode: string
             either 'autumn_mcmc' or 'lsm' (for least square minimisation using scipy.minimize function)
-        :param n_iterations: number of iterations requested for sampling (excluding burn-in phase)
+        :param n_iterations: number of iterations requested for sampling (excluding burn-in phase),
+            or the number of particles for sequential Monte Carlo
         :param n_burned: number of burned iterations before effective sampling
-        :param n_chains: number of chains to be run
+        :param n_chains: number of chains to be run, ie. the number of temperatures for parallel tempering
         :param available_time: maximal simulation time allowed (in seconds)
+        :param grid_info: the parameter grid to evaluate, for grid based calibration
+        :param n_starts: number of starting points for least squares minimisation
+        :param n_refinements: number of times to refine the grid, for grid based calibration
         """
         self.run_mode = run_mode
         if run_mode not in CalibrationMode.MODES:
@@ -455,17 +560,35 @@ class Calibration:
         # Initialise random seed differently for different chains
         np.random.seed(get_random_seed(self.chain_index))
 
-        # Run the selected fitting algorithm.
-        if run_mode == CalibrationMode.AUTUMN_MCMC:
-            self.run_autumn_mcmc(n_iterations, n_burned, n_chains, available_time)
-        elif run_mode == CalibrationMode.LEAST_SQUARES:
-            self.run_least_squares()
-        elif run_mode == CalibrationMode.GRID_BASED:
-            self.run_grid_based(grid_info)
-
-    def run_least_squares(self):
+        # Run the selected fitting algorithm, writing outputs in the background.
+        self.output_writer = BackgroundWriter(self.output_db_path)
+        try:
+            if run_mode in CalibrationMode.MCMC_MODES:
+                self.run_autumn_mcmc(n_iterations, n_burned, n_chains, available_time)
+            elif run_mode == CalibrationMode.PARALLEL_TEMPERING:
+                self.run_parallel_tempering(n_iterations, n_burned, n_chains, available_time)
+            elif run_mode == CalibrationMode.LEAST_SQUARES:
+                self.run_least_squares(n_starts)
+            elif run_mode == CalibrationMode.GRID_BASED:
+                self.run_grid_based(grid_info, n_refinements)
+            elif run_mode == CalibrationMode.SMC:
+                self.run_smc(n_iterations, available_time)
+        finally:
+            # Make sure all queued outputs are written, even if the calibration fails.
+            self.output_writer.close()
+            self.output_writer = None
+
+        # Index the output tables once all iterations have been written.
+        Database(self.output_db_path).create_indexes()
+
+    def run_least_squares(self, n_starts=1, n_workers=None):
         """
         Run least squares minimization algorithm to calibrate model parameters.
+
+        Gradients are estimated with forward finite differences, and the model runs for each gradient are done
+        in parallel in a pool of worker processes. Every evaluated parameter set is cached, so that a parameter
+        set is never run twice. If more than one start is requested, the minimisation is run from each
+        of a set of Latin hypercube starting points, and the best solution is kept.
         """
         lower_bounds = []
         upper_bounds = []
@@ -483,9 +606,56 @@ class Calibration:
             else:
                 x0.append(lower_bound)
         bounds = Bounds(lower_bounds, upper_bounds)
-
-        sol = minimize(self.loglikelihood, x0, bounds=bounds)
-        self.mle_estimates = sol.x
+        if n_starts > 1:
+            starting_points = sample_starting_params_from_lhs(self.priors, n_starts)
+            x0s = [[p[param_name] for param_name in self.param_list] for p in starting_points]
+        else:
+            x0s = [x0]
+
+        n_workers = n_workers or multiprocessing.cpu_count()
+        evaluated_sums_of_squares = {}
+
+        def evaluate_all(params_list):
+            """
+            Returns the sum of squares for each parameter set, running any that have not been run before.
+            """
+            new_params = [
+                p
+                for p in dict.fromkeys(tuple(p) for p in params_list)
+                if p not in evaluated_sums_of_squares
+            ]
+            for params, sum_of_squares in zip(new_params, pool.map(_evaluate_loglikelihood, new_params)):
+                evaluated_sums_of_squares[params] = sum_of_squares
+                self.record_loglikelihood(list(params), sum_of_squares)
+                self.iter_num += 1
+
+            return [evaluated_sums_of_squares[tuple(p)] for p in params_list]
+
+        def get_sum_of_squares(x):
+            return evaluate_all([x])[0]
+
+        def get_gradient(x):
+            # Run the model for x and a forward step in each parameter, all at the same time.
+            steps = FINITE_DIFFERENCE_STEP * np.where(x >= 0, 1.0, -1.0) * np.maximum(1.0, np.abs(x))
+            stepped_xs = []
+            for i, step in enumerate(steps):
+                if not bounds.lb[i] <= x[i] + step <= bounds.ub[i]:
+                    steps[i] = -step
+
+                stepped_x = x.copy()
+                stepped_x[i] += steps[i]
+                stepped_xs.append(stepped_x)
+
+            sums_of_squares = evaluate_all([x, *stepped_xs])
+            return (np.array(sums_of_squares[1:]) - sums_of_squares[0]) / steps
+
+        with _get_worker_pool(self, n_workers) as pool:
+            solutions = [
+                minimize(get_sum_of_squares, x0, jac=get_gradient, bounds=bounds) for x0 in x0s
+            ]
+
+        best_solution = min(solutions, key=lambda sol: sol.fun)
+        self.mle_estimates = best_solution.x
 
         # FIXME: need to fix dump_mle_params_to_yaml_file
         logger.info("Best solution: %s", self.mle_estimates)
@@ -494,49 +664,128 @@ class Calibration:
     def run_autumn_mcmc(self, n_iterations: int, n_burned: int, n_chains: int, available_time):
         """
         Run our hand-rolled MCMC algoruthm to calibrate model parameters.
+
+        In delayed acceptance mode, each proposal is first screened using a cheap model run that stops
+        partway through the calibration period. Only proposals that pass the screen are run in full,
+        and the second acceptance step corrects for the screen so that the chain targets the exact posterior.
+        Emulated mode works the same way, but screens proposals using a loglikelihood emulator
+        fitted to the parameter sets that have already been run, so screening does not need a model run.
+        The emulator is refitted as new parameter sets are run until the burn-in is over and it has enough
+        parameter sets to make predictions, and then it is frozen. Only the part of the chain that follows
+        targets the exact posterior, since a screen which keeps changing makes the chain adaptive.
         """
         start_time = time()
         if n_chains > 1:
             msg = "Autumn MCMC method does not support multiple-chain runs at the moment."
             raise ValueError(msg)
 
+        is_delayed_acceptance = self.run_mode == CalibrationMode.DELAYED_ACCEPTANCE_MCMC
+        if is_delayed_acceptance:
+            self.setup_screening_targets()
+
+        emulator = None
+        if self.run_mode == CalibrationMode.EMULATED_MCMC:
+            param_scales = [prior_dict["jumping_sd"] for prior_dict in self.priors]
+            emulator = LikelihoodEmulator(self.evaluated_params_ll, param_scales)
+
         self.mcmc_trace = {}  # will store param trace and loglikelihood evolution
         for prior_dict in self.priors:
             self.mcmc_trace[prior_dict["param_name"]] = []
 
         self.mcmc_trace["loglikelihood"] = []
 
+        start_run = 0
         last_accepted_params = None
         last_acceptance_quantity = None  # acceptance quantity is defined as loglike + logprior
         last_acceptance_loglike = None
-        for i_run in range(n_iterations + n_burned):
+        last_screening_quantity = None  # screening quantity is defined as screening loglike + logprior
+        resume_state = self.load_checkpoint() if self.resume else None
+        if resume_state:
+            # Continue the chain from where it was when the checkpoint was saved.
+            start_run = resume_state["next_run"]
+            self.iter_num = resume_state["iter_num"]
+            last_accepted_params = resume_state["last_accepted_params"]
+            last_acceptance_quantity = resume_state["last_acceptance_quantity"]
+            last_acceptance_loglike = resume_state["last_acceptance_loglike"]
+            last_screening_quantity = resume_state.get("last_screening_quantity")
+            for prior_dict, jumping_sd in zip(self.priors, resume_state["jumping_sds"]):
+                prior_dict["jumping_sd"] = jumping_sd
+
+            np.random.set_state(resume_state["random_state"])
+
+            # Remove any outputs stored after the checkpoint, since those iterations will be re-run.
+            delete_runs(self.output_db_path, self.iter_num)
+            self.load_chain_history()
+            emulator_max_evaluations = resume_state.get("emulator_max_evaluations")
+            if emulator and emulator_max_evaluations is not None:
+                emulator.freeze(emulator_max_evaluations)
+
+            logger.info(f"Resuming MCMC chain from iteration {start_run}.")
+        elif self.resume:
+            # The chain stopped before its first checkpoint, so start again from the first iteration.
+            delete_runs(self.output_db_path, 0)
+
+        last_checkpoint_time = time()
+        for i_run in range(start_run, n_iterations + n_burned):
+            # Stop refitting the emulator once the burn-in is over, so that the screen no longer changes.
+            if emulator and not emulator.is_frozen and i_run >= n_burned:
+                emulator.update()
+                if emulator.is_ready:
+                    emulator.freeze()
+                    logger.info(f"Froze the loglikelihood emulator at iteration {i_run}.")
+
             # Propose new paramameter set.
             proposed_params = self.propose_new_params(last_accepted_params)
 
-            # Evaluate log-likelihood.
-            proposed_loglike = self.loglikelihood(proposed_params)
-
             # Evaluate log-prior.
             proposed_logprior = self.logprior(proposed_params)
 
-            # Decide acceptance.
-            proposed_acceptance_quantity = proposed_loglike + proposed_logprior
-            accept = False
-            is_auto_accept = (
-                last_acceptance_quantity is None
-                or proposed_acceptance_quantity >= last_acceptance_quantity
-            )
-            if is_auto_accept:
-                accept = True
+            # Screen the proposal with a cheap model run, if using delayed acceptance.
+            is_screened_out = False
+            screening_ratio = 0.0
+            if is_delayed_acceptance:
+                proposed_screening_loglike = self.screening_loglikelihood(proposed_params)
+                proposed_screening_quantity = proposed_screening_loglike + proposed_logprior
+                if last_screening_quantity is not None:
+                    screening_ratio = proposed_screening_quantity - last_screening_quantity
+                    is_screened_out = not is_accepted(screening_ratio)
+
+            elif emulator and last_accepted_params is not None:
+                # Compare the emulated loglikelihoods of the proposal and the current state.
+                emulated_loglikes = emulator.predict([proposed_params, last_accepted_params])
+                if emulated_loglikes is not None:
+                    last_logprior = self.logprior(last_accepted_params)
+                    screening_ratio = (emulated_loglikes[0] + proposed_logprior) - (
+                        emulated_loglikes[1] + last_logprior
+                    )
+                    is_screened_out = not is_accepted(screening_ratio)
+
+            if is_screened_out:
+                # Reject the proposal without running the full model.
+                proposed_loglike = np.nan
+                accept = False
             else:
-                accept_prob = np.exp(proposed_acceptance_quantity - last_acceptance_quantity)
-                accept = np.random.binomial(n=1, p=accept_prob, size=1) > 0
+                # Evaluate log-likelihood.
+                proposed_loglike = self.loglikelihood(proposed_params)
+
+                # Decide acceptance.
+                proposed_acceptance_quantity = proposed_loglike + proposed_logprior
+                if last_acceptance_quantity is None:
+                    accept = True
+                else:
+                    acceptance_ratio = proposed_acceptance_quantity - last_acceptance_quantity
+                    # Correct for the screening step, if there was one.
+                    acceptance_ratio -= screening_ratio
+
+                    accept = is_accepted(acceptance_ratio)
 
             # Update stored quantities.
             if accept:
                 last_accepted_params = proposed_params
                 last_acceptance_quantity = proposed_acceptance_quantity
                 last_acceptance_loglike = proposed_loglike
+                if is_delayed_acceptance:
+                    last_screening_quantity = proposed_screening_quantity
 
             self.update_mcmc_trace(last_accepted_params, last_acceptance_loglike)
 
@@ -549,6 +798,19 @@ class Calibration:
             iters_completed = i_run + 1
             logger.info(f"{iters_completed} MCMC iterations completed.")
 
+            checkpoint = {
+                "next_run": iters_completed,
+                "iter_num": self.iter_num,
+                "last_accepted_params": last_accepted_params,
+                "last_acceptance_quantity": last_acceptance_quantity,
+                "last_acceptance_loglike": last_acceptance_loglike,
+                "last_screening_quantity": last_screening_quantity,
+                "emulator_max_evaluations": emulator.max_evaluations if emulator else None,
+            }
+            if time() - last_checkpoint_time > CHECKPOINT_SECONDS:
+                self.save_checkpoint(checkpoint)
+                last_checkpoint_time = time()
+
             if available_time:
                 # Stop iterating if we have run out of time.
                 elapsed_time = time() - start_time
@@ -557,37 +819,365 @@ class Calibration:
                     logger.info(msg)
                     break
 
-    def run_grid_based(self, grid_info):
+        if start_run < n_iterations + n_burned:
+            self.save_checkpoint(checkpoint)
+
+    def save_checkpoint(self, checkpoint: dict):
+        """
+        Saves the state of the MCMC chain, so that it can be resumed later.
+        All outputs up to the checkpoint are written to the database first, so that they match the checkpoint.
+        The chain's history is not saved, since it is read back from the database, see load_chain_history.
+        """
+        if self.output_writer:
+            self.output_writer.flush()
+
+        checkpoint = {
+            **checkpoint,
+            "jumping_sds": [prior_dict["jumping_sd"] for prior_dict in self.priors],
+            "random_state": np.random.get_state(),
+        }
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def load_chain_history(self):
+        """
+        Rebuilds the MCMC trace and the evaluated loglikelihoods from the MCMC runs in the output database.
+        """
+        db = Database(self.output_db_path)
+        if "mcmc_run" not in db.table_names():
+            return
+
+        mcmc_df = db.query("mcmc_run")
+        run_idxs = mcmc_df["idx"].str[len("run_") :].astype(int)
+        mcmc_df = mcmc_df.iloc[np.argsort(run_idxs.to_numpy(), kind="stable")]
+        last_params, last_loglike = None, None
+        for _, row in mcmc_df.iterrows():
+            params = [row[param_name] for param_name in self.param_list]
+            if not np.isnan(row["loglikelihood"]):
+                self.evaluated_params_ll.append((params, row["loglikelihood"]))
+
+            if row["accept"]:
+                last_params, last_loglike = params, row["loglikelihood"]
+
+            self.update_mcmc_trace(last_params, last_loglike)
+
+    def load_checkpoint(self):
+        """
+        Returns the saved state of the MCMC chain, or None if there is no checkpoint.
+        """
+        try:
+            with open(self.checkpoint_path, "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+
+    def run_parallel_tempering(
+        self, n_iterations: int, n_burned: int, n_chains: int, available_time, n_workers=None
+    ):
+        """
+        Run a population of MCMC chains at different temperatures, with swaps between neighbouring chains.
+
+        The chain at temperature 1 samples from the posterior, and is the only one stored in mcmc_run.
+        Hotter chains sample from a flattened posterior, so they move between modes more easily,
+        and swaps pass these moves down to the colder chains. The model runs for each chain's proposal
+        are done at the same time in a pool of worker processes.
+        Acceptance and swap statistics for each temperature are stored in the mcmc_tempering table.
+        """
+        start_time = time()
+        temperatures = get_temperature_ladder(n_chains)
+        self.mcmc_trace = {prior_dict["param_name"]: [] for prior_dict in self.priors}
+        self.mcmc_trace["loglikelihood"] = []
+
+        # Current params, loglikelihood, logprior and model outputs of each chain.
+        states = [None] * n_chains
+        n_accepted = [0] * n_chains
+        n_swaps_proposed = [0] * n_chains
+        n_swaps_accepted = [0] * n_chains
+        n_workers = n_workers or min(n_chains, multiprocessing.cpu_count())
+        with _get_worker_pool(self, n_workers) as pool:
+            for i_run in range(n_iterations + n_burned):
+                # Propose and run new parameters for every chain at once.
+                proposals = [
+                    self.propose_new_params(
+                        state[0] if state else None, jumping_sd_multiplier=np.sqrt(temperature),
+                    )
+                    for state, temperature in zip(states, temperatures)
+                ]
+                evaluations = pool.map(
+                    _evaluate_loglikelihood_and_outputs, [tuple(p) for p in proposals]
+                )
+                loglikes, model_outputs = zip(*evaluations)
+
+                # Decide acceptance for each chain, with a tempered likelihood.
+                for i_chain, temperature in enumerate(temperatures):
+                    proposed_params, proposed_loglike = proposals[i_chain], loglikes[i_chain]
+                    self.record_loglikelihood(proposed_params, proposed_loglike)
+                    proposed_logprior = self.logprior(proposed_params)
+                    state = states[i_chain]
+                    if state is None:
+                        accept = True
+                    else:
+                        acceptance_ratio = (proposed_loglike - state[1]) / temperature + (
+                            proposed_logprior - state[2]
+                        )
+                        accept = is_accepted(acceptance_ratio)
+
+                    if accept:
+                        states[i_chain] = (
+                            proposed_params,
+                            proposed_loglike,
+                            proposed_logprior,
+                            model_outputs[i_chain],
+                        )
+                        n_accepted[i_chain] += 1
+
+                    if i_chain == 0:
+                        cold_params, cold_loglike, is_cold_accepted = (
+                            proposed_params,
+                            proposed_loglike,
+                            accept,
+                        )
+
+                # Propose a swap between a random pair of neighbouring chains.
+                if n_chains > 1:
+                    i_chain = np.random.randint(n_chains - 1)
+                    n_swaps_proposed[i_chain] += 1
+                    beta_diff = 1.0 / temperatures[i_chain] - 1.0 / temperatures[i_chain + 1]
+                    loglike_diff = states[i_chain + 1][1] - states[i_chain][1]
+                    if is_accepted(beta_diff * loglike_diff):
+                        states[i_chain], states[i_chain + 1] = states[i_chain + 1], states[i_chain]
+                        n_swaps_accepted[i_chain] += 1
+                        if i_chain == 0:
+                            # The cold chain has moved to a new state, so record that as accepted.
+                            cold_params, cold_loglike, _, _ = states[0]
+                            is_cold_accepted = True
+
+                # Store the cold chain.
+                self.update_mcmc_trace(states[0][0], states[0][1])
+                self.store_mcmc_iteration_info(cold_params, cold_loglike, is_cold_accepted, i_run)
+                if is_cold_accepted:
+                    # The model was run in a worker process, which returned its outputs.
+                    self.store_model_outputs(states[0][3])
+
+                self.iter_num += 1
+                iters_completed = i_run + 1
+                logger.info(f"{iters_completed} parallel tempering iterations completed.")
+                if available_time and time() - start_time > available_time:
+                    msg = f"Stopping parallel tempering after {iters_completed} iterations because of {available_time}s time limit"
+                    logger.info(msg)
+                    break
+
+        tempering_df = pd.DataFrame(
+            {
+                "temperature": temperatures,
+                "n_iterations": self.iter_num,
+                "n_accepted": n_accepted,
+                "n_swaps_proposed": n_swaps_proposed,
+                "n_swaps_accepted": n_swaps_accepted,
+            }
+        )
+        tempering_df["acceptance_rate"] = tempering_df["n_accepted"] / self.iter_num
+        self.store_table(tempering_df, "mcmc_tempering")
+
+    def run_smc(self, n_particles: int, available_time=None, n_workers=None):
+        """
+        Run a sequential Monte Carlo calibration, which moves a population of particles from the prior
+        to the posterior through a sequence of tempered posteriors.
+
+        At each step the likelihood's inverse temperature is raised as far as possible while keeping
+        the effective sample size above SMC_ESS_FRACTION of the particles. The particles are then
+        resampled and moved with a few MCMC steps, using jumping sds based on the spread of the particles.
+        Each generation of particles is run at the same time in a pool of worker processes.
+
+        The final particles are stored in mcmc_run, with the first copy of each distinct particle
+        stored as accepted and any duplicates as rejected runs straight after it, so that its weight
+        is the number of copies. No burn-in should be applied to these runs.
+        Statistics for each tempering step are stored in the smc_stages table.
+        """
+        start_time = time()
+        n_params = len(self.param_list)
+        starting_params = sample_starting_params_from_lhs(self.priors, n_particles)
+        particles = [
+            [sp[prior_dict["param_name"]] for prior_dict in self.priors] for sp in starting_params
+        ]
+        stages = []
+        n_workers = n_workers or multiprocessing.cpu_count()
+        with _get_worker_pool(self, n_workers) as pool:
+
+            def evaluate_particles(params_list):
+                loglikes = list(pool.map(_evaluate_loglikelihood, [tuple(p) for p in params_list]))
+                for params, loglike in zip(params_list, loglikes):
+                    self.record_loglikelihood(params, loglike)
+
+                loglikes = np.array(loglikes, dtype=float)
+                return np.where(np.isfinite(loglikes), loglikes, -np.inf)
+
+            loglikes = evaluate_particles(particles)
+            logpriors = np.array([self.logprior(p) for p in particles])
+            beta = 0.0
+            while beta < 1.0:
+                is_time_up = available_time and time() - start_time > available_time
+                if is_time_up:
+                    logger.info(f"Finishing SMC because of {available_time}s time limit")
+                    next_beta = 1.0
+                else:
+                    next_beta = find_next_inverse_temperature(
+                        loglikes, beta, SMC_ESS_FRACTION * n_particles
+                    )
+
+                # Reweight the particles for the new temperature, then resample them.
+                weights = get_normalised_weights((next_beta - beta) * loglikes)
+                ess = 1.0 / np.sum(weights ** 2)
+                beta = next_beta
+                idxs = resample_particles(weights)
+                particles = [list(particles[i]) for i in idxs]
+                loglikes, logpriors = loglikes[idxs], logpriors[idxs]
+
+                # Move the particles, with jumping sds scaled to the spread of the particles.
+                jumping_sds = 2.38 / np.sqrt(n_params) * np.std(particles, axis=0)
+                prior_jumping_sds = [prior_dict["jumping_sd"] for prior_dict in self.priors]
+                jumping_sds = np.where(jumping_sds > 0, jumping_sds, prior_jumping_sds)
+                n_moves = 0 if is_time_up else SMC_N_MOVES
+                n_accepted = 0
+                for _ in range(n_moves):
+                    proposals = [
+                        self.propose_new_params(p, jumping_sds=jumping_sds) for p in particles
+                    ]
+                    proposed_loglikes = evaluate_particles(proposals)
+                    for i, proposed_params in enumerate(proposals):
+                        proposed_logprior = self.logprior(proposed_params)
+                        acceptance_ratio = beta * (proposed_loglikes[i] - loglikes[i]) + (
+                            proposed_logprior - logpriors[i]
+                        )
+                        if is_accepted(acceptance_ratio):
+                            particles[i] = proposed_params
+                            loglikes[i], logpriors[i] = proposed_loglikes[i], proposed_logprior
+                            n_accepted += 1
+
+                stages.append(
+                    {
+                        "inverse_temperature": beta,
+                        "ess": ess,
+                        "n_moves": n_moves,
+                        "acceptance_rate": n_accepted / (n_moves * n_particles) if n_moves else 0.0,
+                    }
+                )
+                logger.info(f"SMC step {len(stages)} completed, at inverse temperature {beta:.4f}.")
+
+            # Re-run each distinct final particle in the pool, to get the model outputs to store.
+            distinct_particles = list(dict.fromkeys(tuple(p) for p in particles))
+            evaluations = pool.map(_evaluate_loglikelihood_and_outputs, distinct_particles)
+            particle_outputs = {
+                params: model_outputs
+                for params, (_, model_outputs) in zip(distinct_particles, evaluations)
+            }
+
+        # Store the final particles, with each duplicate adding to the weight of the first copy.
+        self.mcmc_trace = {prior_dict["param_name"]: [] for prior_dict in self.priors}
+        self.mcmc_trace["loglikelihood"] = []
+        order = sorted(range(n_particles), key=lambda i: tuple(particles[i]))
+        prev_params = None
+        for i in order:
+            params, loglike = particles[i], loglikes[i]
+            is_new_particle = params != prev_params
+            self.update_mcmc_trace(params, loglike)
+            self.store_mcmc_iteration_info(params, loglike, is_new_particle, self.iter_num)
+            if is_new_particle:
+                self.store_model_outputs(particle_outputs[tuple(params)])
+
+            prev_params = params
+            self.iter_num += 1
+
+        self.store_table(pd.DataFrame(stages), "smc_stages")
+
+    def run_grid_based(self, grid_info, n_refinements=0, n_workers=None):
         """
         Runs a grid-based calibration
+        Grid points are run in parallel in a pool of worker processes, and stored as they are completed.
+        Grid points that are already stored in the output database are skipped, so that an interrupted
+        calibration can be resumed. The grid can then be refined around the best grid point found so far.
         :param grid_info: list of dictionaries
             containing the list of parameters to vary, their range and the number of different values per parameter
+        :param n_refinements: number of times to refine the grid around the best grid point
+        :param n_workers: number of worker processes
         """
         new_param_list = [par_dict["param_name"] for par_dict in grid_info]
         assert all([p in self.param_list for p in new_param_list])
 
         self.param_list = new_param_list
+        self.target_likelihood = TargetLikelihood(self.targeted_outputs, self.param_list)
+
+        evaluated_points = self.read_evaluated_grid_points()
+        logger.info(f"Found {len(evaluated_points)} grid points already evaluated.")
+        n_workers = n_workers or multiprocessing.cpu_count()
+        with _get_worker_pool(self, n_workers) as pool:
+            for _ in range(n_refinements + 1):
+                param_values = []
+                for i, param_name in enumerate(self.param_list):
+                    param_values.append(
+                        list(
+                            np.linspace(
+                                grid_info[i]["lower"], grid_info[i]["upper"], grid_info[i]["n"]
+                            )
+                        )
+                    )
 
-        param_values = []
-        for i, param_name in enumerate(self.param_list):
-            param_values.append(
-                list(np.linspace(grid_info[i]["lower"], grid_info[i]["upper"], grid_info[i]["n"]))
-            )
-
-        all_combinations = list(product(*param_values))
-        logger.info("Total number of iterations: " + str(len(all_combinations)))
-        for params in all_combinations:
-            loglike = self.loglikelihood(params)
-            logprior = self.logprior(params)
-            a_posteriori_logproba = loglike + logprior
-
-            self.store_mcmc_iteration_info(params, a_posteriori_logproba, False, self.iter_num)
-            self.iter_num += 1
+                num_points = np.prod([len(values) for values in param_values])
+                logger.info("Total number of iterations: " + str(num_points))
+                new_points = (
+                    params
+                    for params in product(*param_values)
+                    if get_grid_key(params) not in evaluated_points
+                )
+                while True:
+                    batch = list(islice(new_points, GRID_BATCH_SIZE))
+                    if not batch:
+                        break
+
+                    for params, loglike in zip(batch, pool.map(_evaluate_loglikelihood, batch)):
+                        self.record_loglikelihood(list(params), loglike)
+                        logprior = self.logprior(params)
+                        a_posteriori_logproba = loglike + logprior
+                        self.store_mcmc_iteration_info(
+                            params, a_posteriori_logproba, False, self.iter_num
+                        )
+                        evaluated_points[get_grid_key(params)] = a_posteriori_logproba
+                        self.iter_num += 1
+
+                # Zoom in on the best grid point found so far.
+                best_params = max(evaluated_points, key=evaluated_points.get)
+                grid_info = refine_grid(grid_info, best_params)
+
+    def read_evaluated_grid_points(self):
+        """
+        Returns the grid points already stored in the output database, with their posterior logprobability.
+        Also moves the iteration counter past the stored runs.
+        """
+        db = Database(self.output_db_path)
+        if "mcmc_run" not in db.table_names():
+            return {}
+
+        mcmc_run_df = db.query("mcmc_run")
+        if mcmc_run_df.empty or not all([p in mcmc_run_df.columns for p in self.param_list]):
+            return {}
+
+        run_idxs = mcmc_run_df["idx"].str.split("_").str[1].astype(int)
+        self.iter_num = max(self.iter_num, run_idxs.max() + 1)
+        grid_points = mcmc_run_df[self.param_list].itertuples(index=False, name=None)
+        return {
+            get_grid_key(params): logproba
+            for params, logproba in zip(grid_points, mcmc_run_df["loglikelihood"])
+        }
 
-    def propose_new_params(self, prev_params):
+    def propose_new_params(self, prev_params, jumping_sd_multiplier=1.0, jumping_sds=None):
         """
         calculated the joint log prior
         :param prev_params: last accepted parameter values as a list ordered using the order of self.priors
+        :param jumping_sd_multiplier: scales the jumping sd of every parameter
+        :param jumping_sds: jumping sd of each parameter, used instead of the priors' jumping sds
         :return: a new list of parameter values
         """
         # prev_params assumed to be the manually calibrated parameters for first step
@@ -603,8 +1193,9 @@ class Calibration:
             sample = lower_bound - 10.0  # deliberately initialise out of parameter scope
             n_attempts = 0
             while not lower_bound <= sample <= upper_bound:
+                jumping_sd = jumping_sds[i] if jumping_sds is not None else prior_dict["jumping_sd"]
                 sample = np.random.normal(
-                    loc=prev_params[i], scale=prior_dict["jumping_sd"], size=1
+                    loc=prev_params[i], scale=jumping_sd_multiplier * jumping_sd, size=1
                 )[0]
                 n_attempts += 1
                 if n_attempts > 1.0e5:
@@ -653,6 +1244,133 @@ class Calibration:
             yaml.dump(dict_to_dump, outfile, default_flow_style=False)
 
 
+_worker_calibration = None
+
+
+def _get_worker_pool(calibration: Calibration, n_workers: int) -> futures.ProcessPoolExecutor:
+    """
+    Returns a pool of worker processes which evaluate loglikelihoods for the calibration.
+    The calibration is set before the pool is created, so that the forked worker processes inherit it.
+    """
+    global _worker_calibration
+    _worker_calibration = calibration
+    return futures.ProcessPoolExecutor(max_workers=n_workers)
+
+
+def _evaluate_loglikelihood(params: tuple):
+    best_ll, _ = _worker_calibration.evaluate_loglikelihood(list(params))
+    return best_ll
+
+
+def _evaluate_loglikelihood_and_outputs(params: tuple):
+    """
+    Returns the loglikelihood for a set of params and the outputs of the model run, so they can be stored.
+    """
+    best_ll, _ = _worker_calibration.evaluate_loglikelihood(list(params))
+    model = _worker_calibration.latest_scenario.model
+    model.calculate_derived_outputs()
+    return best_ll, ModelOutputs.from_model(model)
+
+
+def get_temperature_ladder(n_chains: int) -> List[float]:
+    """
+    Returns geometrically spaced temperatures for parallel tempering, starting at 1.
+    """
+    if n_chains == 1:
+        return [1.0]
+
+    return [MAX_TEMPERATURE ** (i / (n_chains - 1)) for i in range(n_chains)]
+
+
+def find_next_inverse_temperature(loglikes: np.ndarray, beta: float, target_ess: float) -> float:
+    """
+    Returns the largest inverse temperature, up to 1, for which the effective sample size
+    of the reweighted particles is at least the target, found by bisection.
+    """
+
+    def get_ess(next_beta):
+        weights = get_normalised_weights((next_beta - beta) * loglikes)
+        return 1.0 / np.sum(weights ** 2)
+
+    if get_ess(1.0) >= target_ess:
+        return 1.0
+
+    lower, upper = beta, 1.0
+    for _ in range(50):
+        mid = 0.5 * (lower + upper)
+        if get_ess(mid) >= target_ess:
+            lower = mid
+        else:
+            upper = mid
+
+    # Always make some progress, even if a single particle dominates.
+    return max(lower, beta + 1e-6)
+
+
+def get_normalised_weights(log_weights: np.ndarray) -> np.ndarray:
+    """
+    Returns weights which sum to 1, given unnormalised log weights.
+    """
+    log_weights = np.where(np.isfinite(log_weights), log_weights, -np.inf)
+    weights = np.exp(log_weights - special.logsumexp(log_weights))
+    return weights / weights.sum()
+
+
+def resample_particles(weights: np.ndarray) -> np.ndarray:
+    """
+    Returns the indices of the resampled particles, using systematic resampling.
+    """
+    n_particles = len(weights)
+    positions = (np.random.random() + np.arange(n_particles)) / n_particles
+    cumulative_weights = np.cumsum(weights)
+    cumulative_weights[-1] = 1.0
+    return np.searchsorted(cumulative_weights, positions)
+
+
+def get_grid_key(params) -> tuple:
+    """
+    Returns a key to identify a grid point, robust to floating point noise.
+    """
+    return tuple(round(float(value), GRID_PRECISION) for value in params)
+
+
+def refine_grid(grid_info: List[dict], best_params: tuple) -> List[dict]:
+    """
+    Returns a finer grid, with the same number of points per parameter,
+    spanning one grid step either side of the best grid point.
+    """
+    refined_grid_info = []
+    for par_dict, best_value in zip(grid_info, best_params):
+        par_dict = copy.copy(par_dict)
+        if par_dict["n"] > 1:
+            step = (par_dict["upper"] - par_dict["lower"]) / (par_dict["n"] - 1)
+            par_dict["lower"] = max(par_dict["lower"], best_value - step)
+            par_dict["upper"] = min(par_dict["upper"], best_value + step)
+
+        refined_grid_info.append(par_dict)
+
+    return refined_grid_info
+
+
+def is_accepted(log_acceptance_ratio: float) -> bool:
+    """
+    Metropolis-Hastings acceptance step, given the log of the acceptance ratio.
+    """
+    if log_acceptance_ratio >= 0:
+        return True
+
+    accept_prob = np.exp(log_acceptance_ratio)
+    return np.random.binomial(n=1, p=accept_prob, size=1) > 0
+
+
+def find_latest_output_dir(project_dir: str, run_hash: str):
+    """
+    Returns the most recent output dir for a calibration run, or None if there isn't one.
+    """
+    output_dirs = glob.glob(os.path.join(project_dir, f"{run_hash}-*"))
+    return max(output_dirs, key=os.path.getmtime) if output_dirs else None
+
+
 def get_random_seed(chain_index: int):
     """
     Get a random seed for the calibration.
@@ -0,0 +1,103 @@
+"""
+Emulation of the loglikelihood, based on previously evaluated parameter sets.
+"""
+from typing import List, Optional
+
+import numpy as np
+
+# Min number of evaluated parameter sets needed before the emulator makes predictions.
+EMULATOR_MIN_POINTS = 20
+# Number of nearest evaluated parameter sets used for each prediction.
+EMULATOR_NEIGHBOURS = 20
+
+
+class LikelihoodEmulator:
+    """
+    Predicts the loglikelihood of parameter sets using a local linear regression,
+    fitted to the nearest parameter sets that have already been evaluated with the full model.
+
+    The emulator reads the calibration's list of (params, loglikelihood) pairs,
+    and picks up new evaluations as they are appended to that list, until it is frozen.
+    Parameter distances are measured in units of each parameter's scale, eg. its proposal jumping sd.
+    """
+
+    def __init__(
+        self,
+        evaluated_params_ll: List[tuple],
+        param_scales: List[float],
+        min_points=EMULATOR_MIN_POINTS,
+        n_neighbours=EMULATOR_NEIGHBOURS,
+    ):
+        self.evaluated_params_ll = evaluated_params_ll
+        self.param_scales = np.array(param_scales, dtype=float)
+        self.min_points = min_points
+        self.n_neighbours = n_neighbours
+        self.n_read = 0
+        self.max_evaluations = None  # set when the emulator is frozen
+        self.xs = np.zeros((0, len(param_scales)))
+        self.lls = np.zeros(0)
+
+    @property
+    def is_ready(self) -> bool:
+        """
+        Returns True if enough parameter sets have been read to make predictions.
+        """
+        return len(self.lls) >= self.min_points
+
+    @property
+    def is_frozen(self) -> bool:
+        return self.max_evaluations is not None
+
+    def freeze(self, max_evaluations=None):
+        """
+        Stops the emulator from reading any more evaluated parameter sets, so that its predictions no longer change.
+        By default it keeps the parameter sets it has read so far.
+        """
+        self.max_evaluations = self.n_read if max_evaluations is None else max_evaluations
+        self.update()
+
+    def update(self):
+        """
+        Reads any parameter sets that have been evaluated since the last update.
+        """
+        new_evaluations = self.evaluated_params_ll[self.n_read : self.max_evaluations]
+        self.n_read += len(new_evaluations)
+        new_evaluations = [(p, ll) for p, ll in new_evaluations if np.isfinite(ll)]
+        if new_evaluations:
+            new_xs = np.array([p for p, _ in new_evaluations], dtype=float) / self.param_scales
+            new_lls = np.array([ll for _, ll in new_evaluations], dtype=float)
+            self.xs = np.vstack([self.xs, new_xs])
+            self.lls = np.concatenate([self.lls, new_lls])
+
+    def predict(self, params_list: List[list]) -> Optional[np.ndarray]:
+        """
+        Returns the predicted loglikelihood for each parameter set,
+        or None if not enough parameter sets have been evaluated yet.
+        """
+        self.update()
+        if not self.is_ready:
+            return None
+
+        return np.array([self.predict_one(params) for params in params_list])
+
+    def predict_one(self, params: list) -> float:
+        x = np.array(params, dtype=float) / self.param_scales
+        offsets = self.xs - x
+        distances = np.sqrt((offsets ** 2).sum(axis=1))
+        n_neighbours = min(self.n_neighbours, len(distances))
+        idxs = np.argpartition(distances, n_neighbours - 1)[:n_neighbours]
+
+        # Weight neighbours with a tricube kernel, with a bandwidth just wider than the furthest neighbour.
+        bandwidth = 1.01 * distances[idxs].max() + 1e-12
+        weights = (1 - (distances[idxs] / bandwidth) ** 3) ** 3
+        if n_neighbours <= offsets.shape[1] + 1:
+            # Not enough neighbours to fit a plane, use a weighted average instead.
+            return float(np.average(self.lls[idxs], weights=weights))
+
+        # Fit a weighted plane through the neighbours, centred on the parameter set.
+        sqrt_weights = np.sqrt(weights)
+        design = np.hstack([np.ones((n_neighbours, 1)), offsets[idxs]])
+        coeffs, *_ = np.linalg.lstsq(
+            design * sqrt_weights[:, None], self.lls[idxs] * sqrt_weights, rcond=None
+        )
+        return float(coeffs[0])
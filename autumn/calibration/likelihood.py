@@ -0,0 +1,137 @@
+"""
+Log-likelihood of model outputs, given a set of calibration targets.
+"""
+from typing import List
+
+import numpy as np
+from scipy import special
+
+NORMAL = "normal"
+POISSON = "poisson"
+NEGATIVE_BINOMIAL = "negative_binomial"
+DISTRIBUTIONS = [NORMAL, POISSON, NEGATIVE_BINOMIAL]
+
+
+class TargetLikelihood:
+    """
+    Calculates the loglikelihood (or sum of squares) of model outputs against calibration targets.
+    The target data, time weights and distribution settings are compiled into arrays once,
+    so that each evaluation only needs a few array operations per target.
+    """
+
+    def __init__(self, targeted_outputs: List[dict], param_list: List[str]):
+        self.targets = [CompiledTarget(target, param_list) for target in targeted_outputs]
+
+    def evaluate(
+        self,
+        params: list,
+        model_times: list,
+        derived_outputs: dict,
+        generated_outputs: dict,
+        is_least_squares=False,
+        time_shift=0,
+    ) -> float:
+        """
+        Returns the loglikelihood of the model outputs, or the weighted sum of squares
+        if this is a least squares calibration.
+        """
+        ll = 0
+        times = np.asarray(model_times)
+        for target in self.targets:
+            if target.key in generated_outputs:
+                model_output = np.asarray(generated_outputs[target.key], dtype=float)
+            else:
+                time_idxs = target.get_time_indices(times, time_shift)
+                model_output = np.asarray(derived_outputs[target.key], dtype=float)[time_idxs]
+
+            if is_least_squares:
+                ll += np.sum(target.weights * (target.data - model_output) ** 2)
+            else:
+                ll += target.loglikelihood(params, model_output)
+
+        return ll
+
+
+class CompiledTarget:
+    """
+    A single calibration target, with its data and settings stored as arrays.
+    """
+
+    def __init__(self, target: dict, param_list: List[str]):
+        self.key = target["output_key"]
+        self.distribution = target.get("loglikelihood_distri", NORMAL)
+        if self.distribution not in DISTRIBUTIONS:
+            raise ValueError("Distribution not supported in loglikelihood_distri")
+
+        self.years = np.array(target["years"], dtype=float)
+        self.data = np.array(target["values"], dtype=float)
+        self.weights = np.array(target["time_weights"], dtype=float)
+        self.sd = target.get("sd")
+
+        # Position of this target's dispersion parameter in the calibrated params, if it is calibrated.
+        dispersion_param = self.key + "_dispersion_param"
+        if dispersion_param in param_list:
+            self.dispersion_idx = param_list.index(dispersion_param)
+        else:
+            self.dispersion_idx = None
+
+        # Pre-compute terms which only depend on the target data.
+        self.counts = np.round(self.data)
+        self.log_count_factorials = special.gammaln(self.counts + 1)
+
+        # Time indices of the target years, cached for each set of model times.
+        self._time_idxs_cache = {}
+
+    def get_time_indices(self, times: np.ndarray, time_shift=0):
+        """
+        Returns the indices of the target years in the model times.
+        """
+        cache_key = (times[0], times[-1], len(times), time_shift)
+        try:
+            return self._time_idxs_cache[cache_key]
+        except KeyError:
+            pass
+
+        years = self.years - time_shift
+        time_idxs = np.searchsorted(times, years)
+        is_missing = (time_idxs >= len(times)) | (times[np.minimum(time_idxs, len(times) - 1)] != years)
+        if is_missing.any():
+            missing_years = years[is_missing].tolist()
+            raise ValueError(f"Target {self.key} years {missing_years} are not model times.")
+
+        self._time_idxs_cache[cache_key] = time_idxs
+        return time_idxs
+
+    def loglikelihood(self, params: list, model_output: np.ndarray) -> float:
+        if self.distribution == NORMAL:
+            if self.dispersion_idx is not None:
+                sd = params[self.dispersion_idx]
+            else:
+                sd = self.sd
+
+            squared_distance = (self.data - model_output) ** 2
+            return -(0.5 / sd ** 2) * np.sum(self.weights * squared_distance)
+
+        elif self.distribution == POISSON:
+            ll = (
+                special.xlogy(self.counts, np.abs(model_output))
+                - model_output
+                - self.log_count_factorials
+            )
+            return np.sum(self.weights * ll)
+
+        elif self.distribution == NEGATIVE_BINOMIAL:
+            # We use the parameterisation based on mean and variance and assume define var=mean**delta.
+            # The dispersion parameter n varies during the MCMC, and the success probability is chosen
+            # so that the distribution mean matches the model output.
+            assert self.dispersion_idx is not None, f"{self.key}_dispersion_param must be calibrated."
+            n = params[self.dispersion_idx]
+            success_prob = n / (model_output + n)
+            ll = (
+                special.gammaln(self.counts + n)
+                - special.gammaln(n)
+                - self.log_count_factorials
+                + n * np.log(success_prob)
+                + special.xlog1py(self.counts, -success_prob)
+            )
+            return np.sum(self.weights * ll)
@@ -2,23 +2,37 @@
 Calculates the model outputs for all scenarios for a set of MCMC calibration outputs.
 """
 import logging
+import multiprocessing
+from concurrent import futures
+from typing import List
+
 from autumn.db import Database
+from autumn.tool_kit import run_cache
 from autumn.tool_kit.params import update_params
-from autumn.tool_kit.scenarios import Scenario
+from autumn.tool_kit.scenarios import (
+    ModelOutputs,
+    get_scenario_worker_pool,
+    get_worker_scenario,
+    run_forked_scenarios,
+)
 from autumn.tool_kit.timer import Timer
 from autumn.db.models import store_run_models
 
 
 META_COLS = ["idx", "Scenario", "loglikelihood", "accept"]
+# Max number of runs waiting to be run or stored, for each worker process.
+MAX_RUNS_IN_FLIGHT_PER_WORKER = 2
 
 logger = logging.getLogger(__name__)
 
 
 def run_full_models_for_mcmc(
-    burn_in: int, src_db_path: str, dest_db_path: str, build_model, params: dict
+    burn_in: int, src_db_path: str, dest_db_path: str, build_model, params: dict, n_workers=None
 ):
     """
     Run the full baseline model and all scenarios for all accepted MCMC runs in src db.
+    The accepted runs are distributed across a pool of worker processes,
+    and their outputs are stored as they are completed.
     """
     src_db = Database(src_db_path)
     dest_db = Database(dest_db_path)
@@ -33,38 +47,88 @@ def run_full_models_for_mcmc(
     dest_db.dump_df("mcmc_run", mcmc_run_df)
 
     mcmc_runs = list(mcmc_run_df.T.to_dict().values())
+    accepted_runs = []
     for mcmc_run in mcmc_runs:
         meta = {k: v for k, v in mcmc_run.items() if k in META_COLS}
         if not meta["accept"]:
             logger.info("Ignoring non-accepted MCMC run %s", meta["idx"])
             continue
 
-        logger.info("Running full model for MCMC run %s", meta["idx"])
         param_updates = {k: v for k, v in mcmc_run.items() if k not in META_COLS}
-
         run_idx = meta["idx"].split("_")[-1]
+        accepted_runs.append((run_idx, param_updates))
+
+    n_workers = n_workers or multiprocessing.cpu_count()
+    with get_scenario_worker_pool(build_model, params, n_workers) as pool:
+        use_cache = True
+        if accepted_runs:
+            # Run the first accepted run on its own, to find how big the runs are.
+            # Only cache the other runs if they all fit in the run cache, otherwise none of them would be read again.
+            first_run_idx, _ = accepted_runs[0]
+            models = pool.submit(_run_full_models, accepted_runs[0]).result()
+            num_runs = len(accepted_runs) * len(models)
+            use_cache = run_cache.can_cache_runs(num_runs, run_cache.estimate_run_bytes(models[0]))
+            if not use_cache:
+                logger.info("Not caching %s model runs, since they do not fit in the run cache", num_runs)
+
+            _store_run_models(models, dest_db_path, first_run_idx)
+
+        # Keep a limited number of runs in flight, so that finished runs don't pile up in memory
+        # while they wait to be stored, and store each run as soon as it finishes.
+        max_in_flight = MAX_RUNS_IN_FLIGHT_PER_WORKER * n_workers
+        run_futures = {}
+        for accepted_run in accepted_runs[1:]:
+            if len(run_futures) >= max_in_flight:
+                _store_finished_runs(run_futures, dest_db_path)
+
+            run_future = pool.submit(_run_full_models, accepted_run, use_cache=use_cache)
+            run_futures[run_future] = accepted_run[0]
+
+        while run_futures:
+            _store_finished_runs(run_futures, dest_db_path)
+
+    dest_db.create_indexes()
+    logger.info("Finished running full models for all accepted MCMC runs.")
 
-        def update_func(ps: dict):
-            return update_params(ps, param_updates)
 
-        with Timer("Running model scenarios"):
-            num_scenarios = 1 + len(params["scenarios"].keys())
-            scenarios = []
-            for scenario_idx in range(num_scenarios):
-                scenario = Scenario(build_model, scenario_idx, params)
-                scenarios.append(scenario)
+def _store_finished_runs(run_futures: dict, dest_db_path: str):
+    """
+    Waits for at least one run to finish, and stores all finished runs.
+    The futures of the stored runs are removed from run_futures, which maps each future to its run index.
+    """
+    done, _ = futures.wait(run_futures, return_when=futures.FIRST_COMPLETED)
+    for run_future in done:
+        run_idx = run_futures.pop(run_future)
+        _store_run_models(run_future.result(), dest_db_path, run_idx)
 
-            # Run the baseline scenario.
-            baseline_scenario = scenarios[0]
-            baseline_scenario.run(update_func=update_func)
-            baseline_model = baseline_scenario.model
 
-            # Run all the other scenarios
-            for scenario in scenarios[1:]:
-                scenario.run(base_model=baseline_model, update_func=update_func)
+def _store_run_models(models: List[ModelOutputs], dest_db_path: str, run_idx: str):
+    with Timer(f"Saving model outputs for MCMC run {run_idx} to the database"):
+        store_run_models(models, dest_db_path, run_idx=run_idx)
 
-        with Timer("Saving model outputs to the database"):
-            models = [s.model for s in scenarios]
-            store_run_models(models, dest_db_path, run_idx=run_idx)
 
-    logger.info("Finished running full models for all accepted MCMC runs.")
+def _run_full_models(accepted_run: tuple, use_cache=True) -> List[ModelOutputs]:
+    """
+    Runs the baseline model and all scenarios for an accepted MCMC run, in a worker process.
+    """
+    run_idx, param_updates = accepted_run
+    logger.info("Running full model for MCMC run %s", run_idx)
+
+    def update_func(ps: dict):
+        return update_params(ps, param_updates)
+
+    with Timer("Running model scenarios"):
+        baseline_scenario = get_worker_scenario(0)
+        num_scenarios = 1 + len(baseline_scenario.params["scenarios"].keys())
+        scenarios = [baseline_scenario] + [get_worker_scenario(i) for i in range(1, num_scenarios)]
+
+        # Run the baseline scenario, or read its outputs from the run cache if it has already been run.
+        baseline_scenario.run(update_func=update_func, use_cache=use_cache)
+        baseline_model = baseline_scenario.model
+
+        # Run all the other scenarios, forked from the baseline.
+        run_forked_scenarios(
+            scenarios[1:], baseline_model, update_func=update_func, use_cache=use_cache
+        )
+
+    return [ModelOutputs.from_model(s.model) for s in scenarios]
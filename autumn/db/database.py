@@ -1,19 +1,46 @@
 import os
 import logging
+from typing import Any, Dict, List
+
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, Text
 from pandas.util import hash_pandas_object
 
 logger = logging.getLogger(__name__)
 
 
+class TableSchema:
+    """
+    The declared schema of a database table: the types of its key columns, which identify a row,
+    and the indexes that we filter on, as lists of indexed columns.
+    Other columns, eg. model outputs, are created with the types of the data that is first written to them.
+    """
+
+    def __init__(self, columns: Dict[str, Any], indexes: List[List[str]] = None):
+        self.columns = columns
+        self.indexes = indexes or []
+
+
+# Schemas declared for the output database tables.
+# The indexes match the columns that we filter on when reading model outputs back out of the database.
+OUTPUT_TABLE_SCHEMAS = {
+    "outputs": TableSchema({"idx": Text, "Scenario": Text}, [["idx", "Scenario"]]),
+    "derived_outputs": TableSchema({"idx": Text, "Scenario": Text}, [["idx", "Scenario"]]),
+    "mcmc_run": TableSchema({"idx": Text, "Scenario": Text}, [["idx"]]),
+    "mcmc_params": TableSchema({"idx": Text, "Scenario": Text}, [["idx"]]),
+    "uncertainty_weights": TableSchema({"output_name": Text}, [["output_name"]]),
+    "uncertainty": TableSchema({"Scenario": Text, "type": Text}, [["Scenario", "type"]]),
+}
+
+
 class Database:
     """
     Interface to access data stored in a SQLite database.
     """
 
-    def __init__(self, database_path):
+    def __init__(self, database_path, table_schemas: Dict[str, TableSchema] = OUTPUT_TABLE_SCHEMAS):
         self.database_path = database_path
+        self.table_schemas = table_schemas
         self.engine = get_sql_engine(database_path)
 
     def get_size_mb(self):
@@ -54,7 +81,79 @@ class Database:
         self.engine = get_sql_engine(self.database_path)
 
     def dump_df(self, table_name: str, dataframe: pd.DataFrame):
-        dataframe.to_sql(table_name, con=self.engine, if_exists="append", index=False)
+        dataframe.to_sql(
+            table_name,
+            con=self.engine,
+            if_exists="append",
+            index=False,
+            dtype=self.get_column_types(table_name, dataframe),
+        )
+
+    def append_tables(self, tables: Dict[str, pd.DataFrame]):
+        """
+        Appends each dataframe to its table, in a single transaction.
+        """
+        with self.engine.begin() as conn:
+            for table_name, dataframe in tables.items():
+                dataframe.to_sql(
+                    table_name,
+                    con=conn,
+                    if_exists="append",
+                    index=False,
+                    dtype=self.get_column_types(table_name, dataframe),
+                )
+
+    def replace_tables(self, tables: Dict[str, pd.DataFrame]):
+        """
+        Replaces the contents of each table with the given dataframe, in a single transaction.
+        """
+        with self.engine.begin() as conn:
+            for table_name, dataframe in tables.items():
+                dataframe.to_sql(
+                    table_name,
+                    con=conn,
+                    if_exists="replace",
+                    index=False,
+                    dtype=self.get_column_types(table_name, dataframe),
+                )
+
+    def get_column_types(self, table_name: str, dataframe: pd.DataFrame):
+        """
+        Returns the declared types of the dataframe's columns, used when a table is created.
+        """
+        schema = self.table_schemas.get(table_name)
+        if not schema:
+            return None
+
+        return {c: t for c, t in schema.columns.items() if c in dataframe.columns}
+
+    def create_indexes(self):
+        """
+        Creates the indexes declared in the schema of each table in this database.
+        Tables or columns which do not exist yet are skipped.
+        Call this after bulk loading data, since indexes slow down inserts.
+        """
+        table_names = self.table_names()
+        for table_name, schema in self.table_schemas.items():
+            if table_name not in table_names:
+                continue
+
+            column_names = self.column_names(table_name)
+            for index_columns in schema.indexes:
+                if all(c in column_names for c in index_columns):
+                    self.create_index(table_name, index_columns)
+
+    def create_index(self, table_name: str, columns: List[str]):
+        """
+        Creates an index over the given columns of a table, if it does not already exist.
+        """
+        index_name = "_".join(["ix", table_name, *columns])
+        column_str = ", ".join(f'"{c}"' for c in columns)
+        query = f'CREATE INDEX IF NOT EXISTS "{index_name}" ON "{table_name}" ({column_str});'
+        self.engine.execute(query)
+
+    def index_names(self, table_name: str):
+        return [i[1] for i in self.engine.execute(f"PRAGMA index_list({table_name})")]
 
     def query(self, table_name, column="*", conditions=[]):
         """
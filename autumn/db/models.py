@@ -32,32 +32,28 @@ def load_model_scenarios(
     Will store model params in the database if suppied.
     """
     out_db = Database(database_path=database_path)
-    scenarios = []
 
-    # Load runs from the database
-    run_results = out_db.engine.execute("SELECT DISTINCT idx FROM outputs;").fetchall()
-    run_names = sorted(([result[0] for result in run_results]))
-    for run_name in run_names:
-        # Load scenarios from the database for this run
-        scenario_results = out_db.engine.execute(
-            f"SELECT DISTINCT Scenario FROM outputs WHERE idx='{run_name}';"
-        ).fetchall()
-        scenario_names = sorted(([result[0] for result in scenario_results]))
-        for scenario_name in scenario_names:
-            # Load model outputs from database, build Scenario instance
-            conditions = [f"Scenario='{scenario_name}'", f"idx='{run_name}'"]
-            outputs = out_db.query("outputs", conditions=conditions)
-            derived_outputs = out_db.query("derived_outputs", conditions=conditions)
-            model = LoadedModel(
-                outputs=outputs.to_dict(), derived_outputs=derived_outputs.to_dict()
-            )
-            idx = int(scenario_name.split("_")[1])
-            chain_idx = int(run_name.split("_")[1])
-            scenario = Scenario.load_from_db(idx, chain_idx, model, params=model_params)
-            if post_processing_config:
-                scenario.generated_outputs = post_process(model, post_processing_config)
+    # Load all outputs in a single read per table, then split them into runs and scenarios in memory.
+    group_cols = ["idx", "Scenario"]
+    outputs_df = out_db.query("outputs")
+    derived_outputs_df = out_db.query("derived_outputs")
+    output_groups = dict(list(outputs_df.groupby(group_cols, sort=False)))
+    derived_output_groups = dict(list(derived_outputs_df.groupby(group_cols, sort=False)))
 
-            scenarios.append(scenario)
+    scenarios = []
+    for run_name, scenario_name in sorted(output_groups.keys()):
+        # Build a Scenario instance from the model outputs for this run and scenario.
+        key = (run_name, scenario_name)
+        outputs = output_groups[key]
+        derived_outputs = derived_output_groups.get(key, derived_outputs_df.iloc[0:0])
+        model = LoadedModel(outputs=outputs, derived_outputs=derived_outputs)
+        idx = int(scenario_name.split("_")[1])
+        chain_idx = int(run_name.split("_")[1])
+        scenario = Scenario.load_from_db(idx, chain_idx, model, params=model_params)
+        if post_processing_config:
+            scenario.generated_outputs = post_process(model, post_processing_config)
+
+        scenarios.append(scenario)
 
     return scenarios
 
@@ -68,6 +64,15 @@ def store_database(
     """
     store outputs from the model in sql database for use in producing outputs later
     """
+    outputs = format_output_df(outputs, table_name, scenario, run_idx, times)
+    store_db = Database(database_path)
+    store_db.dump_df(table_name, outputs)
+
+
+def format_output_df(outputs, table_name="outputs", scenario=0, run_idx=0, times=None):
+    """
+    add the run, scenario and time columns to model outputs, so they can be stored in the output database
+    """
     if times:
         outputs.insert(0, column="times", value=times)
 
@@ -75,8 +80,19 @@ def store_database(
         outputs.insert(0, column="idx", value=f"run_{run_idx}")
         outputs.insert(1, column="Scenario", value=f"S_{scenario}")
 
-    store_db = Database(database_path)
-    store_db.dump_df(table_name, outputs)
+    return outputs
+
+
+def delete_runs(database_path: str, first_run_idx: int, table_names=TABLES_TO_KEEP):
+    """
+    Delete all runs with an index of first_run_idx or more from the output database.
+    """
+    db = Database(database_path)
+    for table_name in db.table_names():
+        if table_name in table_names and "idx" in db.column_names(table_name):
+            # Run indices are stored as strings like "run_12".
+            query = f"DELETE FROM {table_name} WHERE CAST(SUBSTR(idx, 5) AS INTEGER) >= {first_run_idx}"
+            db.engine.execute(query)
 
 
 def store_run_models(models: List[StratifiedModel], database_path: str, run_idx: int = 0):
@@ -132,6 +148,7 @@ def collate_databases(src_db_paths: List[str], target_db_path: str):
 
         run_count += num_runs
 
+    target_db.create_indexes()
     logger.info("Finished collating db outputs into %s", target_db_path)
 
 
@@ -171,6 +188,7 @@ def prune(source_db_path: str, target_db_path: str, drop_extra_tables=False):
             logger.info("Copying %s", table_name)
             target_db.dump_df(table_name, table_df)
 
+    target_db.create_indexes()
     logger.info("Finished pruning %s into %s", source_db_path, target_db_path)
 
 
@@ -192,6 +210,7 @@ def unpivot(source_db_path: str, target_db_path: str):
     outputs_df = source_db.query("outputs")
     pbi_outputs_df = unpivot_outputs(outputs_df)
     target_db.dump_df("powerbi_outputs", pbi_outputs_df)
+    target_db.create_indexes()
     logger.info("Finished creating PowerBI output database at %s", target_db_path)
 
 
@@ -266,20 +285,16 @@ def load_calibration_from_db(database_directory, n_burned_per_chain=0):
             outputs = out_database.query(
                 table_name="outputs", conditions=["idx='" + str(run_id) + "'"]
             )
-            output_dict = outputs.to_dict()
-
             if out_database.engine.dialect.has_table(out_database.engine, "derived_outputs"):
                 derived_outputs = out_database.query(
                     table_name="derived_outputs", conditions=["idx='" + str(run_id) + "'"],
                 )
-
-                derived_outputs_dict = derived_outputs.to_dict()
             else:
-                derived_outputs_dict = None
+                derived_outputs = None
             model_info_dict = {
                 "db_name": db_name,
                 "run_id": run_id,
-                "model": LoadedModel(output_dict, derived_outputs_dict),
+                "model": LoadedModel(outputs, derived_outputs),
                 "weight": weights[i],
             }
             models.append(model_info_dict)
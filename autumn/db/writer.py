@@ -0,0 +1,133 @@
+"""
+Background writing of model outputs to a SQLite database.
+
+Writing outputs on every calibration iteration blocks the model runs while SQLite is busy,
+which can be a significant fraction of the run time on slow disks.
+The BackgroundWriter queues up dataframes and writes them in batches from a separate thread,
+so that model runs can continue while outputs are being written.
+"""
+import atexit
+import queue
+import logging
+import threading
+from typing import Dict, List
+
+import pandas as pd
+
+from .database import Database
+
+logger = logging.getLogger(__name__)
+
+# Max number of dataframes waiting to be written, before callers are blocked.
+WRITE_QUEUE_SIZE = 256
+# Max number of dataframes written in a single transaction.
+WRITE_BATCH_SIZE = 64
+
+# Marks the end of the write queue.
+_STOP = None
+
+
+class BackgroundWriter:
+    """
+    Appends dataframes to database tables from a background thread.
+
+    Writes are batched, grouped by table and committed in a single transaction per batch.
+    The write queue is bounded, so callers block if they get too far ahead of the writer.
+    Any queued writes are flushed when the writer is closed, or when the Python process exits.
+    Errors raised in the background thread are re-raised on the next call to write, flush or close.
+    """
+
+    def __init__(
+        self, database_path: str, max_queue_size=WRITE_QUEUE_SIZE, batch_size=WRITE_BATCH_SIZE
+    ):
+        self.database_path = database_path
+        self.batch_size = batch_size
+        self.is_closed = False
+        self._error = None
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = threading.Thread(
+            target=self._write_queued_dataframes, name="db-writer", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, table_name: str, dataframe: pd.DataFrame):
+        """
+        Queues a dataframe to be appended to a table.
+        Blocks if the write queue is full.
+        """
+        assert not self.is_closed, "Cannot write to a closed BackgroundWriter"
+        self._raise_error()
+        self._queue.put((table_name, dataframe))
+
+    def flush(self):
+        """
+        Blocks until all queued dataframes have been written.
+        """
+        self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        """
+        Writes any queued dataframes and stops the background thread.
+        """
+        if self.is_closed:
+            return
+
+        self.is_closed = True
+        atexit.unregister(self.close)
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._raise_error()
+
+    def _raise_error(self):
+        if self._error:
+            error, self._error = self._error, None
+            raise RuntimeError(f"Failed to write to {self.database_path}") from error
+
+    def _write_queued_dataframes(self):
+        """
+        Runs in the background thread, writing batches of queued dataframes until the writer is closed.
+        """
+        # Create the database connection in this thread, since SQLite connections are not shared between threads.
+        db = Database(self.database_path)
+        is_stopped = False
+        while not is_stopped:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            is_stopped = _STOP in batch
+            items = [item for item in batch if item is not _STOP]
+            try:
+                if items and not self._error:
+                    db.append_tables(group_tables(items))
+            except Exception as e:
+                logger.exception("Failed to write batch to %s", self.database_path)
+                self._error = e
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+def group_tables(items: List[tuple]) -> Dict[str, pd.DataFrame]:
+    """
+    Combines a list of (table name, dataframe) pairs into a single dataframe per table.
+    """
+    table_dfs = {}
+    for table_name, dataframe in items:
+        table_dfs.setdefault(table_name, []).append(dataframe)
+
+    return {
+        table_name: dfs[0] if len(dfs) == 1 else pd.concat(dfs, ignore_index=True)
+        for table_name, dfs in table_dfs.items()
+    }
@@ -0,0 +1,123 @@
+"""
+Caching for preprocessed input data.
+
+Building a model queries the input database and then post-processes the results with pandas,
+which is slow when it happens on every calibration iteration. Query results are cached in-process,
+and also saved to disk so that calibration workers and forked processes can share them.
+Cached results are keyed on the input database hash, a hash of the source code and the query arguments,
+so rebuilding the input database or changing the query code invalidates the cache.
+"""
+import os
+import pickle
+import hashlib
+import logging
+from copy import deepcopy
+from functools import wraps
+from collections import OrderedDict
+
+from autumn import constants
+from autumn.tool_kit.run_cache import get_code_hash
+
+from .database import input_db_hash_path, read_file_hash
+
+logger = logging.getLogger(__name__)
+
+# Max number of query results held in memory per process.
+INPUT_CACHE_SIZE = 256
+
+_cache = OrderedDict()
+_input_db_hash = None
+
+
+def get_input_cache_dir():
+    return os.path.join(constants.DATA_PATH, "input-cache")
+
+
+def cache_input(func):
+    """
+    Decorator which caches the result of an input query.
+    Results are stored in an in-process LRU cache, backed by a pickled snapshot on disk.
+    Each call returns a copy of the cached result, so callers are free to modify it.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        key = get_cache_key(func, args, kwargs)
+        try:
+            result = _cache[key]
+            _cache.move_to_end(key)
+        except KeyError:
+            result = read_snapshot(key)
+            if result is None:
+                result = func(*args, **kwargs)
+                write_snapshot(key, result)
+
+            _cache[key] = result
+            if len(_cache) > INPUT_CACHE_SIZE:
+                _cache.popitem(last=False)
+
+        return deepcopy(result)
+
+    return wrapper
+
+
+def get_cache_key(func, args: tuple, kwargs: dict):
+    """
+    Returns a key for a query, based on the input database hash, the code hash and the query arguments.
+    The code hash covers the query and any preprocessing functions that it calls.
+    """
+    global _input_db_hash
+    if _input_db_hash is None:
+        _input_db_hash = read_file_hash(input_db_hash_path)
+
+    query_str = repr(
+        (
+            _input_db_hash,
+            get_code_hash(),
+            func.__module__,
+            func.__name__,
+            args,
+            sorted(kwargs.items()),
+        )
+    )
+    return hashlib.md5(query_str.encode()).hexdigest()
+
+
+def read_snapshot(key: str):
+    """
+    Returns the cached query result saved to disk, or None if it does not exist.
+    """
+    path = os.path.join(get_input_cache_dir(), f"{key}.pkl")
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except (pickle.UnpicklingError, EOFError):
+        logger.warning("Ignoring corrupt input cache file %s", path)
+        return None
+
+
+def write_snapshot(key: str, result):
+    """
+    Saves a query result to disk.
+    The file is written atomically, so concurrent processes never read a partial snapshot.
+    """
+    cache_dir = get_input_cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{key}.pkl")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    os.replace(tmp_path, path)
+
+
+def clear_input_cache():
+    """
+    Clears the in-process cache, and forgets the input database hash.
+    Snapshots on disk are left alone, since they are keyed on the database and code hashes.
+    """
+    global _input_db_hash
+    _cache.clear()
+    _input_db_hash = None
@@ -1,19 +1,57 @@
 import os
+import json
+import hashlib
+import inspect
 import logging
+import multiprocessing
+from concurrent import futures
+from typing import List
+
+from sqlalchemy import Text
 
 from autumn.tool_kit import Timer
 from autumn.db import Database
+from autumn.db.database import TableSchema
 from autumn import constants
 
+from .mobility.fetch import MOBILITY_CSV_PATH
 from .mobility.preprocess import preprocess_mobility
-from .social_mixing.preprocess import preprocess_social_mixing
-from .demography.preprocess import preprocess_demography
+from .social_mixing.preprocess import preprocess_social_mixing, MIXING_DIRPATH
+from .demography.preprocess import (
+    preprocess_demography,
+    read_location_df,
+    POP_DIRPATH,
+    LOCATION_PATH,
+)
 
 logger = logging.getLogger(__name__)
 
 _input_db = None
 input_db_hash_path = os.path.join(constants.INPUT_DATA_PATH, "inputs-hash.txt")
 input_db_path = os.path.join(constants.INPUT_DATA_PATH, "inputs.db")
+input_sources_hash_path = os.path.join(constants.INPUT_DATA_PATH, "inputs-sources.json")
+
+# Input data sources, each of which is preprocessed into one or more input database tables.
+# Maps source name to the preprocessing function and the source files that it reads.
+# All preprocessors look up country ISO3 codes from the UN locations file.
+# A source is ingested again whenever its files, or the code in its preprocessing package, change.
+INPUT_SOURCES = {
+    "demography": (preprocess_demography, [POP_DIRPATH]),
+    "social_mixing": (preprocess_social_mixing, [MIXING_DIRPATH, LOCATION_PATH]),
+    "mobility": (preprocess_mobility, [MOBILITY_CSV_PATH, LOCATION_PATH]),
+}
+
+# Schemas declared for the input database tables.
+# The indexes match the columns that the input queries filter on.
+INPUT_TABLE_SCHEMAS = {
+    "countries": TableSchema({"country": Text, "iso3": Text}, [["country"], ["iso3"]]),
+    "population": TableSchema({"iso3": Text, "region": Text}, [["iso3", "region", "year"]]),
+    "birth_rates": TableSchema({"iso3": Text}, [["iso3"]]),
+    "deaths": TableSchema({"iso3": Text}, [["iso3"]]),
+    "life_expectancy": TableSchema({"iso3": Text}, [["iso3"]]),
+    "social_mixing": TableSchema({"iso3": Text, "location": Text}, [["iso3", "location"]]),
+    "mobility": TableSchema({"iso3": Text, "region": Text}, [["iso3", "region"]]),
+}
 
 
 def get_input_db():
@@ -33,25 +71,28 @@ def build_input_database(force: bool = False, rebuild: bool = False):
     and crash if the built database hash does not match.
 
     If rebuild is True, then we force rebuild the database, but we don't write a new hash.
+    When rebuilding, only input sources which have changed since the last build are preprocessed.
+    If the database hash does not match after a build, then all sources are preprocessed again.
 
     Returns a Database, representing the input database.
     """
-    if os.path.exists(input_db_path) and not (force or rebuild):
-        input_db = Database(input_db_path)
+    db_exists = os.path.exists(input_db_path)
+    if db_exists and not (force or rebuild):
+        input_db = Database(input_db_path, INPUT_TABLE_SCHEMAS)
     else:
-        logger.info("Building a new database.")
-        input_db = Database(input_db_path)
-        with Timer("Deleting all existing data."):
-            input_db.delete_everything()
-
-        with Timer("Ingesting demography data."):
-            country_df = preprocess_demography(input_db)
+        input_db = Database(input_db_path, INPUT_TABLE_SCHEMAS)
+        if force or not db_exists:
+            logger.info("Building a new database.")
+            with Timer("Deleting all existing data."):
+                input_db.delete_everything()
+                write_source_hashes({})
+        else:
+            logger.info("Rebuilding changed input data in the existing database.")
 
-        with Timer("Ingesting social mixing data."):
-            preprocess_social_mixing(input_db, country_df)
+        ingest_input_sources(input_db)
 
-        with Timer("Ingesting mobility data."):
-            preprocess_mobility(input_db, country_df)
+    with Timer("Indexing input data."):
+        input_db.create_indexes()
 
     current_db_hash = input_db.get_hash()
     if force:
@@ -66,11 +107,96 @@ def build_input_database(force: bool = False, rebuild: bool = False):
             raise ValueError(msg)
         elif is_hash_mismatch:
             logger.info("Hash mismatch, try rebuilding database...")
+            # Forget the source hashes so that every source is ingested again,
+            # since the mismatch may not be caused by a change that the source hashes detect.
+            write_source_hashes({})
             build_input_database(rebuild=True)
 
     return input_db
 
 
+def ingest_input_sources(input_db: Database):
+    """
+    Preprocess each input source which has changed since it was last ingested, and save it to the input db.
+    Sources are preprocessed in parallel processes, and each is written to the database in a single transaction.
+    """
+    saved_hashes = read_source_hashes()
+    source_hashes = {name: get_source_hash(name) for name in INPUT_SOURCES}
+    changed_sources = [name for name in INPUT_SOURCES if saved_hashes.get(name) != source_hashes[name]]
+    if not changed_sources:
+        logger.info("All input sources are up to date.")
+        return
+
+    logger.info("Ingesting changed input sources: %s", ", ".join(changed_sources))
+    country_df = read_location_df()
+    num_workers = min(len(changed_sources), multiprocessing.cpu_count())
+    with futures.ProcessPoolExecutor(max_workers=num_workers) as ex:
+        source_futures = {}
+        for name in changed_sources:
+            preprocess_func, _ = INPUT_SOURCES[name]
+            source_futures[ex.submit(preprocess_func, country_df)] = name
+
+        for future in futures.as_completed(source_futures):
+            name = source_futures[future]
+            tables = future.result()
+            with Timer(f"Writing {name} data."):
+                input_db.replace_tables(tables)
+
+            # Save progress, so an interrupted build does not repeat completed sources.
+            saved_hashes[name] = source_hashes[name]
+            write_source_hashes(saved_hashes)
+
+
+def get_source_hash(name: str):
+    """
+    Returns a MD5 hash of an input source's files and the code in its preprocessing package.
+    """
+    preprocess_func, paths = INPUT_SOURCES[name]
+    package_path = os.path.dirname(inspect.getsourcefile(preprocess_func))
+    code_paths = [
+        os.path.join(package_path, f) for f in os.listdir(package_path) if f.endswith(".py")
+    ]
+    return get_files_hash(paths + code_paths)
+
+
+def get_files_hash(paths: List[str]):
+    """
+    Returns a MD5 hash of the contents of the given files, and all files inside the given directories.
+    """
+    file_paths = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, _, filenames in os.walk(path):
+                file_paths += [os.path.join(dirpath, f) for f in filenames]
+        else:
+            file_paths.append(path)
+
+    file_hash = hashlib.md5()
+    for file_path in sorted(file_paths):
+        file_hash.update(os.path.relpath(file_path, constants.INPUT_DATA_PATH).encode())
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(2 ** 20), b""):
+                file_hash.update(chunk)
+
+    return file_hash.hexdigest()
+
+
+def read_source_hashes():
+    """
+    Read the hashes of the input sources that were last ingested into the input database.
+    """
+    try:
+        with open(input_sources_hash_path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def write_source_hashes(source_hashes: dict):
+    with open(input_sources_hash_path, "w") as f:
+        json.dump(source_hashes, f, indent=2)
+
+
 def read_file_hash(hash_path: str):
     """
     Read file hash, which is on the last line of the file
@@ -6,23 +6,23 @@ import os
 import pandas as pd
 
 from autumn import constants
-from autumn.db import Database
 
 POP_DIRPATH = os.path.join(constants.INPUT_DATA_PATH, "world-population")
+LOCATION_PATH = os.path.join(POP_DIRPATH, "WPP2019_F01_LOCATIONS.xlsx")
 
 
-def preprocess_demography(input_db: Database):
-    loc_df = read_location_df()
-    pop_df = read_population_df(loc_df)
-    birth_df = read_crude_birth_df(loc_df)
-    death_df = read_death_df(loc_df)
-    expect_df = read_life_expectancy_df(loc_df)
-    input_db.dump_df("countries", loc_df)
-    input_db.dump_df("population", pop_df)
-    input_db.dump_df("birth_rates", birth_df)
-    input_db.dump_df("deaths", death_df)
-    input_db.dump_df("life_expectancy", expect_df)
-    return loc_df
+def preprocess_demography(country_df: pd.DataFrame):
+    """
+    Read UN demography data into input database tables.
+    Returns a dict of table name to table dataframe.
+    """
+    return {
+        "countries": country_df,
+        "population": read_population_df(country_df),
+        "birth_rates": read_crude_birth_df(country_df),
+        "deaths": read_death_df(country_df),
+        "life_expectancy": read_life_expectancy_df(country_df),
+    }
 
 
 def read_life_expectancy_df(loc_df: pd.DataFrame):
@@ -250,9 +250,8 @@ def read_location_df():
     """
     Read UN country code mappings
     """
-    location_path = os.path.join(POP_DIRPATH, "WPP2019_F01_LOCATIONS.xlsx")
     loc_df = pd.read_excel(
-        pd.ExcelFile(location_path), header=16, index_col=0, sheet_name="Location",
+        pd.ExcelFile(LOCATION_PATH), header=16, index_col=0, sheet_name="Location",
     )
     rename_cols = {
         "Region, subregion, country or area*": "country",
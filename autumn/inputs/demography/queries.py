@@ -8,6 +8,7 @@ import numpy as np
 import pandas as pd
 
 from autumn.inputs.database import get_input_db
+from autumn.inputs.cache import cache_input
 
 INF = float("inf")
 
@@ -51,6 +52,7 @@ def _get_life_expectancy(country_iso_code: str):
     return expectancy_df
 
 
+@cache_input
 def get_death_rates_by_agegroup(age_breakpoints: List[float], country_iso_code: str):
     """
     Find death rates from UN data that are specific to the age groups provided.
@@ -76,6 +78,7 @@ def get_death_rates_by_agegroup(age_breakpoints: List[float], country_iso_code:
     return death_rates_by_agegroup, years
 
 
+@cache_input
 def get_life_expectancy_by_agegroup(age_breakpoints: List[float], country_iso_code: str):
     """
     Find life expectancy from UN data that are specific to the age groups provided.
@@ -100,6 +103,7 @@ def get_life_expectancy_by_agegroup(age_breakpoints: List[float], country_iso_co
     return life_expectancy_by_agegroup, years
 
 
+@cache_input
 def get_iso3_from_country_name(country_name: str):
     """
     Return the iso3 code matching with a given country name.
@@ -113,6 +117,7 @@ def get_iso3_from_country_name(country_name: str):
         raise ValueError(f"Country name {country_name} not found")
 
 
+@cache_input
 def get_crude_birth_rate(country_iso_code: str):
     """
     Gets crude birth rate over time for a given country.
@@ -124,6 +129,7 @@ def get_crude_birth_rate(country_iso_code: str):
     return birth_df["birth_rate"].tolist(), birth_df["mean_year"].tolist()
 
 
+@cache_input
 def get_population_by_agegroup(
     age_breakpoints: List[float], country_iso_code: str, region: str = None, year: int = 2020
 ):
@@ -1,7 +1,5 @@
 import pandas as pd
 
-from autumn.db import Database
-
 from .fetch import MOBILITY_CSV_PATH
 
 NAN = float("nan")
@@ -27,9 +25,10 @@ COUNTRY_NAME_ISO3_MAP = {
 }
 
 
-def preprocess_mobility(input_db: Database, country_df):
+def preprocess_mobility(country_df: pd.DataFrame):
     """
-    Read Google Mobility data from CSV into input database
+    Read Google Mobility data from CSV into an input database table.
+    Returns a dict of table name to table dataframe.
     """
     mob_df = pd.read_csv(MOBILITY_CSV_PATH)
 
@@ -58,7 +57,7 @@ def preprocess_mobility(input_db: Database, country_df):
     mob_df = mob_df.drop(columns=["country_region"])
 
     mob_df = mob_df.sort_values(["iso3", "region", "date"])
-    input_db.dump_df("mobility", mob_df)
+    return {"mobility": mob_df}
 
 
 def get_iso3(country_name: str, country_df):
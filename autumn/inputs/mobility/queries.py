@@ -3,8 +3,10 @@ from datetime import datetime
 import pandas as pd
 
 from autumn.inputs.database import get_input_db
+from autumn.inputs.cache import cache_input
 
 
+@cache_input
 def get_mobility_data(country_iso_code: str, region: str, base_date: datetime, location_map: dict):
     """
     Get daily Google mobility data for locations, for a given country.
@@ -33,26 +35,24 @@ def get_mobility_data(country_iso_code: str, region: str, base_date: datetime, l
     }
     """
     input_db = get_input_db()
+    google_locs = {old_loc for old_locs in location_map.values() for old_loc in old_locs}
+    # Dates are stored as YYYY-MM-DD strings, which sort in date order.
     mob_df = input_db.query(
         "mobility",
+        column=["date", *sorted(google_locs)],
         conditions=[
             f"iso3='{country_iso_code}'",
             f"region='{region}'" if region else "region IS NULL",
+            f"date>='{base_date:%Y-%m-%d}'",
         ],
     )
+    mob_df = mob_df.sort_values(["date"])
+    mob_dates = pd.to_datetime(mob_df["date"], format="%Y-%m-%d")
+    days = (mob_dates - base_date).dt.days.tolist()
 
     # Average out Google Mobility locations into Autumn-friendly locations
-    for new_loc, old_locs in location_map.items():
-        mob_df[new_loc] = 0
-        for old_loc in old_locs:
-            mob_df[new_loc] += mob_df[old_loc]
-
-        mob_df[new_loc] = mob_df[new_loc] / len(old_locs)
-
-    mob_df["date"] = pd.to_datetime(mob_df["date"], format="%Y-%m-%d")
-    mob_df = mob_df.sort_values(["date"])
-    mob_df = mob_df[mob_df["date"] >= base_date]
-    days = mob_df["date"].apply(lambda d: (d - base_date).days).tolist()
-    loc_mobility_values = {loc: mob_df[loc].tolist() for loc in location_map.keys()}
+    loc_mobility_values = {
+        new_loc: mob_df[old_locs].mean(axis=1, skipna=False).tolist()
+        for new_loc, old_locs in location_map.items()
+    }
     return loc_mobility_values, days
-
@@ -7,7 +7,6 @@ import pandas as pd
 
 
 from autumn import constants
-from autumn.db import Database
 
 
 MIXING_DIRPATH = os.path.join(constants.INPUT_DATA_PATH, "social-mixing")
@@ -27,7 +26,12 @@ SHEET_NAME_ISO3_MAP = {
 }
 
 
-def preprocess_social_mixing(input_db: Database, country_df):
+def preprocess_social_mixing(country_df: pd.DataFrame):
+    """
+    Read social mixing matrices from the Prem et al. spreadsheets into an input database table.
+    Returns a dict of table name to table dataframe.
+    """
+    mix_dfs = []
     for location in LOCATIONS:
         for sheet_number, header_arg in SHEET_NUMBERS:
             sheet_name = f"MUestimates_{location}_{sheet_number}.xlsx"
@@ -44,7 +48,9 @@ def preprocess_social_mixing(input_db: Database, country_df):
 
                 mix_df.insert(0, "location", [location for _ in range(len(mix_df))])
                 mix_df.insert(0, "iso3", [iso3 for _ in range(len(mix_df))])
-                input_db.dump_df("social_mixing", mix_df)
+                mix_dfs.append(mix_df)
+
+    return {"social_mixing": pd.concat(mix_dfs, ignore_index=True)}
 
 
 def get_iso3(sheet_name: str, country_df):
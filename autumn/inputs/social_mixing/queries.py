@@ -1,16 +1,16 @@
 import os
 import numpy as np
 import pandas as pd
-from functools import lru_cache
 
 from autumn.inputs.database import get_input_db
+from autumn.inputs.cache import cache_input
 
 
 LOCATIONS = ("all_locations", "home", "other_locations", "school", "work")
 
 
-# Cache result beecause this gets called 1000s of times during calibration.
-@lru_cache(maxsize=None)
+# Cache result because this gets called 1000s of times during calibration.
+@cache_input
 def get_country_mixing_matrix(mixing_location: str, country_iso_code: str):
     """
     Load a mixing matrix for a given country and mixing location.
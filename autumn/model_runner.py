@@ -3,6 +3,8 @@ Build and run any AuTuMN model, storing the outputs
 """
 import os
 import logging
+import multiprocessing
+
 import yaml
 from datetime import datetime
 
@@ -10,7 +12,12 @@ from datetime import datetime
 from autumn import constants
 from autumn.tool_kit.timer import Timer
 from autumn.tool_kit.serializer import serialize_model
-from autumn.tool_kit.scenarios import Scenario
+from autumn.tool_kit.scenarios import (
+    Scenario,
+    ModelOutputs,
+    get_scenario_worker_pool,
+    get_worker_scenario,
+)
 from autumn.tool_kit.utils import (
     get_git_branch,
     get_git_hash,
@@ -33,9 +40,10 @@ def build_model_runner(
     if not param_set_name:
         param_set_name = "main-model"
 
-    def run_model(run_scenarios=True):
+    def run_model(run_scenarios=True, n_workers=None):
         """
         Run the model, save the outputs.
+        Once the baseline has run, the other scenarios are run in parallel in a pool of worker processes.
         """
         logger.info(f"Running {model_name} {param_set_name}...")
 
@@ -82,11 +90,21 @@ def build_model_runner(
                 # Do not run non-baseline models
                 scenarios = scenarios[:1]
 
-            # Run all the other scenarios
-            for scenario in scenarios[1:]:
-                scenario.run(base_model=baseline_model)
-                name = f"scenario-{scenario.idx}"
-                save_serialized_model(scenario.model, output_dir, name)
+            # Run all the other scenarios, starting from the baseline's compartment values.
+            if len(scenarios) > 1:
+                n_workers = n_workers or min(len(scenarios) - 1, multiprocessing.cpu_count())
+                with get_scenario_worker_pool(build_model, params, n_workers) as pool:
+                    scenario_futures = [
+                        pool.submit(
+                            _run_scenario,
+                            scenario.idx,
+                            scenario.get_start_compartment_values(baseline_model),
+                            output_dir,
+                        )
+                        for scenario in scenarios[1:]
+                    ]
+                    for scenario, future in zip(scenarios[1:], scenario_futures):
+                        scenario.model = future.result()
 
         with Timer("Saving model outputs to the database"):
             models = [s.model for s in scenarios]
@@ -95,6 +113,16 @@ def build_model_runner(
     return run_model
 
 
+def _run_scenario(idx: int, start_compartment_values, output_dir: str) -> ModelOutputs:
+    """
+    Runs a scenario in a worker process, and saves the serialized model.
+    """
+    scenario = get_worker_scenario(idx)
+    scenario.run(start_compartment_values=start_compartment_values)
+    save_serialized_model(scenario.model, output_dir, scenario.name)
+    return ModelOutputs.from_model(scenario.model)
+
+
 def save_serialized_model(model, output_dir: str, name: str):
     model_path = os.path.join(output_dir, "models")
     os.makedirs(model_path, exist_ok=True)
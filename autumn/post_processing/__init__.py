@@ -1,9 +1,15 @@
 from numpy import linspace
 
 from summer.model.strat_model import StratifiedModel
-from summer.model.utils.string import find_name_components
 from summer.model.utils.data_structures import *
 
+from .requested_outputs import (
+    calculate_prevalence,
+    find_prevalence_indices,
+    find_strata_indices,
+    freeze_conditions,
+)
+
 
 class PostProcessing:
     """
@@ -110,49 +116,29 @@ class PostProcessing:
                 # work out the conditions to be satisfied regarding the compartment of interest
                 numerator_conditions = string_pre_among.split("X")[1:-1]
 
-                # list all relevant compartments that should be included into the numerator or the denominator
-                self.operations_to_perform[output]["numerator_indices"] = []
-
-                # indices to be added to the numerator ones to form the whole denominator
-                self.operations_to_perform[output]["denominator_extra_indices"] = []
-                for i_comp, compartment in enumerate(self.model.compartment_names):
-                    name_components = find_name_components(compartment)
-                    is_in_denominator = True
-
-                    # for each relevant stratification
-                    for condition in denominator_conditions.keys():
-                        if not any(
-                            category in name_components
-                            for category in denominator_conditions[condition]
-                        ):
-                            is_in_denominator = False
-                            break
-
-                    if is_in_denominator:
-                        if all(category in compartment for category in numerator_conditions):
-                            self.operations_to_perform[output]["numerator_indices"].append(i_comp)
-                        else:
-                            self.operations_to_perform[output]["denominator_extra_indices"].append(
-                                i_comp
-                            )
+                # list all relevant compartments that should be included into the numerator or the denominator,
+                # and the indices to be added to the numerator ones to form the whole denominator
+                numerator_indices, denominator_extra_indices = find_prevalence_indices(
+                    tuple(self.model.compartment_names),
+                    tuple(numerator_conditions),
+                    freeze_conditions(denominator_conditions),
+                )
+                self.operations_to_perform[output]["numerator_indices"] = numerator_indices
+                self.operations_to_perform[output][
+                    "denominator_extra_indices"
+                ] = denominator_extra_indices
 
             # population distribution across a particular requested stratum
             elif output.startswith("distribution_of_strata"):
 
-                # create dictionary keyed with the names of the strata within the stratification of interest
-                self.operations_to_perform[output]["compartment_indices"] = {}
+                # create dictionary keyed with the names of the strata within the stratification of interest,
+                # populated with the indices of the compartment of interest
                 stratification_of_interest = output.split("X")[1]
-
-                # populate with the indices of the compartment of interest
-                for stratum_name in self.model.all_stratifications[stratification_of_interest]:
-                    self.operations_to_perform[output]["compartment_indices"][stratum_name] = []
-                    for i_comp, compartment_name in enumerate(self.model.compartment_names):
-                        if stratification_of_interest + "_" + stratum_name in find_name_components(
-                            compartment_name
-                        ):
-                            self.operations_to_perform[output]["compartment_indices"][
-                                stratum_name
-                            ].append(i_comp)
+                self.operations_to_perform[output]["compartment_indices"] = find_strata_indices(
+                    tuple(self.model.compartment_names),
+                    stratification_of_interest,
+                    tuple(self.model.all_stratifications[stratification_of_interest]),
+                )
             else:
                 raise ValueError("only prevalence and distribution outputs are currently supported")
 
@@ -191,34 +177,24 @@ class PostProcessing:
         :return: the calculated value of the requested output at the requested time index
         """
         if output.startswith("prev"):
-            out = []
-            for i_time in time_indices:
-                numerator = self.model.outputs[
-                    i_time, self.operations_to_perform[output]["numerator_indices"]
-                ].sum()
-                extra_for_denominator = self.model.outputs[
-                    i_time, self.operations_to_perform[output]["denominator_extra_indices"],
-                ].sum()
-                value = (
-                    numerator / (numerator + extra_for_denominator)
-                    if numerator + extra_for_denominator > 0.0
-                    else 0
-                )
-                if output in self.multipliers.keys():
-                    value *= self.multipliers[output]
-                out.append(value)
+            values = calculate_prevalence(
+                self.model.outputs,
+                self.operations_to_perform[output]["numerator_indices"],
+                self.operations_to_perform[output]["denominator_extra_indices"],
+                time_indices,
+            )
+            if output in self.multipliers.keys():
+                values *= self.multipliers[output]
+            out = values.tolist()
 
         elif output.startswith("distribution_of_strata"):
-            out = {}
-            for stratum in self.operations_to_perform[output]["compartment_indices"].keys():
-                out[stratum] = []
-                for i_time in time_indices:
-                    out[stratum].append(
-                        self.model.outputs[
-                            i_time,
-                            self.operations_to_perform[output]["compartment_indices"][stratum],
-                        ].sum()
-                    )
+            outputs = self.model.outputs[list(time_indices)]
+            out = {
+                stratum: outputs[:, indices].sum(axis=1).tolist()
+                for stratum, indices in self.operations_to_perform[output][
+                    "compartment_indices"
+                ].items()
+            }
 
         else:
             ValueError("output type not currently supported")
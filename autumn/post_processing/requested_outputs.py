@@ -1,5 +1,12 @@
+from functools import lru_cache
+
+import numpy as np
+
 from summer.model.utils.string import find_name_components
 
+# Max number of compiled requested outputs held in memory.
+COMPILED_OUTPUT_CACHE_SIZE = 1024
+
 
 class RequestedOutput:
     """
@@ -79,41 +86,17 @@ class PrevalenceOutput(RequestedOutput):
         """
         Returns the requested output for a given list of time indices.
         """
-        numerator_indices = []
-        denominator_indices = []
-        for comp_idx, compartment in enumerate(model.compartment_names):
-            name_components = find_name_components(compartment)
-            is_in_denominator = True
-            for condition in self.denominator_conditions.keys():
-                if not any(
-                    category in name_components
-                    for category in self.denominator_conditions[condition]
-                ):
-                    is_in_denominator = False
-                    break
-
-            if is_in_denominator:
-                if all(category in compartment for category in self.numerator_conditions):
-                    numerator_indices.append(comp_idx)
-                else:
-                    denominator_indices.append(comp_idx)
-
-        generated_output = []
-        for time_idx in time_indices:
-            numerator = model.outputs[time_idx, numerator_indices].sum()
-            extra_for_denominator = model.outputs[time_idx, denominator_indices].sum()
-            try:
-                value = numerator / (numerator + extra_for_denominator)
-            except ZeroDivisionError:
-                value = 0
-
-            output_str = self.to_str()
-            if output_str in multipliers.keys():
-                value *= multipliers[output_str]
-
-            generated_output.append(value)
-
-        return generated_output
+        numerator_indices, denominator_indices = find_prevalence_indices(
+            tuple(model.compartment_names),
+            tuple(self.numerator_conditions),
+            freeze_conditions(self.denominator_conditions),
+        )
+        values = calculate_prevalence(model.outputs, numerator_indices, denominator_indices, time_indices)
+        output_str = self.to_str()
+        if output_str in multipliers.keys():
+            values *= multipliers[output_str]
+
+        return values.tolist()
 
 
 class StrataOutput(RequestedOutput):
@@ -144,20 +127,90 @@ class StrataOutput(RequestedOutput):
             return True
 
     def calculate_output(self, model, multipliers, time_indices):
-        compartment_indices = {}
-        # Populate with the indices of the compartment of interest
-        for stratum_name in model.all_stratifications[self.stratum]:
-            compartment_indices[stratum_name] = []
-            for i_comp, compartment_name in enumerate(model.compartment_names):
-                name_components = find_name_components(compartment_name)
-                if self.stratum + "_" + stratum_name in name_components:
-                    compartment_indices[stratum_name].append(i_comp)
-
-        out = {}
-        for stratum in compartment_indices.keys():
-            out[stratum] = []
-            for i_time in time_indices:
-                value = model.outputs[i_time, compartment_indices[stratum]].sum()
-                out[stratum].append(value)
-
-        return out
+        compartment_indices = find_strata_indices(
+            tuple(model.compartment_names),
+            self.stratum,
+            tuple(model.all_stratifications[self.stratum]),
+        )
+        outputs = np.asarray(model.outputs)[list(time_indices)]
+        return {
+            stratum: outputs[:, indices].sum(axis=1).tolist()
+            for stratum, indices in compartment_indices.items()
+        }
+
+
+def freeze_conditions(conditions: dict) -> tuple:
+    """
+    Returns a hashable version of a dict of conditions, so that it can be used as a cache key.
+    """
+    return tuple((key, tuple(values)) for key, values in conditions.items())
+
+
+@lru_cache(maxsize=COMPILED_OUTPUT_CACHE_SIZE)
+def find_compartment_components(compartment_names: tuple) -> list:
+    """
+    Returns the set of name components of each compartment.
+    """
+    return [set(find_name_components(c)) for c in compartment_names]
+
+
+@lru_cache(maxsize=COMPILED_OUTPUT_CACHE_SIZE)
+def find_prevalence_indices(
+    compartment_names: tuple, numerator_conditions: tuple, denominator_conditions: tuple
+):
+    """
+    Returns the indices of the compartments in the numerator of a prevalence output,
+    and of the compartments which are only in its denominator.
+    A compartment is in the denominator if it matches any one of the categories of each stratification,
+    and is also in the numerator if its name contains all of the numerator conditions.
+    Results are cached, so the compartment names are only parsed once per model structure.
+    """
+    numerator_indices = []
+    denominator_indices = []
+    all_name_components = find_compartment_components(compartment_names)
+    for comp_idx, (compartment, name_components) in enumerate(
+        zip(compartment_names, all_name_components)
+    ):
+        is_in_denominator = all(
+            any(category in name_components for category in categories)
+            for _, categories in denominator_conditions
+        )
+        if is_in_denominator:
+            if all(category in compartment for category in numerator_conditions):
+                numerator_indices.append(comp_idx)
+            else:
+                denominator_indices.append(comp_idx)
+
+    return np.array(numerator_indices, dtype=int), np.array(denominator_indices, dtype=int)
+
+
+@lru_cache(maxsize=COMPILED_OUTPUT_CACHE_SIZE)
+def find_strata_indices(compartment_names: tuple, stratification: str, strata: tuple) -> dict:
+    """
+    Returns the indices of the compartments in each stratum of a stratification.
+    Results are cached, so the compartment names are only parsed once per model structure.
+    """
+    all_name_components = find_compartment_components(compartment_names)
+    return {
+        stratum: np.array(
+            [
+                comp_idx
+                for comp_idx, name_components in enumerate(all_name_components)
+                if f"{stratification}_{stratum}" in name_components
+            ],
+            dtype=int,
+        )
+        for stratum in strata
+    }
+
+
+def calculate_prevalence(outputs, numerator_indices, denominator_indices, time_indices):
+    """
+    Returns the prevalence at each of the time indices, or zero where the denominator is empty.
+    """
+    outputs = np.asarray(outputs)[list(time_indices)]
+    numerator = outputs[:, numerator_indices].sum(axis=1)
+    denominator = numerator + outputs[:, denominator_indices].sum(axis=1)
+    prevalence = np.zeros(len(numerator))
+    np.divide(numerator, denominator, out=prevalence, where=denominator > 0.0)
+    return prevalence
@@ -1,34 +1,30 @@
-import numpy
+import pandas as pd
+
+# Columns of the output tables which identify a row, rather than store a model output.
+INDEX_COLUMNS = ["idx", "Scenario", "times"]
 
 
 class LoadedModel:
     """
     A model placeholder, used to store the outputs of a previous model run.
+    Outputs are stored as a NumPy array and derived outputs as lists, like a model which has been run,
+    built from the output database tables for a single run/scenario.
     """
 
-    def __init__(self, outputs, derived_outputs):
-        self.compartment_names = [
-            name for name in outputs.keys() if name not in ["idx", "Scenario", "times"]
-        ]
-
-        self.outputs = numpy.column_stack(
-            [
-                list(column.values())
-                for name, column in outputs.items()
-                if name not in ["idx", "Scenario", "times"]
-            ]
-        )
+    def __init__(self, outputs: pd.DataFrame, derived_outputs: pd.DataFrame = None):
+        self.compartment_names = [name for name in outputs.columns if name not in INDEX_COLUMNS]
+        self.outputs = outputs[self.compartment_names].to_numpy(dtype=float)
         self.derived_outputs = (
             {
-                key: list(value.values())
-                for key, value in derived_outputs.items()
-                if key not in ["idx", "Scenario", "times"]
+                key: derived_outputs[key].tolist()
+                for key in derived_outputs.columns
+                if key not in INDEX_COLUMNS
             }
             if derived_outputs is not None
             else None
         )
 
-        self.times = list(outputs["times"].values())
+        self.times = outputs["times"].tolist()
         self.all_stratifications = {}
         # lateXagegroup_75Xclinical_sympt_non_hospital
         for compartment_name in self.compartment_names:
@@ -1,10 +1,16 @@
 """
 Used to load model parameters from file
+
+Params are layered, eg. the default params, then scenario params, then calibration params.
+Each layer is applied with copy-on-write: only the dicts and lists along the path to a changed value are copied,
+and everything else is shared with the layer below.
+Layered params must therefore be treated as read-only, and are materialised into independent plain dicts
+before they are given to a model builder, which may modify them.
 """
 import os
 import re
 import yaml
-from copy import deepcopy
+from copy import copy
 from os import path
 
 from autumn.constants import APPS_PATH
@@ -85,8 +91,10 @@ def update_params(params: dict, updates: dict) -> dict:
         returns {"foo": 2, "bar" {"baz": 3}, "bing": [1, 4]}
 
     See tests for more details.
+    The params are not modified. The updated params share all unchanged values with the params,
+    so treat both as read-only, see materialise_params.
     """
-    ps = deepcopy(params)
+    ps = params
     for key, val in updates.items():
         ps = _update_params(ps, key, val)
 
@@ -98,7 +106,8 @@ ARRAY_REQUEST_REGEX = r"^\w+\(-?\d\)$"
 
 
 def _update_params(params: dict, update_key: str, update_val) -> dict:
-    ps = deepcopy(params)
+    # Copy only this level of the params, the values which are not updated are shared.
+    ps = copy(params)
     keys = update_key.split(".")
     current_key, nested_keys = keys[0], keys[1:]
     is_arr_update = re.match(ARRAY_REQUEST_REGEX, current_key)
@@ -108,11 +117,13 @@ def _update_params(params: dict, update_key: str, update_val) -> dict:
         key, idx_str = current_key.replace(")", "").split("(")
         idx = int(idx_str)
         child_key = ".".join(nested_keys)
+        ps[key] = copy(ps[key])
         ps[key][idx] = _update_params(ps[key][idx], child_key, update_val)
     elif is_arr_update:
         # Array item replacement.
         key, idx_str = update_key.replace(")", "").split("(")
         idx = int(idx_str)
+        ps[key] = copy(ps[key])
         ps[key][idx] = update_val
     elif is_nested_update:
         # Nested dictionary replacement.
@@ -125,3 +136,32 @@ def _update_params(params: dict, update_key: str, update_val) -> dict:
         ps[key] = update_val
 
     return ps
+
+
+def merge_params(src: dict, dest: dict) -> dict:
+    """
+    Merge src params into dest params, like merge_dicts, but without modifying dest.
+    The merged params share all unchanged values with src and dest, so treat them as read-only.
+    """
+    merged = copy(dest)
+    for key, value in src.items():
+        if isinstance(value, dict):
+            node = merged.get(key, {})
+            merged[key] = value if node is None else merge_params(value, node)
+        else:
+            merged[key] = value
+
+    return merged
+
+
+def materialise_params(params):
+    """
+    Returns a copy of layered params, with its own dicts and lists, which can be safely modified.
+    Only containers are copied, which is much faster than a deepcopy for params with long timeseries.
+    """
+    if isinstance(params, dict):
+        return {key: materialise_params(value) for key, value in params.items()}
+    elif isinstance(params, list):
+        return [materialise_params(value) for value in params]
+    else:
+        return params
@@ -0,0 +1,222 @@
+"""
+Caching for model run outputs.
+
+The same parameter sets are often run many times, eg. when re-running accepted MCMC runs
+or evaluating mixing optimisation decision variables.
+Run outputs are saved to disk, keyed on a hash of everything that determines them:
+the model builder, the resolved params, the starting compartment values, the requested derived outputs,
+the input database hash and a hash of the model source code.
+Changing any of these gives a new key, so stale runs are never returned.
+The model builder must only depend on its params, since any other state it uses is not part of the key.
+The least recently used runs are deleted once the cache is full.
+Its size is set in bytes, with the AUTUMN_RUN_CACHE_MAX_BYTES environment variable.
+"""
+import os
+import json
+import hashlib
+import logging
+from functools import lru_cache
+
+import numpy as np
+
+from autumn import constants
+
+logger = logging.getLogger(__name__)
+
+# Max total size, in bytes, of the runs saved to disk.
+RUN_CACHE_MAX_BYTES = int(os.environ.get("AUTUMN_RUN_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+# Fraction of the max size written by a process between checks for runs to evict.
+RUN_CACHE_EVICTION_FRACTION = 0.05
+# Packages with source code that determines the model outputs.
+RUN_CACHE_CODE_PACKAGES = ["summer", "autumn", "apps"]
+
+# Prefix of derived output arrays in a cached run file.
+_DERIVED_PREFIX = "derived__"
+
+# Bytes written by this process since the cache was last checked for runs to evict.
+_bytes_since_eviction = 0
+
+
+def get_run_cache_dir():
+    return os.path.join(constants.DATA_PATH, "run-cache")
+
+
+def get_run_key(
+    model_builder, params: dict, start_values, derived_output_keys=None, derived_output_times=None
+):
+    """
+    Returns a key for a model run.
+    """
+    if start_values is not None:
+        start_values = np.asarray(start_values, dtype=float)
+
+    run_str = json.dumps(
+        [
+            get_code_hash(),
+            get_input_db_hash(),
+            f"{model_builder.__module__}.{model_builder.__qualname__}",
+            params,
+            start_values,
+            derived_output_keys,
+            derived_output_times,
+        ],
+        sort_keys=True,
+        default=_to_json,
+    )
+    return hashlib.md5(run_str.encode()).hexdigest()
+
+
+def _to_json(obj):
+    """
+    Converts objects which are not JSON serializable, such as numpy arrays and dates.
+    """
+    try:
+        return obj.tolist()
+    except AttributeError:
+        return repr(obj)
+
+
+@lru_cache(maxsize=1)
+def get_code_hash():
+    """
+    Returns a hash of the model source code, which changes whenever any source file is edited.
+    """
+    code_hash = hashlib.md5()
+    for package in RUN_CACHE_CODE_PACKAGES:
+        package_path = os.path.join(constants.BASE_PATH, package)
+        for dir_path, dir_names, file_names in os.walk(package_path):
+            dir_names.sort()
+            for file_name in sorted(file_names):
+                if file_name.endswith(".py"):
+                    file_path = os.path.join(dir_path, file_name)
+                    code_hash.update(os.path.relpath(file_path, constants.BASE_PATH).encode())
+                    with open(file_path, "rb") as f:
+                        code_hash.update(f.read())
+
+    return code_hash.hexdigest()
+
+
+def get_input_db_hash():
+    """
+    Returns the input database hash, or None for models which are run without an input database.
+    """
+    # Imported here because autumn.inputs depends on autumn.tool_kit.
+    from autumn.inputs.database import input_db_hash_path, read_file_hash
+
+    try:
+        return read_file_hash(input_db_hash_path)
+    except FileNotFoundError:
+        return None
+
+
+def read_cached_run(key: str):
+    """
+    Returns the outputs of a cached run, or None if the run has not been cached.
+    The outputs are a dict with the compartment names, times, outputs and derived outputs of the model.
+    """
+    path = os.path.join(get_run_cache_dir(), f"{key}.npz")
+    try:
+        with np.load(path) as run_file:
+            run_outputs = {
+                "compartment_names": run_file["compartment_names"].tolist(),
+                "times": run_file["times"].tolist(),
+                "outputs": run_file["outputs"],
+                "derived_outputs": {
+                    name[len(_DERIVED_PREFIX) :]: run_file[name].tolist()
+                    for name in run_file.files
+                    if name.startswith(_DERIVED_PREFIX)
+                },
+            }
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError):
+        logger.warning("Ignoring corrupt run cache file %s", path)
+        return None
+
+    # Mark the run as recently used.
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+
+    return run_outputs
+
+
+def can_cache_runs(num_runs: int, run_bytes: int) -> bool:
+    """
+    Returns True if a job's runs all fit in the cache.
+    If they don't, a re-run of the job evicts each run before it is read again,
+    so caching the job's runs only adds the cost of writing them.
+    """
+    return num_runs * run_bytes <= RUN_CACHE_MAX_BYTES
+
+
+def estimate_run_bytes(model) -> int:
+    """
+    Returns an estimate of the size of a model's cached outputs, before the model is run.
+    Compressed runs are smaller than this, so it gives an upper bound on the number of runs which fit in the cache.
+    """
+    return 8 * len(model.times) * len(model.compartment_names)
+
+
+def write_cached_run(key: str, model):
+    """
+    Saves the outputs of a model run, compressed.
+    The least recently used runs are deleted if the cache is full, which is checked once this process
+    has written a fraction of the cache's size, so that the cache isn't scanned after every write.
+    The file is written atomically, so concurrent processes never read a partial run.
+    """
+    global _bytes_since_eviction
+    cache_dir = get_run_cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{key}.npz")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    derived_outputs = {
+        f"{_DERIVED_PREFIX}{name}": np.asarray(values)
+        for name, values in model.derived_outputs.items()
+    }
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(
+            f,
+            compartment_names=np.array(model.compartment_names),
+            times=np.asarray(model.times),
+            outputs=np.asarray(model.outputs),
+            **derived_outputs,
+        )
+
+    os.replace(tmp_path, path)
+    _bytes_since_eviction += os.path.getsize(path)
+    if _bytes_since_eviction > RUN_CACHE_MAX_BYTES * RUN_CACHE_EVICTION_FRACTION:
+        evict_cached_runs()
+        _bytes_since_eviction = 0
+
+
+def evict_cached_runs(max_bytes=None):
+    """
+    Deletes the least recently used runs, so that at most max_bytes of runs are cached.
+    """
+    max_bytes = RUN_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    cache_dir = get_run_cache_dir()
+
+    # Another process may delete a run at the same time, so ignore runs which have gone.
+    runs = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith(".npz"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+
+            runs.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total_bytes = sum(size for _, size, _ in runs)
+    for _, size, path in sorted(runs):
+        if total_bytes <= max_bytes:
+            break
+
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+        total_bytes -= size
@@ -1,18 +1,22 @@
 """
 Utilities for running multiple model scenarios
 """
+import logging
 import numpy
-from copy import deepcopy
-from typing import Callable
+from concurrent import futures
+from typing import Callable, List
 
-from summer.model import StratifiedModel
+from summer.model import StratifiedModel, run_model_batch
 
 from autumn.tool_kit import schema_builder as sb
 from autumn.tool_kit.timer import Timer
 
 from ..constants import IntegrationType
 
-from .utils import merge_dicts
+from .params import merge_params, materialise_params
+from .run_cache import get_run_key, read_cached_run, write_cached_run
+
+logger = logging.getLogger(__name__)
 
 validate_params = sb.build_validator(default=dict, scenario_start_time=float, scenarios=dict)
 
@@ -25,13 +29,13 @@ class Scenario:
     """
 
     def __init__(self, model_builder: ModelBuilderType, idx: str, params: dict, chain_idx=0):
-        _params = deepcopy(params)
-        validate_params(_params)
+        # The params are shared, rather than copied, so they must not be modified, see autumn.tool_kit.params.
+        validate_params(params)
         self.model_builder = model_builder
         self.idx = idx
         self.chain_idx = chain_idx
         self.name = "baseline" if idx == 0 else f"scenario-{idx}"
-        self.params = _params
+        self.params = params
         self.generated_outputs = None
 
     @classmethod
@@ -45,53 +49,106 @@ class Scenario:
         scenario.model = model
         return scenario
 
-    def run(self, base_model=None, update_func=None):
+    def run(
+        self,
+        base_model=None,
+        update_func=None,
+        derived_output_keys=None,
+        derived_output_times=None,
+        start_compartment_values=None,
+        use_cache=False,
+    ):
         """
         Run the scenario model simulation.
         If a base model is provided, then run the scenario from the scenario start time.
+        Alternatively, the base model's compartment values at the scenario start time can be provided,
+        see get_start_compartment_values.
         If a parameter update function is provided, it will be used to update params before the model is run.
+        If derived output keys or times are provided, only those derived outputs are calculated, at those times.
+        If the run cache is used, then the model outputs are read from the cache if this run has been cached,
+        in which case the scenario's model is a ModelOutputs rather than a full model.
         """
         with Timer(f"Running scenario: {self.name}"):
-            params = None
-            if not base_model:
-                # This model is the baseline model
-                assert self.is_baseline, "Can only run base model if Scenario idx is 0"
-                params = self.params["default"]
-                if update_func:
-                    # Apply extra parameter updates
-                    params = update_func(params)
-
-                self.model = self.model_builder(params)
-            else:
-                # This is a scenario model, based off the baseline model
-                assert not self.is_baseline, "Can only run scenario model if Scenario idx is > 0"
-
-                # Construct scenario params by merging scenario-specific params into default params
-                default_params = self.params["default"]
-                scenario_params = self.params["scenarios"][self.idx]
-                params = merge_dicts(scenario_params, default_params)
-
-                if update_func:
-                    # Apply extra parameter updates
-                    params = update_func(params)
-
-                # Override start time.
-                params = {**params, "start_time": self.params["scenario_start_time"]}
-
-                base_times = base_model.times
-                base_outputs = base_model.outputs
-
-                # Find the time step from which we will start the scenario
-                start_index = get_scenario_start_index(base_times, params["start_time"])
-                start_time = base_times[start_index]
-                init_compartments = base_outputs[start_index, :]
-
-                # Create the new scenario model using the scenario-specific params,
-                # ensuring the initial conditions are the same for the given start time.
-                self.model = self.model_builder(params)
-                self.model.compartment_values = init_compartments
-
-            self.model.run_model(IntegrationType.SOLVE_IVP)
+            params, start_compartment_values = self.get_model_inputs(
+                base_model, update_func, start_compartment_values
+            )
+            if use_cache:
+                run_key = get_run_key(
+                    self.model_builder,
+                    params,
+                    start_compartment_values,
+                    derived_output_keys,
+                    derived_output_times,
+                )
+                cached_outputs = read_cached_run(run_key)
+                if cached_outputs:
+                    logger.info("Using cached outputs for scenario %s", self.name)
+                    self.model = ModelOutputs(**cached_outputs)
+                    return
+
+            self.build_model(params, start_compartment_values)
+            self.model.run_model(
+                IntegrationType.SOLVE_IVP,
+                derived_output_keys=derived_output_keys,
+                derived_output_times=derived_output_times,
+            )
+            if use_cache:
+                write_cached_run(run_key, self.model)
+
+    def get_model_inputs(self, base_model=None, update_func=None, start_compartment_values=None):
+        """
+        Returns the params and the starting compartment values used to build the scenario model.
+        The starting compartment values are None for the baseline model.
+        See run for a description of the arguments.
+        """
+        params = None
+        if not base_model and start_compartment_values is None:
+            # This model is the baseline model
+            assert self.is_baseline, "Can only run base model if Scenario idx is 0"
+            params = self.params["default"]
+            if update_func:
+                # Apply extra parameter updates
+                params = update_func(params)
+
+        else:
+            # This is a scenario model, based off the baseline model
+            assert not self.is_baseline, "Can only run scenario model if Scenario idx is > 0"
+
+            # Construct scenario params by merging scenario-specific params into default params
+            default_params = self.params["default"]
+            scenario_params = self.params["scenarios"][self.idx]
+            params = merge_params(scenario_params, default_params)
+
+            if update_func:
+                # Apply extra parameter updates
+                params = update_func(params)
+
+            # Override start time.
+            params = {**params, "start_time": self.params["scenario_start_time"]}
+
+            # Find the compartment values from which we will start the scenario
+            if start_compartment_values is None:
+                start_compartment_values = self.get_start_compartment_values(base_model)
+
+        return params, start_compartment_values
+
+    def build_model(self, params: dict, start_compartment_values=None):
+        """
+        Build the scenario model, ready to be run.
+        If starting compartment values are provided, the model is run from those values,
+        ensuring the initial conditions are the same as the base model at the scenario start time.
+        """
+        self.model = self.model_builder(materialise_params(params))
+        if start_compartment_values is not None:
+            self.model.compartment_values = start_compartment_values
+
+    def get_start_compartment_values(self, base_model):
+        """
+        Returns the base model's compartment values at the scenario start time.
+        This is all a scenario needs from the base model, so it can be sent to another process instead of the model.
+        """
+        start_index = get_scenario_start_index(base_model.times, self.params["scenario_start_time"])
+        return numpy.array(base_model.outputs[start_index, :])
 
     @property
     def is_baseline(self):
@@ -104,6 +161,102 @@ class Scenario:
         return self.model and self.model.outputs is not None
 
 
+def run_forked_scenarios(
+    scenarios: List[Scenario],
+    base_model,
+    update_func=None,
+    derived_output_keys=None,
+    derived_output_times=None,
+    use_cache=False,
+):
+    """
+    Run scenario models which fork from the base model at the scenario start time.
+    Each scenario model is built from its own params, and then scenarios with the same compartments
+    and times are run as a batch, see run_model_batch. Each scenario's outputs are the same as when it is
+    run on its own, so they don't depend on the other scenarios and can be cached.
+    See Scenario.run for a description of the other arguments.
+    """
+    scenario_names = ", ".join(s.name for s in scenarios)
+    with Timer(f"Running forked scenarios: {scenario_names}"):
+        batches = {}
+        run_keys = {}
+        for scenario in scenarios:
+            params, start_compartment_values = scenario.get_model_inputs(base_model, update_func)
+            if use_cache:
+                run_key = get_run_key(
+                    scenario.model_builder,
+                    params,
+                    start_compartment_values,
+                    derived_output_keys,
+                    derived_output_times,
+                )
+                cached_outputs = read_cached_run(run_key)
+                if cached_outputs:
+                    logger.info("Using cached outputs for scenario %s", scenario.name)
+                    scenario.model = ModelOutputs(**cached_outputs)
+                    continue
+
+                run_keys[scenario.name] = run_key
+
+            scenario.build_model(params, start_compartment_values)
+            batch_key = (tuple(scenario.model.compartment_names), tuple(scenario.model.times))
+            batches.setdefault(batch_key, []).append(scenario)
+
+        for batch_scenarios in batches.values():
+            run_model_batch(
+                [s.model for s in batch_scenarios],
+                IntegrationType.SOLVE_IVP,
+                derived_output_keys=derived_output_keys,
+                derived_output_times=derived_output_times,
+            )
+            for scenario in batch_scenarios:
+                if use_cache:
+                    write_cached_run(run_keys[scenario.name], scenario.model)
+
+
+class ModelOutputs:
+    """
+    The outputs of a model run, without the model itself.
+    Unlike a model, these can be sent between processes, and they can be stored like a model.
+    """
+
+    def __init__(self, compartment_names: list, times: list, outputs, derived_outputs: dict):
+        self.compartment_names = compartment_names
+        self.times = times
+        self.outputs = outputs
+        self.derived_outputs = derived_outputs
+
+    @classmethod
+    def from_model(cls, model: StratifiedModel):
+        return cls(model.compartment_names, model.times, model.outputs, model.derived_outputs)
+
+
+# The model builder and params of the scenarios run in a worker process.
+_worker_model_builder = None
+_worker_params = None
+
+
+def get_scenario_worker_pool(
+    model_builder: ModelBuilderType, params: dict, n_workers: int
+) -> futures.ProcessPoolExecutor:
+    """
+    Returns a pool of worker processes to run scenarios.
+    The model builder and params are set before the pool is created, so that they are inherited
+    by the forked worker processes rather than being sent with each task.
+    """
+    global _worker_model_builder, _worker_params
+    _worker_model_builder = model_builder
+    _worker_params = params
+    return futures.ProcessPoolExecutor(max_workers=n_workers)
+
+
+def get_worker_scenario(idx: int) -> Scenario:
+    """
+    Returns a scenario, in a worker process from get_scenario_worker_pool.
+    """
+    return Scenario(_worker_model_builder, idx, _worker_params)
+
+
 def get_scenario_start_index(base_times, scenario_start_time):
     """
     Returns the index of the closest time step that is at, or before the scenario start time.
@@ -1,11 +1,47 @@
 """
 Cerberus schema building utilities
 See: https://docs.python-cerberus.org/en/stable/index.html
+
+The schemas built here only check the structure of the data: its keys, and the types of its values.
+So validating data with the same structure always gives the same result, and validators only run Cerberus
+for structures which they have not seen before, which is much faster for repeated validation of
+params with the same structure but different values, eg. calibration params.
 """
+from contextlib import contextmanager
+
 from cerberus import Validator
 
+from summer.model.utils.validation import trust_model_inputs
+
 PRIMITIVES = [int, float, bool, str, dict, list]
 
+# Max number of valid data structures remembered by each validator.
+VALIDATOR_CACHE_SIZE = 256
+
+# Whether validation is skipped, see trusted_validation.
+_is_trusted = False
+
+
+@contextmanager
+def trusted_validation(is_trusted=True):
+    """
+    Skip validation of params and models, eg. in a hot loop where the params are built by code
+    that only produces valid params.
+    Validation runs as usual if is_trusted is False, eg. for the first iteration of a hot loop.
+    """
+    if not is_trusted:
+        yield
+        return
+
+    global _is_trusted
+    was_trusted = _is_trusted
+    _is_trusted = True
+    try:
+        with trust_model_inputs():
+            yield
+    finally:
+        _is_trusted = was_trusted
+
 
 def build_validator(**schema):
     """
@@ -13,19 +49,64 @@ def build_validator(**schema):
     based on the supplied validation schema.
     """
     cerberus_schema = _build_schema(schema)
+    valid_structures = set()
 
     def validate(data: dict):
         """
         Ensure data adhers to schema.
         """
+        if _is_trusted:
+            return
+
+        structure = get_structure(cerberus_schema, data)
+        if structure in valid_structures:
+            return
+
         validator = Validator(cerberus_schema, allow_unknown=False, require_all=True)
         if not validator.validate(data):
             errors = validator.errors
             raise ValidationException(errors)
 
+        if len(valid_structures) >= VALIDATOR_CACHE_SIZE:
+            valid_structures.clear()
+
+        valid_structures.add(structure)
+
     return validate
 
 
+def get_structure(schema: dict, data):
+    """
+    Returns a hashable description of the parts of some data that are checked by a Cerberus schema,
+    which is a mapping from keys to rules: the keys of the data, and the types of its values.
+    """
+    if not isinstance(data, dict):
+        return type(data)
+
+    return frozenset((k, _get_value_structure(schema.get(k), v)) for k, v in data.items())
+
+
+def _get_value_structure(rules, value):
+    if rules is None:
+        # The key is not in the schema, so the data is invalid.
+        return type(value)
+
+    item_schema = rules.get("schema")
+    if isinstance(value, dict) and isinstance(item_schema, dict) and rules.get("type") == "dict":
+        return get_structure(item_schema, value)
+    elif isinstance(value, dict) and "valuesrules" in rules:
+        keys_rules = rules.get("keysrules")
+        values_rules = rules["valuesrules"]
+        return frozenset(
+            (_get_value_structure(keys_rules, k), _get_value_structure(values_rules, v))
+            for k, v in value.items()
+        )
+    elif isinstance(value, list) and item_schema:
+        return (list, frozenset(_get_value_structure(item_schema, v) for v in value))
+    else:
+        return type(value)
+
+
 def build_schema(**schema):
     return _build_schema(schema)
 
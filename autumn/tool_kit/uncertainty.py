@@ -36,6 +36,7 @@ def add_uncertainty_weights(output_name: str, database_path: str):
     logger.info("Calculating weighted values for %s", output_name)
     weights_df = calc_mcmc_weighted_values(output_name, mcmc_df, derived_outputs_df)
     db.dump_df("uncertainty_weights", weights_df)
+    db.create_indexes()
     logger.info("Finished writing %s uncertainty weights", output_name)
 
 
@@ -93,6 +94,7 @@ def add_uncertainty_quantiles(database_path: str):
     logger.info("Calculating uncertainty")
     uncertainty_df = calculate_mcmc_uncertainty(weights_df, DEFAULT_QUANTILES)
     db.dump_df("uncertainty", uncertainty_df)
+    db.create_indexes()
     logger.info("Finished writing uncertainties")
 
 
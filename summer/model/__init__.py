@@ -1,3 +1,4 @@
 from .epi_model import EpiModel
 from .strat_model import StratifiedModel
+from .batch import run_model_batch
 from .utils import *
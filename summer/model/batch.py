@@ -0,0 +1,78 @@
+"""
+Running a batch of models with the same structure in a single ODE solver pass.
+
+Models which only differ in their parameters, eg. policy scenarios with different time-variant inputs,
+can be integrated together by stacking their compartment values into a single state vector.
+This is only done with fixed step solvers, which give each model the same outputs as when it is run on its own.
+An adaptive solver would share its step sizes and error control across the batch, so each model's outputs
+would depend on the other models in the batch. With adaptive solvers, each model is integrated separately.
+"""
+from typing import List
+
+import numpy as np
+
+from ..constants import IntegrationType
+from .epi_model import EpiModel
+from .utils.solver import solve_ode
+
+# Solvers with steps that don't depend on the values being integrated, so models can be batched together.
+BATCHED_INTEGRATION_TYPES = [IntegrationType.EULER, IntegrationType.RUNGE_KUTTA]
+
+def run_model_batch(
+    models: List[EpiModel],
+    integration_type=IntegrationType.SOLVE_IVP,
+    solver_args={},
+    derived_output_keys=None,
+    derived_output_times=None,
+):
+    """
+    Calculates the outputs of a batch of models using a single ODE solver pass.
+
+    All models must have the same compartments and times, and they are each run from their own
+    initial conditions (model.compartment_values).
+    Derived outputs are calculated for each model as in EpiModel.run_model.
+    Each model's outputs are the same as when it is run on its own, since models are only integrated
+    together with fixed step solvers, see BATCHED_INTEGRATION_TYPES.
+    """
+    if not models:
+        return
+
+    compartment_names = models[0].compartment_names
+    times = models[0].times
+    for model in models[1:]:
+        if model.compartment_names != compartment_names:
+            raise ValueError("All models in a batch must have the same compartments.")
+        if not np.array_equal(model.times, times):
+            raise ValueError("All models in a batch must have the same times.")
+
+    if integration_type not in BATCHED_INTEGRATION_TYPES:
+        for model in models:
+            model.run_model(integration_type, solver_args, derived_output_keys, derived_output_times)
+
+        return
+
+    for model in models:
+        model.prepare_to_run()
+
+    num_models = len(models)
+    num_compartments = len(compartment_names)
+
+    def get_batch_flow_rates(batch_values, time):
+        """
+        Returns the flow rates of all models in the batch, stacked in the same order as their values.
+        """
+        batch_values = batch_values.reshape(num_models, num_compartments)
+        flow_rates = np.empty((num_models, num_compartments))
+        for model_idx, model in enumerate(models):
+            flow_rates[model_idx] = model.get_flow_rates(batch_values[model_idx], time)
+
+        return flow_rates.reshape(-1)
+
+    start_values = np.concatenate([np.array(m.compartment_values, dtype=float) for m in models])
+    batch_outputs = solve_ode(
+        integration_type, get_batch_flow_rates, start_values, times, solver_args
+    )
+    batch_outputs = batch_outputs.reshape(len(batch_outputs), num_models, num_compartments)
+    for model_idx, model in enumerate(models):
+        outputs = np.ascontiguousarray(batch_outputs[:, model_idx, :])
+        model.set_outputs(outputs, derived_output_keys, derived_output_times)
@@ -4,6 +4,7 @@ import logging
 import matplotlib.pyplot
 import numpy as np
 import pandas as pd
+from scipy import sparse
 
 from ..constants import (
     Compartment,
@@ -18,7 +19,9 @@ from .utils import (
     convert_boolean_list_to_indices,
     find_name_components,
     find_stem,
+    get_death_output_name,
     increment_list_by_index,
+    is_vectorised_derived_output,
 )
 
 logger = logging.getLogger(__name__)
@@ -55,6 +58,11 @@ class EpiModel:
     :attribute derived_output_functions: dict
         functions that can be used during the process of integration to calculate quantities emerging from the model
             that may not be as simple as that specified in output_connections
+        functions are called with (model, time) for each time point, or once with arrays of all the time points
+            if they are marked with vectorised_derived_output
+    :attribute derived_output_dependencies: dict
+        optional keys are derived output function names, values are the keys of the other derived outputs that the
+            function reads, used to work out which outputs are needed when only some outputs are requested
     :attribute derived_outputs: dict
         quantities whose values are to be recorded throughout integration, i.e. tracked_quantities
         collated as lists for each time step with descriptive keys equivalent to those for tracked_quantities
@@ -170,6 +178,7 @@ class EpiModel:
         self.compartment_types = compartment_types
         self.death_output_categories = death_output_categories or tuple()
         self.derived_output_functions = derived_output_functions or {}
+        self.derived_output_dependencies = {}
         self.derived_outputs = {"times": times}
         self.entry_compartment = entry_compartment
         self.infectious_compartment = infectious_compartment
@@ -276,6 +285,27 @@ class EpiModel:
         # Create mapping from compartment name to index.
         self.compartment_idx_lookup = {name: idx for idx, name in enumerate(self.compartment_names)}
 
+        # Index the implemented transition flows by origin and target stem, for resolving output connections.
+        self.transition_flow_index = self.build_transition_flow_index()
+
+    def build_transition_flow_index(self):
+        """
+        Returns a dict mapping each (origin stem, target stem) pair to the implemented transition flows between them,
+            as a list of (flow index, origin name components, target name components)
+        """
+        flow_index = {}
+        for flow_idx in range(len(self.transition_flows)):
+            if self.transition_flows_dict["implement"][flow_idx] != len(self.all_stratifications):
+                continue
+
+            origin = self.transition_flows_dict["origin"][flow_idx]
+            target = self.transition_flows_dict["to"][flow_idx]
+            flow_index.setdefault((find_stem(origin), find_stem(target)), []).append(
+                (flow_idx, set(find_name_components(origin)), set(find_name_components(target)))
+            )
+
+        return flow_index
+
     def find_all_infectious_indices(self):
         """
         find all the compartment names that begin with one of the requested infectious compartments
@@ -311,7 +341,13 @@ class EpiModel:
     model running methods
     """
 
-    def run_model(self, integration_type=IntegrationType.SOLVE_IVP, solver_args={}):
+    def run_model(
+        self,
+        integration_type=IntegrationType.SOLVE_IVP,
+        solver_args={},
+        derived_output_keys=None,
+        derived_output_times=None,
+    ):
         """
         Calculates the model's outputs using an ODE solver.
 
@@ -320,31 +356,39 @@ class EpiModel:
 
         The final result is an array of compartment values at each timestep (self.outputs).
         Also calculates post-processing outputs after the ODE integration is complete.
+        A lean run can be requested by specifying derived_output_keys and/or derived_output_times,
+        see calculate_derived_outputs.
         """
         self.prepare_to_run()
-
-        def ode_func(compartment_values, time):
-            """
-            Inner loop of ODE solver which describes ODE dynamics.
-            Returns the flow rates at the current timestep,
-            given the current compartment values and time.
-            """
-            self.update_tracked_quantities(compartment_values)
-            return self.apply_all_flow_types_to_odes(compartment_values, time)
-
-        self.outputs = solve_ode(
-            integration_type, ode_func, np.array(self.compartment_values), self.times, solver_args,
+        outputs = solve_ode(
+            integration_type,
+            self.get_flow_rates,
+            np.array(self.compartment_values),
+            self.times,
+            solver_args,
         )
+        self.set_outputs(outputs, derived_output_keys, derived_output_times)
+
+    def get_flow_rates(self, compartment_values, time):
+        """
+        Inner loop of ODE solver which describes ODE dynamics.
+        Returns the flow rates at the current timestep,
+        given the current compartment values and time.
+        """
+        self.update_tracked_quantities(compartment_values)
+        return self.apply_all_flow_types_to_odes(compartment_values, time)
+
+    def set_outputs(self, outputs, derived_output_keys=None, derived_output_times=None):
+        """
+        Stores the compartment values found by the ODE solver, and calculates the derived outputs.
+        """
+        self.outputs = outputs
 
         # Check that all compartment values are >= 0
         if np.any(self.outputs < 0.0):
             logger.info("Warning: compartment(s) with negative values.")
 
-        # Collate outputs to be calculated post-integration that are not just compartment sizes.
-        self.calculate_post_integration_connection_outputs()
-        for death_output in self.death_output_categories:
-            self.calculate_post_integration_death_outputs(death_output)
-        self.calculate_post_integration_function_outputs()
+        self.calculate_derived_outputs(derived_output_keys, derived_output_times)
 
     def apply_all_flow_types_to_odes(self, compartment_values, time):
         """
@@ -610,51 +654,167 @@ class EpiModel:
     post-integration collation of user-requested output values
     """
 
-    def calculate_post_integration_connection_outputs(self):
+    def calculate_derived_outputs(self, output_keys=None, times=None):
+        """
+        Collate outputs to be calculated post-integration that are not just compartment sizes.
+
+        By default, every derived output is calculated at every model time step.
+        If output_keys is provided, only those outputs and the outputs they depend on are calculated.
+        If times is provided, outputs are only evaluated at those model times and are left as zero elsewhere.
+        This can be called again after a lean run to calculate the full set of derived outputs.
+        """
+        if times is None:
+            time_idxs = list(range(len(self.times)))
+        else:
+            requested_times = set(times)
+            time_idxs = [idx for idx, time in enumerate(self.times) if time in requested_times]
+
+        required_outputs = None
+        if output_keys is not None:
+            required_outputs = self.find_required_derived_outputs(output_keys)
+
+        def is_required(output):
+            return required_outputs is None or output in required_outputs
+
+        connection_outputs = [o for o in self.output_connections if is_required(o)]
+        self.calculate_post_integration_connection_outputs(connection_outputs, time_idxs)
+        for death_output in self.death_output_categories:
+            if is_required(get_death_output_name(death_output)):
+                self.calculate_post_integration_death_outputs(death_output, time_idxs)
+
+        function_outputs = [o for o in self.derived_output_functions if is_required(o)]
+        self.calculate_post_integration_function_outputs(function_outputs, time_idxs)
+
+    def find_required_derived_outputs(self, output_keys):
+        """
+        Returns the set of derived output keys needed to calculate the requested outputs.
+        Derived output functions without declared dependencies may read any output calculated before them,
+        so they are assumed to depend on all of them.
+        """
+        death_outputs = [get_death_output_name(d) for d in self.death_output_categories]
+        function_outputs = list(self.derived_output_functions.keys())
+        required_outputs = set()
+        pending_outputs = list(output_keys)
+        while pending_outputs:
+            output = pending_outputs.pop()
+            if output in required_outputs:
+                continue
+
+            required_outputs.add(output)
+            if output not in self.derived_output_functions:
+                continue
+
+            if output in self.derived_output_dependencies:
+                pending_outputs += self.derived_output_dependencies[output]
+            else:
+                prior_function_outputs = function_outputs[: function_outputs.index(output)]
+                pending_outputs += [
+                    *self.output_connections.keys(),
+                    *death_outputs,
+                    *prior_function_outputs,
+                ]
+
+        return required_outputs
+
+    def calculate_post_integration_connection_outputs(self, outputs=None, time_idxs=None):
         """
         find outputs based on connections of transition flows for each requested time point, rather than at the time
             points that the model integration steps occurred at, which are arbitrary and determined by the integration
             routine used
+        each relevant flow is evaluated once per time point, and summed into the outputs with a sparse matrix
+        """
+        outputs = list(self.output_connections if outputs is None else outputs)
+        time_idxs = range(len(self.times)) if time_idxs is None else time_idxs
+        flow_idxs, aggregation_matrix = self.build_connection_output_matrix(outputs)
+        output_values = np.zeros((len(outputs), len(self.times)))
+        for ntime in time_idxs:
+            time = self.times[ntime]
+            self.restore_past_state(time)
+            net_flows = np.array(
+                [
+                    self.find_net_transition_flow(n_flow, time, self.compartment_values)
+                    for n_flow in flow_idxs
+                ]
+            )
+            output_values[:, ntime] = aggregation_matrix.dot(net_flows) if flow_idxs else 0.0
+
+        for output, values in zip(outputs, output_values):
+            self.derived_outputs[output] = values.tolist()
+
+    def build_connection_output_matrix(self, outputs):
         """
-        for output in self.output_connections:
-            self.derived_outputs[output] = [0.0] * len(self.times)
-            transition_indices = self.find_output_transition_indices(output)
-            for ntime, time in enumerate(self.times):
-                self.restore_past_state(time)
-                for n_flow in transition_indices:
-                    net_flow = self.find_net_transition_flow(n_flow, time, self.compartment_values)
-                    self.derived_outputs[output][ntime] += net_flow
+        Returns the transition flows needed for the requested connection outputs,
+            and a sparse matrix which sums the net flow rates of those flows into each output
+
+        :param outputs: list
+            keys of the output connections
+        :return: tuple
+            list of flow indices, and sparse matrix with one row per output and one column per flow
+        """
+        output_flow_idxs = [self.find_output_transition_indices(output) for output in outputs]
+        flow_idxs = sorted(set().union(*output_flow_idxs))
+        column_lookup = {flow_idx: column for column, flow_idx in enumerate(flow_idxs)}
+        rows, columns = [], []
+        for row, idxs in enumerate(output_flow_idxs):
+            rows += [row] * len(idxs)
+            columns += [column_lookup[flow_idx] for flow_idx in idxs]
+
+        aggregation_matrix = sparse.csr_matrix(
+            (np.ones(len(rows)), (rows, columns)), shape=(len(outputs), len(flow_idxs))
+        )
+        return flow_idxs, aggregation_matrix
 
-    def calculate_post_integration_death_outputs(self, death_output):
+    def calculate_post_integration_death_outputs(self, death_output, time_idxs=None):
         """
         find outputs based on connections of transition flows for each requested time point, rather than at the time
             points that the model integration steps occurred at, which are arbitrary and determined by the integration
             routine used
         """
-        category_name = (
-            "infection_deathsXall"
-            if death_output == ()
-            else "infection_deathsX" + "X".join(death_output)
-        )
+        category_name = get_death_output_name(death_output)
+        time_idxs = range(len(self.times)) if time_idxs is None else time_idxs
         self.derived_outputs[category_name] = [0.0] * len(self.times)
         death_indices = self.find_output_death_indices(death_output)
-        for ntime, time in enumerate(self.times):
+        for ntime in time_idxs:
+            time = self.times[ntime]
             self.restore_past_state(time)
             for n_flow in death_indices:
                 net_flow = self.find_net_infection_death_flow(n_flow, time, self.compartment_values)
                 self.derived_outputs[category_name][ntime] += net_flow
 
-    def calculate_post_integration_function_outputs(self):
+    def calculate_post_integration_function_outputs(self, outputs=None, time_idxs=None):
         """
         similar to previous method, find outputs that are based on model functions
-        """
-        for output in self.derived_output_functions:
-            self.derived_outputs[output] = [0.0] * len(self.times)
-            for ntime, time in enumerate(self.times):
-                self.restore_past_state(time)
-                self.derived_outputs[output][ntime] = self.derived_output_functions[output](
-                    self, time
+        vectorised functions are called once with the outputs at all the requested time points
+        """
+        outputs = self.derived_output_functions if outputs is None else outputs
+        time_idxs = list(range(len(self.times)) if time_idxs is None else time_idxs)
+        derived_arrays = None
+        for output in outputs:
+            func = self.derived_output_functions[output]
+            if is_vectorised_derived_output(func):
+                if derived_arrays is None:
+                    derived_arrays = {
+                        key: np.asarray(values)[time_idxs]
+                        for key, values in self.derived_outputs.items()
+                    }
+
+                values = np.zeros(len(self.times))
+                values[time_idxs] = func(
+                    self,
+                    np.asarray(self.times)[time_idxs],
+                    np.asarray(self.outputs)[time_idxs],
+                    derived_arrays,
                 )
+                self.derived_outputs[output] = values.tolist()
+            else:
+                self.derived_outputs[output] = [0.0] * len(self.times)
+                for ntime in time_idxs:
+                    time = self.times[ntime]
+                    self.restore_past_state(time)
+                    self.derived_outputs[output][ntime] = func(self, time)
+
+            if derived_arrays is not None:
+                derived_arrays[output] = np.asarray(self.derived_outputs[output])[time_idxs]
 
     def restore_past_state(self, time):
         """
@@ -671,47 +831,21 @@ class EpiModel:
     def find_output_transition_indices(self, output: str):
         """
         Find the transition indices that are relevant to a particular output evaluation request.
-        A flow is "Relevant" if the flow is impelemented, has a matching origin and target,
-        and something to to with "origin condition" or "to condition" which I don't understand.
+        A flow is relevant if it is implemented, its origin and target stems match the connection's,
+        and its origin and target have all the strata in the connection's "origin_condition" and "to_condition".
         Returns a list of idxs for the transition flows DataFrame.
         """
-        num_flows = len(self.transition_flows)
-        flow_idxs = []
-        for flow_idx in range(num_flows):
-            output_conn = self.output_connections[output]
-            implement = self.transition_flows_dict["implement"][flow_idx]
-            origin = self.transition_flows_dict["origin"][flow_idx]
-            target = self.transition_flows_dict["to"][flow_idx]
-            check_origin_stem = find_stem(origin) == output_conn["origin"]
-            check_target_stem = find_stem(target) == output_conn["to"]
-            check_implement = implement == len(self.all_stratifications)
-            check_origin_condition = "origin_condition" not in output_conn or (
-                "origin_condition" in output_conn
-                and all(
-                    tag in find_name_components(origin)
-                    for tag in find_name_components(output_conn["origin_condition"])
-                )
-                or output_conn["origin_condition"] == ""
-            )
-            check_target_condition = "to_condition" not in output_conn or (
-                "to_condition" in output_conn
-                and all(
-                    tag in find_name_components(target)
-                    for tag in find_name_components(output_conn["to_condition"])
-                )
-                or output_conn["to_condition"] == ""
-            )
-            is_transition_flow_for_output = (
-                check_implement
-                and check_origin_stem
-                and check_target_stem
-                and check_origin_condition
-                and check_target_condition
-            )
-            if is_transition_flow_for_output:
-                flow_idxs.append(flow_idx)
-
-        return flow_idxs
+        output_conn = self.output_connections[output]
+        origin_condition = output_conn.get("origin_condition")
+        target_condition = output_conn.get("to_condition")
+        origin_tags = set(find_name_components(origin_condition)) if origin_condition else set()
+        target_tags = set(find_name_components(target_condition)) if target_condition else set()
+        candidate_flows = self.transition_flow_index.get((output_conn["origin"], output_conn["to"]), [])
+        return [
+            flow_idx
+            for flow_idx, origin_components, target_components in candidate_flows
+            if origin_tags <= origin_components and target_tags <= target_components
+        ]
 
     def find_output_death_indices(self, _death_output):
         """
@@ -8,6 +8,7 @@ from .data_structures import (
     normalise_dict,
     order_dict_by_keys,
 )
+from .derived_outputs import is_vectorised_derived_output, vectorised_derived_output
 from .flowchart import create_flowchart
 from .stratification_funcs import (
     create_additive_function,
@@ -24,4 +25,5 @@ from .string import (
     find_name_components,
     find_stem,
     find_stratum_index_from_string,
+    get_death_output_name,
 )
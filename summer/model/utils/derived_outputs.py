@@ -0,0 +1,30 @@
+"""
+Helpers for user-defined derived output functions
+"""
+
+
+def vectorised_derived_output(func):
+    """
+    mark a derived output function as vectorised, so that it is called once for all the evaluated time points
+        rather than once per time point
+
+    a vectorised function has the signature func(model, times, outputs, derived_outputs), where
+        times is an array of the evaluated times,
+        outputs is an array of the compartment values with one row per evaluated time,
+        derived_outputs is a dict of arrays of the derived outputs already calculated, at the evaluated times,
+        and it returns an array with the output value at each evaluated time
+
+    :param func: function
+        the derived output function to be marked
+    :return: function
+        the same function
+    """
+    func.is_vectorised = True
+    return func
+
+
+def is_vectorised_derived_output(func):
+    """
+    whether a derived output function has been marked as vectorised
+    """
+    return getattr(func, "is_vectorised", False)
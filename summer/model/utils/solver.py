@@ -48,6 +48,8 @@ def solve_with_ivp(ode_func: Callable, values: List[float], times: List[float],
     This method allows us to set a stopping condition.
     """
     stopping_tolerance = solver_args.get("stopping_tolerance", 1e-60)
+    atol = solver_args.get("atol", 1e-6)
+    rtol = solver_args.get("rtol", 1e-3)
 
     def _ode_func(time, values):
         """Reverse parameters"""
@@ -59,7 +61,15 @@ def solve_with_ivp(ode_func: Callable, values: List[float], times: List[float],
 
     _get_stopping_conditions.terminal = True
     t_span = (times[0], times[-1])
-    results = solve_ivp(_ode_func, t_span, values, t_eval=times, events=_get_stopping_conditions)
+    results = solve_ivp(
+        _ode_func,
+        t_span,
+        values,
+        t_eval=times,
+        events=_get_stopping_conditions,
+        atol=atol,
+        rtol=rtol,
+    )
     return results["y"].transpose()
 
 
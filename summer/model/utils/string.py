@@ -73,6 +73,13 @@ def find_stem(stratified_string: str):
     return stratified_string.split("X")[0]
 
 
+def get_death_output_name(death_output: tuple):
+    """
+    name of the derived output that tracks infection deaths for a death output category
+    """
+    return "infection_deathsXall" if death_output == () else "infection_deathsX" + "X".join(death_output)
+
+
 def find_all_strata(stratified_string: str):
     return "X".join(find_name_components(stratified_string)[1:])
 
@@ -2,6 +2,8 @@
 Functions to validate the inputs to a model.
 Validation performed using Cerberus: https://docs.python-cerberus.org/en/stable/index.html
 """
+from contextlib import contextmanager
+
 from cerberus import Validator
 
 from summer.constants import (
@@ -12,11 +14,31 @@ from summer.constants import (
     IntegrationType,
 )
 
+# Whether model validation is skipped, see trust_model_inputs.
+_is_trusted = False
+
+
+@contextmanager
+def trust_model_inputs():
+    """
+    Skip model validation, eg. when repeatedly building models from inputs which are known to be valid.
+    """
+    global _is_trusted
+    was_trusted = _is_trusted
+    _is_trusted = True
+    try:
+        yield
+    finally:
+        _is_trusted = was_trusted
+
 
 def validate_model(model):
     """
     Throws an error if the model's initial data is invalid.
     """
+    if _is_trusted:
+        return
+
     schema = get_model_schema(model)
     validator = Validator(schema, allow_unknown=True, require_all=True)
     model_data = model.__dict__
@@ -1,5 +1,6 @@
 import os
 import logging
+import multiprocessing
 
 import luigi
 
@@ -43,6 +44,8 @@ class FullModelRunTask(utils.ParallelLoggerTask):
     chain_id = luigi.IntParameter()  # Unique chain id
     model_name = luigi.Parameter()  # The calibration to run
     burn_in = luigi.IntParameter()
+    # Worker processes for each chain, by default the CPUs are shared between the chains run at once.
+    num_workers = luigi.IntParameter(default=0)
 
     def requires(self):
         # Download task
@@ -62,9 +65,21 @@ class FullModelRunTask(utils.ParallelLoggerTask):
         with Timer(msg):
             src_db_path = os.path.join(settings.BASE_DIR, self.get_src_db_relpath())
             run_full_models_for_mcmc(
-                self.model_name, self.burn_in, src_db_path, self.get_output_db_path()
+                self.model_name,
+                self.burn_in,
+                src_db_path,
+                self.get_output_db_path(),
+                n_workers=self.get_num_workers(),
             )
 
+    def get_num_workers(self):
+        if self.num_workers:
+            return self.num_workers
+
+        # Luigi runs up to --workers chains at the same time.
+        num_concurrent_chains = luigi.interface.core().workers
+        return max(1, multiprocessing.cpu_count() // num_concurrent_chains)
+
     def get_src_db_relpath(self):
         filename = utils.get_calibration_db_filename(self.chain_id)
         return os.path.join("data", "calibration_outputs", filename)
@@ -2,9 +2,19 @@ import os
 from copy import deepcopy
 
 import pytest
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from autumn import constants
 from autumn.db import Database
-from autumn.calibration import Calibration, CalibrationMode
+from autumn.calibration import Calibration, CalibrationMode, run_full_models_for_mcmc
+from autumn.calibration.emulator import LikelihoodEmulator
+from autumn.calibration.likelihood import TargetLikelihood
 from autumn.calibration.utils import sample_starting_params_from_lhs, specify_missing_prior_params
+from autumn.tool_kit.scenarios import Scenario
+from summer.model import StratifiedModel
+from summer.constants import Compartment, Flow, BirthApproach
 
 from .utils import get_mock_model
 
@@ -153,6 +163,403 @@ def test_calibrate_autumn_mcmc(temp_data_dir):
     assert 2.9 < ice_cream_sales_mle < 3.1
 
 
+def test_calibrate_delayed_acceptance_mcmc(temp_data_dir):
+    """
+    Ensure that delayed acceptance MCMC screens out some proposals and still finds the best parameters.
+    """
+    priors = [
+        {"param_name": "ice_cream_sales", "distribution": "uniform", "distri_params": [1, 5],}
+    ]
+    target_outputs = [
+        {
+            "output_key": "shark_attacks",
+            "years": [2000, 2001, 2002, 2003, 2004],
+            "values": [3, 6, 9, 12, 15],
+            "sd": 0.5,
+        }
+    ]
+    params = {
+        "default": {"start_time": 2000},
+        "scenario_start_time": 2000,
+        "scenarios": {},
+    }
+    calib = Calibration("sharks", _build_mock_model, params, priors, target_outputs, {}, 1, 1)
+    calib.run_fitting_algorithm(
+        run_mode=CalibrationMode.DELAYED_ACCEPTANCE_MCMC, n_iterations=50, n_burned=10,
+    )
+    assert calib.screening_end_time == 2002
+    assert [t["years"] for t in calib.screening_targets] == [[2000, 2001, 2002]]
+
+    mcmc_runs = Database(calib.output_db_path).query("mcmc_run")
+    assert len(mcmc_runs) == 60
+    is_screened_out = mcmc_runs.loglikelihood.isna()
+    assert is_screened_out.any()
+    assert not mcmc_runs.accept[is_screened_out].any()
+    best_run = mcmc_runs.iloc[mcmc_runs.loglikelihood.idxmax()]
+    assert 2.9 < best_run.ice_cream_sales < 3.1
+
+
+def test_calibrate_emulated_mcmc(temp_data_dir):
+    """
+    Ensure that emulated MCMC screens out some proposals without running the model,
+    and still finds the best parameters.
+    """
+    priors = [
+        {"param_name": "ice_cream_sales", "distribution": "uniform", "distri_params": [1, 5],}
+    ]
+    target_outputs = [
+        {
+            "output_key": "shark_attacks",
+            "years": [2000, 2001, 2002, 2003, 2004],
+            "values": [3, 6, 9, 12, 15],
+            "sd": 0.5,
+        }
+    ]
+    params = {
+        "default": {"start_time": 2000},
+        "scenario_start_time": 2000,
+        "scenarios": {},
+    }
+    calib = Calibration("sharks", _build_mock_model, params, priors, target_outputs, {}, 1, 1)
+    calib.run_fitting_algorithm(run_mode=CalibrationMode.EMULATED_MCMC, n_iterations=90, n_burned=10)
+    mcmc_runs = Database(calib.output_db_path).query("mcmc_run")
+    assert len(mcmc_runs) == 100
+    is_screened_out = mcmc_runs.loglikelihood.isna()
+    assert is_screened_out.any()
+    assert len(calib.evaluated_params_ll) == (~is_screened_out).sum()
+    best_run = mcmc_runs.iloc[mcmc_runs.loglikelihood.idxmax()]
+    assert 2.9 < best_run.ice_cream_sales < 3.1
+
+
+def test_likelihood_emulator__expect_accurate_predictions():
+    """
+    Ensure that the emulator can reproduce a smooth loglikelihood surface.
+    """
+    def get_loglike(params):
+        return -((params[0] - 1) ** 2) - 3 * (params[1] + 2) ** 2
+
+    np.random.seed(0)
+    evaluated_params_ll = []
+    emulator = LikelihoodEmulator(evaluated_params_ll, [0.5, 0.5], min_points=20)
+    for _ in range(19):
+        params = list(np.random.uniform(-4, 4, 2))
+        evaluated_params_ll.append((params, get_loglike(params)))
+
+    assert emulator.predict([[1, -2]]) is None
+    for _ in range(181):
+        params = list(np.random.uniform(-4, 4, 2))
+        evaluated_params_ll.append((params, get_loglike(params)))
+
+    test_params = [[1, -2], [0, 0], [-2, 1]]
+    predictions = emulator.predict(test_params)
+    expected = [get_loglike(p) for p in test_params]
+    assert np.allclose(predictions, expected, atol=1.5)
+
+
+def test_likelihood_emulator__when_frozen__expect_same_predictions():
+    """
+    Ensure that a frozen emulator ignores parameter sets evaluated after it was frozen.
+    """
+    np.random.seed(0)
+    evaluated_params_ll = [([x], -(x ** 2)) for x in np.random.uniform(-4, 4, 30)]
+    emulator = LikelihoodEmulator(evaluated_params_ll, [0.5], min_points=20)
+    emulator.update()
+    emulator.freeze()
+    assert emulator.is_frozen and emulator.max_evaluations == 30
+    predictions = emulator.predict([[0.5], [2.0]])
+
+    evaluated_params_ll.extend([([x], 100.0) for x in np.random.uniform(-4, 4, 30)])
+    assert (emulator.predict([[0.5], [2.0]]) == predictions).all()
+    assert len(emulator.lls) == 30
+
+    # A new emulator frozen at the same point, eg. when a chain is resumed, gives the same predictions.
+    resumed_emulator = LikelihoodEmulator(evaluated_params_ll, [0.5], min_points=20)
+    resumed_emulator.freeze(30)
+    assert (resumed_emulator.predict([[0.5], [2.0]]) == predictions).all()
+
+
+def test_calibrate_least_squares__with_multiple_starts(temp_data_dir):
+    """
+    Ensure that least squares calibration finds the best parameters, and never runs a parameter set twice.
+    """
+    priors = [
+        {"param_name": "ice_cream_sales", "distribution": "uniform", "distri_params": [1, 5],}
+    ]
+    target_outputs = [
+        {
+            "output_key": "shark_attacks",
+            "years": [2000, 2001, 2002, 2003, 2004],
+            "values": [3, 6, 9, 12, 15],
+        }
+    ]
+    params = {
+        "default": {"start_time": 2000},
+        "scenario_start_time": 2000,
+        "scenarios": {},
+    }
+    calib = Calibration("sharks", _build_mock_model, params, priors, target_outputs, {}, 1, 1)
+    calib.run_fitting_algorithm(run_mode=CalibrationMode.LEAST_SQUARES, n_starts=2)
+    assert abs(calib.mle_estimates[0] - 3) < 1e-3
+
+    evaluated_params = [tuple(p) for p, _ in calib.evaluated_params_ll]
+    assert len(evaluated_params) == len(set(evaluated_params))
+    mcmc_runs = Database(calib.output_db_path).query("mcmc_run")
+    assert len(mcmc_runs) == len(evaluated_params)
+
+
+def test_calibrate_grid_based__with_refinement_and_restart(temp_data_dir):
+    """
+    Ensure that grid based calibration refines the grid around the best point,
+    and that restarting the calibration skips grid points which were already evaluated.
+    """
+    priors = [
+        {"param_name": "ice_cream_sales", "distribution": "uniform", "distri_params": [1, 5],}
+    ]
+    target_outputs = [
+        {
+            "output_key": "shark_attacks",
+            "years": [2000, 2001, 2002, 2003, 2004],
+            "values": [3, 6, 9, 12, 15],
+        }
+    ]
+    params = {
+        "default": {"start_time": 2000},
+        "scenario_start_time": 2000,
+        "scenarios": {},
+    }
+    grid_info = [{"param_name": "ice_cream_sales", "lower": 1.0, "upper": 5.0, "n": 5}]
+
+    def run_grid(n_refinements, resume=False):
+        calib = Calibration(
+            "sharks", _build_mock_model, params, priors, target_outputs, {}, 1, 1, resume=resume
+        )
+        calib.run_fitting_algorithm(
+            run_mode=CalibrationMode.GRID_BASED, grid_info=grid_info, n_refinements=n_refinements,
+        )
+        return Database(calib.output_db_path).query("mcmc_run")
+
+    mcmc_runs = run_grid(n_refinements=1)
+    # The refined grid spans 2 to 4, and 2, 3 and 4 have already been evaluated.
+    assert sorted(mcmc_runs.ice_cream_sales.tolist()) == [1.0, 2.0, 2.5, 3.0, 3.5, 4.0, 5.0]
+    assert len(set(mcmc_runs.idx)) == 7
+
+    mcmc_runs = run_grid(n_refinements=2, resume=True)
+    assert sorted(mcmc_runs.ice_cream_sales.tolist()) == [
+        1.0, 2.0, 2.5, 2.75, 3.0, 3.25, 3.5, 4.0, 5.0
+    ]
+    assert len(set(mcmc_runs.idx)) == 9
+    best_run = mcmc_runs.iloc[mcmc_runs.loglikelihood.idxmax()]
+    assert best_run.ice_cream_sales == 3.0
+
+
+def test_calibrate_parallel_tempering(temp_data_dir):
+    """
+    Ensure that parallel tempering stores the cold chain and the statistics for each temperature.
+    """
+    priors = [
+        {"param_name": "ice_cream_sales", "distribution": "uniform", "distri_params": [1, 5],}
+    ]
+    target_outputs = [
+        {
+            "output_key": "shark_attacks",
+            "years": [2000, 2001, 2002, 2003, 2004],
+            "values": [3, 6, 9, 12, 15],
+            "sd": 0.5,
+        }
+    ]
+    params = {
+        "default": {"start_time": 2000},
+        "scenario_start_time": 2000,
+        "scenarios": {},
+    }
+    calib = Calibration("sharks", _build_mock_model, params, priors, target_outputs, {}, 1, 1)
+    calib.run_fitting_algorithm(
+        run_mode=CalibrationMode.PARALLEL_TEMPERING, n_iterations=40, n_burned=10, n_chains=3,
+    )
+    out_db = Database(calib.output_db_path)
+    mcmc_runs = out_db.query("mcmc_run")
+    assert len(mcmc_runs) == 50
+    assert len(out_db.query("outputs")) == 6 * mcmc_runs.accept.sum()
+    best_run = mcmc_runs.iloc[mcmc_runs.loglikelihood.idxmax()]
+    assert 2.9 < best_run.ice_cream_sales < 3.1
+
+    tempering_df = out_db.query("mcmc_tempering")
+    assert tempering_df.temperature.tolist() == [1.0, 20.0 ** 0.5, 20.0]
+    assert tempering_df.n_swaps_proposed.sum() == 50
+    assert (tempering_df.n_accepted > 0).all()
+
+
+def test_calibrate_smc(temp_data_dir):
+    """
+    Ensure that SMC moves the particles to the posterior, and stores them as weighted MCMC runs.
+    """
+    priors = [
+        {"param_name": "ice_cream_sales", "distribution": "uniform", "distri_params": [1, 5],}
+    ]
+    target_outputs = [
+        {
+            "output_key": "shark_attacks",
+            "years": [2000, 2001, 2002, 2003, 2004],
+            "values": [3, 6, 9, 12, 15],
+            "sd": 0.5,
+        }
+    ]
+    params = {
+        "default": {"start_time": 2000},
+        "scenario_start_time": 2000,
+        "scenarios": {},
+    }
+    calib = Calibration("sharks", _build_mock_model, params, priors, target_outputs, {}, 1, 1)
+    calib.run_fitting_algorithm(run_mode=CalibrationMode.SMC, n_iterations=40)
+    out_db = Database(calib.output_db_path)
+    mcmc_runs = out_db.query("mcmc_run")
+    assert len(mcmc_runs) == 40
+    assert len(out_db.query("outputs")) == 6 * mcmc_runs.accept.sum()
+    assert 2.9 < mcmc_runs.ice_cream_sales.mean() < 3.1
+
+    stages_df = out_db.query("smc_stages")
+    assert stages_df.inverse_temperature.is_monotonic_increasing
+    assert stages_df.inverse_temperature.iloc[-1] == 1.0
+    assert (stages_df.ess >= 0.5 * 40 - 1e-6).all()
+
+
+def test_calibrate_autumn_mcmc__with_resume__expect_same_chain(temp_data_dir, monkeypatch):
+    """
+    Ensure that a chain which is stopped and then resumed from its checkpoint
+    gives the same result as a chain which is run without stopping.
+    """
+    priors = [
+        {"param_name": "ice_cream_sales", "distribution": "uniform", "distri_params": [1, 5],}
+    ]
+    target_outputs = [
+        {
+            "output_key": "shark_attacks",
+            "years": [2000, 2001, 2002, 2003, 2004],
+            "values": [3, 6, 9, 12, 15],
+            "loglikelihood_distri": "poisson",
+        }
+    ]
+    params = {
+        "default": {"start_time": 2000},
+        "scenario_start_time": 2000,
+        "scenarios": {},
+    }
+
+    def run_chain(n_iterations, resume=False):
+        calib = Calibration(
+            "sharks", _build_mock_model, params, priors, target_outputs, {}, 1, 1, resume=resume
+        )
+        calib.run_fitting_algorithm(
+            run_mode=CalibrationMode.AUTUMN_MCMC, n_iterations=n_iterations, n_burned=0
+        )
+        return calib
+
+    # Run a chain in two parts, stopping after 10 iterations.
+    run_chain(10)
+    resumed_calib = run_chain(20, resume=True)
+
+    # Run the same chain without stopping.
+    monkeypatch.setattr(constants, "OUTPUT_DATA_PATH", os.path.join(temp_data_dir, "other"))
+    full_calib = run_chain(20)
+
+    resumed_db = Database(resumed_calib.output_db_path)
+    full_db = Database(full_calib.output_db_path)
+    resumed_mcmc_df = resumed_db.query("mcmc_run")
+    full_mcmc_df = full_db.query("mcmc_run")
+    assert len(resumed_mcmc_df) == 20
+    assert resumed_mcmc_df.idx.tolist() == full_mcmc_df.idx.tolist()
+    assert resumed_mcmc_df.ice_cream_sales.tolist() == full_mcmc_df.ice_cream_sales.tolist()
+    assert resumed_mcmc_df.accept.tolist() == full_mcmc_df.accept.tolist()
+    assert len(resumed_db.query("outputs")) == len(full_db.query("outputs"))
+
+    # The chain's history is read back from the database, rather than saved in the checkpoint.
+    assert resumed_calib.mcmc_trace == full_calib.mcmc_trace
+    assert resumed_calib.evaluated_params_ll == full_calib.evaluated_params_ll
+    checkpoint = resumed_calib.load_checkpoint()
+    assert "mcmc_trace" not in checkpoint and "evaluated_params_ll" not in checkpoint
+
+    # A chain which stopped before its first checkpoint starts again, without duplicating runs.
+    os.remove(full_calib.checkpoint_path)
+    restarted_calib = run_chain(20, resume=True)
+    assert restarted_calib.output_db_path == full_calib.output_db_path
+    restarted_mcmc_df = full_db.query("mcmc_run")
+    assert restarted_mcmc_df.idx.tolist() == resumed_mcmc_df.idx.tolist()
+    assert len(full_db.query("outputs")) == len(resumed_db.query("outputs"))
+
+
+def test_run_full_models_for_mcmc__expect_all_accepted_runs_stored(temp_data_dir):
+    """
+    Ensure that the baseline and scenario models are run and stored for every accepted MCMC run,
+    when the runs are distributed across worker processes and the scenarios are run as a batch.
+    """
+    src_db_path = os.path.join(temp_data_dir, "src.db")
+    dest_db_path = os.path.join(temp_data_dir, "dest.db")
+    mcmc_run_df = pd.DataFrame(
+        {
+            "idx": [f"run_{i}" for i in range(6)],
+            "loglikelihood": [-5.0, -4.0, -3.0, -3.0, -2.0, -1.0],
+            "accept": [1, 1, 0, 1, 0, 1],
+            "contact_rate": [1.0, 2.0, 2.5, 3.0, 3.5, 4.0],
+        }
+    )
+    Database(src_db_path).dump_df("mcmc_run", mcmc_run_df)
+    params = {
+        "default": {"start_time": 2000, "contact_rate": 1.0, "recovery": 0.5},
+        "scenario_start_time": 2002,
+        "scenarios": {1: {"recovery": 1.0}, 2: {"recovery": 2.0}},
+    }
+    run_full_models_for_mcmc(1, src_db_path, dest_db_path, _build_sir_model, params, n_workers=2)
+
+    dest_db = Database(dest_db_path)
+    assert dest_db.query("mcmc_run").idx.tolist() == [f"run_{i}" for i in range(1, 6)]
+    outputs_df = dest_db.query("outputs")
+    stored_runs = sorted(set(zip(outputs_df.idx, outputs_df.Scenario)))
+    expected_runs = [(f"run_{i}", f"S_{s}") for i in [1, 3, 5] for s in range(3)]
+    assert stored_runs == expected_runs
+
+    # Expect scenario outputs to match the scenario run on its own.
+    baseline = Scenario(_build_sir_model, 0, params)
+    baseline.run(update_func=lambda ps: {**ps, "contact_rate": 3.0})
+    scenario = Scenario(_build_sir_model, 2, params)
+    scenario.run(base_model=baseline.model, update_func=lambda ps: {**ps, "contact_rate": 3.0})
+    run_df = outputs_df[(outputs_df.idx == "run_3") & (outputs_df.Scenario == "S_2")]
+    assert run_df.times.tolist() == scenario.model.times
+    assert run_df.infectious.to_numpy() == pytest.approx(scenario.model.outputs[:, 1], abs=0.5)
+
+
+def _build_sir_model(params):
+    """
+    Model building function for a simple SIR model.
+    """
+    num_times = 6 * (2005 - params["start_time"]) + 1
+    return StratifiedModel(
+        times=np.linspace(params["start_time"], 2005, num_times).tolist(),
+        compartment_types=[
+            Compartment.SUSCEPTIBLE,
+            Compartment.EARLY_INFECTIOUS,
+            Compartment.RECOVERED,
+        ],
+        initial_conditions={Compartment.EARLY_INFECTIOUS: 10},
+        parameters={"contact_rate": params["contact_rate"], "recovery": params["recovery"]},
+        requested_flows=[
+            {
+                "type": Flow.INFECTION_FREQUENCY,
+                "parameter": "contact_rate",
+                "origin": Compartment.SUSCEPTIBLE,
+                "to": Compartment.EARLY_INFECTIOUS,
+            },
+            {
+                "type": Flow.STANDARD,
+                "parameter": "recovery",
+                "origin": Compartment.EARLY_INFECTIOUS,
+                "to": Compartment.RECOVERED,
+            },
+        ],
+        birth_approach=BirthApproach.NO_BIRTH,
+        starting_population=100,
+    )
+
+
 def _build_mock_model(params):
     """
     Fake model building function where derived output "shark_attacks" 
@@ -176,3 +583,52 @@ def _build_mock_model(params):
         },
     )
     return mock_model
+
+
+@pytest.mark.parametrize("distribution", ["normal", "poisson", "negative_binomial"])
+def test_target_likelihood__expect_match_with_scipy_distributions(distribution):
+    """
+    Ensure the compiled target loglikelihood matches a point by point calculation using scipy.
+    """
+    target = {
+        "output_key": "shark_attacks",
+        "years": [2001, 2003, 2004],
+        "values": [3, 6.2, 200],
+        "time_weights": [0.2, 0.3, 0.5],
+        "sd": 2.5,
+        "loglikelihood_distri": distribution,
+    }
+    param_list = ["ice_cream_sales", "shark_attacks_dispersion_param"]
+    params = [1.5, 4.0]
+    model_times = [1999.0, 2000.0, 2001.0, 2002.0, 2003.0, 2004.0]
+    derived_outputs = {"shark_attacks": [0, 1, 2.5, 4, 7.5, 180]}
+    target_likelihood = TargetLikelihood([target], param_list)
+    ll = target_likelihood.evaluate(params, model_times, derived_outputs, {})
+
+    model_output = [2.5, 7.5, 180]
+    if distribution == "normal":
+        # The dispersion param is used as the standard deviation when calibrated.
+        point_lls = stats.norm.logpdf(target["values"], model_output, 4.0)
+        point_lls -= stats.norm.logpdf(model_output, model_output, 4.0)
+    elif distribution == "poisson":
+        point_lls = stats.poisson.logpmf(np.round(target["values"]), model_output)
+    else:
+        n = params[1]
+        p = [mu / (mu + n) for mu in model_output]
+        point_lls = stats.nbinom.logpmf(np.round(target["values"]), n, 1.0 - np.array(p))
+
+    expected_ll = sum(w * l for w, l in zip(target["time_weights"], point_lls))
+    assert abs(ll - expected_ll) < 1e-9
+
+
+def test_target_likelihood__with_missing_target_year__expect_error():
+    target = {
+        "output_key": "shark_attacks",
+        "years": [2001, 2010],
+        "values": [3, 6],
+        "time_weights": [0.5, 0.5],
+        "sd": 1.0,
+    }
+    target_likelihood = TargetLikelihood([target], ["ice_cream_sales"])
+    with pytest.raises(ValueError):
+        target_likelihood.evaluate([1.0], [2000.0, 2001.0, 2002.0], {"shark_attacks": [1, 2, 3]}, {})
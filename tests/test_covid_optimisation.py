@@ -1,5 +1,9 @@
+import os
+
 from apps.covid_19.mixing_optimisation import mixing_opti as opti
+from apps.covid_19.mixing_optimisation import sweep
 from autumn.constants import Region
+from autumn.db import Database
 from summer.model import StratifiedModel
 import pytest
 
@@ -42,3 +46,85 @@ def test_full_optimisation_iteration_for_uk():
                 DECISION_VARS[mode], root_model, mode, country, config
             )
 
+
+@pytest.mark.mixing_optimisation
+@pytest.mark.github_only
+def test_optimisation_context__expect_same_as_objective_function():
+    country = Region.UNITED_KINGDOM
+    root_model = opti.run_root_model(country, {})
+    for mode in AVAILABLE_MODES:
+        config = 2
+        decision_vars = [0.5 * v for v in DECISION_VARS[mode]]
+        context = opti.OptimisationContext(country, config, mode)
+        h, d, yoll, p_immune, _ = opti.objective_function(
+            decision_vars, root_model, mode, country, config
+        )
+        results = context.evaluate_batch([decision_vars, DECISION_VARS[mode]])
+        ctx_h, ctx_d, ctx_yoll, ctx_p_immune, _ = results[0]
+        assert ctx_h == h
+        assert ctx_d == pytest.approx(d, rel=1e-6)
+        assert ctx_yoll == pytest.approx(yoll, rel=1e-6)
+        assert ctx_p_immune == pytest.approx(p_immune, rel=1e-6)
+
+        # Expect the same result whichever other decision variables are in the batch.
+        other_results = context.evaluate_batch([decision_vars, [0.8 * v for v in decision_vars]])
+        assert other_results[0][:4] == results[0][:4]
+
+
+@pytest.mark.mixing_optimisation
+@pytest.mark.github_only
+def test_optimisation_context__expect_scenario_model_same_as_built_model():
+    """
+    Ensure that re-binding the mixing matrix of the model template gives the same model as building it
+    from the scenario params, ie. that only the mixing depends on the decision variables.
+    """
+    country = Region.UNITED_KINGDOM
+    for mode in AVAILABLE_MODES:
+        config = 2
+        decision_vars = [0.5 * v for v in DECISION_VARS[mode]]
+        context = opti.OptimisationContext(country, config, mode)
+        context_model = context.build_scenario_model(decision_vars)
+        built_model = context.build_model(context.get_scenario_params(decision_vars))
+        built_model.compartment_values = context.start_compartment_values
+        assert context_model.parameters.keys() == built_model.parameters.keys()
+        assert context_model.time_variants.keys() == built_model.time_variants.keys()
+
+        context_model.run_model()
+        built_model.run_model()
+        assert context_model.outputs == pytest.approx(built_model.outputs, rel=1e-9)
+
+
+def test_run_sweep__expect_results_saved_and_finished_tasks_skipped(temp_data_dir, monkeypatch):
+    """
+    Ensure that the sweep saves a result for each task, and skips finished tasks when it is re-run.
+    """
+
+    class MockContext:
+        def __init__(self, country, config, mode, calibrated_params, use_cache=False):
+            self.scale = calibrated_params["contact_rate"] * config
+
+        def evaluate(self, decision_variables):
+            return True, self.scale * sum(decision_variables), 2 * self.scale, 0.5, []
+
+    param_sets = [{"contact_rate": 1.0}, {"contact_rate": 2.0}, {"contact_rate": 3.0}]
+    monkeypatch.setattr(sweep, "OptimisationContext", MockContext)
+    monkeypatch.setattr(sweep, "read_list_of_param_sets_from_csv", lambda country: param_sets)
+    db_path = os.path.join(temp_data_dir, "sweep.db")
+    sweep.run_sweep(
+        db_path, modes=["by_location"], countries=[Region.UNITED_KINGDOM], configs=[2], n_workers=2
+    )
+    results_df = Database(db_path).query(sweep.SWEEP_TABLE).sort_values("param_set_idx")
+    assert results_df.param_set_idx.tolist() == [0, 1, 2]
+    assert results_df.deaths.tolist() == [6.0, 12.0, 18.0]
+
+    # Expect only the new tasks to run.
+    sweep.run_sweep(
+        db_path,
+        modes=["by_location"],
+        countries=[Region.UNITED_KINGDOM],
+        configs=[2, 3],
+        n_workers=2,
+    )
+    results_df = Database(db_path).query(sweep.SWEEP_TABLE)
+    assert len(results_df) == 6
+    assert sorted(results_df.config.tolist()) == [2, 2, 2, 3, 3, 3]
@@ -1,5 +1,10 @@
 import os
 
+import pandas as pd
+from sqlalchemy import Text
+
+from autumn.db import Database
+from autumn.db.database import TableSchema
 from autumn.inputs.database import get_input_db
 
 db = get_input_db()
@@ -35,3 +40,26 @@ def test_database__with_conditions_and_column__expect_filtered_df():
     assert len(result_df) == 1  # Number of rows
     assert len(result_df.columns) == 1  # Number of columns
     assert result_df["iso3"].iloc[0] == "ETH"
+
+
+def test_database__with_table_schemas__expect_declared_types_and_indexes(tmp_path):
+    """
+    Ensure declared column types are used when tables are created, and that declared indexes
+    are created for existing tables and columns only.
+    """
+    table_schemas = {
+        "outputs": TableSchema({"idx": Text}, [["idx", "Scenario"], ["not_a_column"]]),
+        "not_a_table": TableSchema({"idx": Text}, [["idx"]]),
+    }
+    output_db = Database(os.path.join(tmp_path, "test.db"), table_schemas)
+    df = pd.DataFrame({"idx": [None, None], "Scenario": ["S_0", "S_0"], "times": [1, 2]})
+    output_db.dump_df("outputs", df)
+    column_types = {
+        c[1]: c[2] for c in output_db.engine.execute("PRAGMA table_info(outputs)")
+    }
+    assert column_types == {"idx": "TEXT", "Scenario": "TEXT", "times": "BIGINT"}
+
+    output_db.create_indexes()
+    output_db.create_indexes()  # Creating indexes twice is a no-op.
+    assert output_db.index_names("outputs") == ["ix_outputs_idx_Scenario"]
+    assert output_db.table_names() == ["outputs"]
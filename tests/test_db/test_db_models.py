@@ -8,6 +8,7 @@ from pandas.util.testing import assert_frame_equal
 from ..utils import get_mock_model
 
 from autumn.db import Database
+from autumn.db.models import load_model_scenarios, store_run_models
 
 # from autumn.db.models import (
 #     unpivot_outputs,
@@ -507,7 +508,6 @@ def test_create_power_bi_outputs(tmp_path):
     assert_frame_equal(expected_df, table_1)
 
 
-@pytest.mark.skip("Old code, needs to be re-written")
 def test_store_and_load_models(tmp_path):
     """
     Ensure that store_run_models actually stores data in a database and that the
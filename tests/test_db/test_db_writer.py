@@ -0,0 +1,38 @@
+import os
+
+import pytest
+import pandas as pd
+
+from autumn.db import Database
+from autumn.db.writer import BackgroundWriter
+
+
+def test_background_writer__expect_all_dataframes_written_on_close(tmp_path):
+    """
+    Ensure that dataframes queued with the background writer are all written, across batches.
+    """
+    db_path = os.path.join(tmp_path, "out.db")
+    with BackgroundWriter(db_path, max_queue_size=4, batch_size=3) as writer:
+        for i in range(10):
+            writer.write("mcmc_run", pd.DataFrame({"idx": [f"run_{i}"], "loglikelihood": [-i]}))
+            writer.write("outputs", pd.DataFrame({"idx": [f"run_{i}"] * 2, "times": [0, 1]}))
+
+    db = Database(db_path)
+    mcmc_run_df = db.query("mcmc_run")
+    outputs_df = db.query("outputs")
+    assert mcmc_run_df.idx.tolist() == [f"run_{i}" for i in range(10)]
+    assert mcmc_run_df.loglikelihood.tolist() == [-i for i in range(10)]
+    assert len(outputs_df) == 20
+
+
+def test_background_writer__with_failed_write__expect_error_raised(tmp_path):
+    """
+    Ensure that errors in the background thread are surfaced to the caller.
+    """
+    db_path = os.path.join(tmp_path, "out.db")
+    writer = BackgroundWriter(db_path)
+    writer.write("mcmc_run", pd.DataFrame({"idx": ["run_0"]}))
+    writer.flush()
+    writer.write("mcmc_run", pd.DataFrame({"not_a_column": ["run_1"]}))
+    with pytest.raises(RuntimeError):
+        writer.close()
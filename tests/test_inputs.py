@@ -1,8 +1,15 @@
+import os
+import importlib.util
 from datetime import datetime
 
 import pytest
 import numpy as np
+import pandas as pd
 
+from autumn.db import Database
+from autumn.inputs import cache
+from autumn.inputs.mobility import queries as mobility_queries
+from autumn.inputs import database as input_database
 from autumn.inputs.demography.queries import downsample_quantity, downsample_rate, _get_life_expectancy
 from autumn.inputs import (
     build_input_database,
@@ -65,6 +72,38 @@ def test_get_mobility_data():
     ]
 
 
+def test_get_mobility_data__with_mock_db__expect_vectorised_lookup(monkeypatch, tmp_path):
+    """
+    Ensure mobility data is filtered from the base date, converted to day offsets and averaged
+    over Google locations, with missing values left missing.
+    """
+    db = Database(os.path.join(tmp_path, "inputs-test.db"))
+    mob_df = pd.DataFrame(
+        {
+            "iso3": ["AUS", "AUS", "AUS", "AUS", "MYS"],
+            "region": ["Victoria", "Victoria", "Victoria", None, None],
+            "date": ["2020-01-03", "2020-01-01", "2019-12-30", "2020-01-02", "2020-01-02"],
+            "workplaces": [1.1, 1.2, 1.3, 1.4, 1.5],
+            "parks": [0.9, None, 0.7, 0.6, 0.5],
+            "retail_and_recreation": [0.5, 0.8, 0.6, 0.4, 0.3],
+        }
+    )
+    db.dump_df("mobility", mob_df)
+    monkeypatch.setattr(mobility_queries, "get_input_db", lambda: db)
+    location_map = {"work": ["workplaces"], "other_locations": ["parks", "retail_and_recreation"]}
+    base_date = datetime(2020, 1, 1)
+
+    loc_mobility, days = get_mobility_data("AUS", "Victoria", base_date, location_map)
+    assert days == [0, 2]
+    assert loc_mobility["work"] == [1.2, 1.1]
+    assert np.isnan(loc_mobility["other_locations"][0])
+    assert loc_mobility["other_locations"][1] == pytest.approx(0.7)
+
+    loc_mobility, days = get_mobility_data("AUS", None, base_date, location_map)
+    assert days == [1]
+    assert loc_mobility == {"work": [1.4], "other_locations": [pytest.approx(0.5)]}
+
+
 def test_get_country_mixing_matrix():
     mixing_matrix = get_country_mixing_matrix("home", "AUS")
     eps = 1e-8 * np.ones(mixing_matrix.shape)
@@ -492,3 +531,98 @@ AUS_ALL_LOCATIONS_MIXING_MATRIX = np.array(
     ]
 )
 
+
+
+def test_cache_input__expect_results_cached_in_memory_and_on_disk(monkeypatch):
+    """
+    Ensure cached input queries are only run once per input database hash and set of arguments.
+    """
+    monkeypatch.setattr(cache, "_input_db_hash", "abc123")
+    cache._cache.clear()
+    calls = []
+
+    @cache.cache_input
+    def query(ages, iso3="AUS"):
+        calls.append((ages, iso3))
+        return {"ages": ages, "iso3": iso3}
+
+    assert query([0, 5], iso3="MYS") == {"ages": [0, 5], "iso3": "MYS"}
+    # Returned results are copies, which can be safely modified.
+    query([0, 5], iso3="MYS")["ages"].append(10)
+    assert query([0, 5], iso3="MYS") == {"ages": [0, 5], "iso3": "MYS"}
+    assert calls == [([0, 5], "MYS")]
+
+    # Different arguments are a cache miss.
+    query([0, 10], iso3="MYS")
+    assert len(calls) == 2
+
+    # Results are read back from disk when the in-process cache is cleared.
+    cache.clear_input_cache()
+    monkeypatch.setattr(cache, "_input_db_hash", "abc123")
+    assert query([0, 5], iso3="MYS") == {"ages": [0, 5], "iso3": "MYS"}
+    assert len(calls) == 2
+
+    # A new input database hash invalidates the cache.
+    cache.clear_input_cache()
+    monkeypatch.setattr(cache, "_input_db_hash", "def456")
+    query([0, 5], iso3="MYS")
+    assert len(calls) == 3
+
+    # A change to the code invalidates the cache.
+    cache.clear_input_cache()
+    monkeypatch.setattr(cache, "_input_db_hash", "def456")
+    monkeypatch.setattr(cache, "get_code_hash", lambda: "new-code")
+    query([0, 5], iso3="MYS")
+    assert len(calls) == 4
+
+
+def test_ingest_input_sources__expect_only_changed_sources_rebuilt(monkeypatch, tmp_path):
+    """
+    Ensure the input database is only updated for input sources which have changed.
+    """
+    sources = {"social_mixing": input_database.INPUT_SOURCES["social_mixing"]}
+    monkeypatch.setattr(input_database, "INPUT_SOURCES", sources)
+    hash_path = os.path.join(tmp_path, "inputs-sources.json")
+    monkeypatch.setattr(input_database, "input_sources_hash_path", hash_path)
+    db = Database(os.path.join(tmp_path, "inputs-test.db"))
+
+    input_database.ingest_input_sources(db)
+    mixing_df = db.query("social_mixing", conditions=["iso3='AUS'", "location='home'"])
+    assert len(mixing_df) == 16  # One row per age group.
+    num_rows = len(db.query("social_mixing"))
+
+    # Unchanged sources are not preprocessed again.
+    db.dump_df("social_mixing", mixing_df)
+    input_database.ingest_input_sources(db)
+    assert len(db.query("social_mixing")) == num_rows + 16
+
+    # Changed sources are preprocessed again.
+    monkeypatch.setattr(input_database, "get_source_hash", lambda name: "changed")
+    input_database.ingest_input_sources(db)
+    assert len(db.query("social_mixing")) == num_rows
+
+
+def test_get_source_hash__with_changed_preprocess_code__expect_new_hash(monkeypatch, tmp_path):
+    """
+    Ensure an input source's hash changes when the code in its preprocessing package changes.
+    """
+    package_path = os.path.join(tmp_path, "fruit")
+    os.makedirs(package_path)
+    code_path = os.path.join(package_path, "preprocess.py")
+    data_path = os.path.join(tmp_path, "fruit.csv")
+    pd.DataFrame({"name": ["apple"]}).to_csv(data_path, index=False)
+    with open(code_path, "w") as f:
+        f.write("def preprocess_fruit(country_df):\n    return {}\n")
+
+    spec = importlib.util.spec_from_file_location("fruit_preprocess", code_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    sources = {"fruit": (module.preprocess_fruit, [data_path])}
+    monkeypatch.setattr(input_database, "INPUT_SOURCES", sources)
+    source_hash = input_database.get_source_hash("fruit")
+    assert input_database.get_source_hash("fruit") == source_hash
+
+    with open(code_path, "a") as f:
+        f.write("\n# A change to the preprocessing code.\n")
+
+    assert input_database.get_source_hash("fruit") != source_hash
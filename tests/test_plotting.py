@@ -1,8 +1,12 @@
+import os
 from tempfile import TemporaryDirectory
+from unittest import mock
 
 from summer.model import StratifiedModel
 
+from autumn.db.models import load_model_scenarios, store_run_models
 from autumn.plots import plot_scenarios
+from autumn.plots.plots import plot_outputs_single
 from autumn.tool_kit import Scenario, get_integration_times
 from autumn.constants import Compartment, Stratification
 
@@ -28,6 +32,29 @@ def test_for_smoke__plot_scenarios():
         plot_scenarios(scenarios, tmp_out_dir, plot_config)
 
 
+def test_plot_outputs_single__with_loaded_model__expect_derived_outputs_plotted(tmp_path):
+    """
+    Ensure that the derived outputs of a model loaded from an output database are plotted.
+    """
+    params = {"default": {}, "scenario_start_time": 2002, "scenarios": {}}
+    scenario = Scenario(_build_model, 0, params)
+    scenario.run()
+    scenario.model.derived_outputs["incidence"] = [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+    db_path = os.path.join(tmp_path, "out.db")
+    store_run_models([scenario.model], db_path)
+    loaded_scenario = load_model_scenarios(db_path)[0]
+
+    plotter = mock.Mock()
+    axis = mock.Mock()
+    plotter.get_figure.return_value = (mock.Mock(), axis, None, None, None)
+    output_config = {"name": "incidence", "target_values": [], "target_times": []}
+    plot_outputs_single(plotter, loaded_scenario, output_config)
+    axis.plot.assert_called_once()
+    times, values = axis.plot.call_args[0]
+    assert list(times) == scenario.model.times
+    assert list(values) == [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+
+
 def _build_model(*args, **kwargs):
     pop = 1000
     model = StratifiedModel(
@@ -1,6 +1,8 @@
+import numpy as np
 from numpy import linspace
 
 from summer.model.strat_model import StratifiedModel
+from autumn.post_processing import PostProcessing
 from autumn.post_processing.processor import post_process
 from summer.constants import IntegrationType
 
@@ -17,6 +19,52 @@ def test_post_processing():
     assert generated_outputs == EXPECTED_OUTPUTS
 
 
+def test_post_processing__expect_match_with_compartment_sums():
+    """
+    Ensure that requested outputs and the PostProcessing class sum the right compartments at every time.
+    """
+    model = _get_model()
+    config = {
+        "requested_outputs": ["prevXinfectiousXamongXage_1Xage_10", "prevXinfectiousXamong"],
+        "multipliers": {"prevXinfectiousXamong": 1.0e5},
+        "collated_combos": [],
+    }
+    generated_outputs = post_process(model, config)
+    pp = PostProcessing(
+        model,
+        requested_outputs=list(generated_outputs.keys()),
+        multipliers=config["multipliers"],
+    )
+
+    names = model.compartment_names
+    outputs = model.outputs
+    is_young = np.array([bool({"age_1", "age_10"} & set(n.split("X"))) for n in names])
+    is_infectious = np.array(["infectious" in n for n in names])
+    expected_outputs = {
+        "prevXinfectiousXamongXage_1Xage_10": (
+            outputs[:, is_young & is_infectious].sum(axis=1) / outputs[:, is_young].sum(axis=1)
+        ),
+        "prevXinfectiousXamong": 1.0e5
+        * outputs[:, is_infectious].sum(axis=1)
+        / outputs.sum(axis=1),
+    }
+    for stratification, strata in model.all_stratifications.items():
+        for stratum in strata:
+            is_in_stratum = np.array([f"{stratification}_{stratum}" in n.split("X") for n in names])
+            expected_outputs[(f"distribution_of_strataX{stratification}", stratum)] = outputs[
+                :, is_in_stratum
+            ].sum(axis=1)
+
+    for key, expected in expected_outputs.items():
+        if type(key) is tuple:
+            output, stratum = key
+            assert generated_outputs[output][stratum] == pytest.approx(expected.tolist())
+            assert pp.generated_outputs[output][stratum] == pytest.approx(expected.tolist())
+        else:
+            assert generated_outputs[key] == pytest.approx(expected.tolist())
+            assert pp.generated_outputs[key] == pytest.approx(expected.tolist())
+
+
 def _get_model():
     """
     Returns a run StratifiedModel for testing.
@@ -6,7 +6,8 @@ We expect the StratifiedModel and EpiModel to work the same in these basic cases
 import pytest
 import numpy as np
 
-from summer.model import EpiModel, StratifiedModel
+from summer.model import EpiModel, StratifiedModel, run_model_batch
+from summer.model.utils import vectorised_derived_output
 from summer.constants import (
     Compartment,
     Flow,
@@ -419,9 +420,220 @@ def test_epi_model__with_complex_dynamics__expect_correct_outputs(ModelClass):
     assert (actual_output == np.array(expected_output)).all()
 
 
+@pytest.mark.parametrize("ModelClass", [EpiModel, StratifiedModel])
+def test_epi_model__with_lean_run__expect_only_requested_derived_outputs(ModelClass):
+    """
+    Ensure that a lean model run only calculates the requested derived outputs and their dependencies,
+    at the requested times, and that the full set can be calculated afterwards.
+    """
+    pop = 100
+    model = ModelClass(
+        times=_get_integration_times(2000, 2005, 1),
+        compartment_types=[Compartment.SUSCEPTIBLE, Compartment.EARLY_INFECTIOUS],
+        initial_conditions={Compartment.EARLY_INFECTIOUS: 50},
+        parameters={"infect_death": 2e-2, "infection_rate": 0.1},
+        requested_flows=[
+            {
+                "type": Flow.INFECTION_FREQUENCY,
+                "parameter": "infection_rate",
+                "origin": Compartment.SUSCEPTIBLE,
+                "to": Compartment.EARLY_INFECTIOUS,
+            },
+            {
+                "type": Flow.COMPARTMENT_DEATH,
+                "parameter": "infect_death",
+                "origin": Compartment.EARLY_INFECTIOUS,
+            },
+        ],
+        output_connections={
+            "incidence": {"origin": Compartment.SUSCEPTIBLE, "to": Compartment.EARLY_INFECTIOUS}
+        },
+        death_output_categories=((),),
+        birth_approach=BirthApproach.NO_BIRTH,
+        starting_population=pop,
+    )
+
+    def get_double_incidence(model, time):
+        return 2 * model.derived_outputs["incidence"][model.times.index(time)]
+
+    def get_total_pop(model, time):
+        return sum(model.compartment_values)
+
+    model.derived_output_functions["double_incidence"] = get_double_incidence
+    model.derived_output_functions["total_pop"] = get_total_pop
+    model.derived_output_dependencies["double_incidence"] = ["incidence"]
+    model.run_model(
+        integration_type=IntegrationType.ODE_INT,
+        derived_output_keys=["double_incidence"],
+        derived_output_times=[2001.0, 2004.0],
+    )
+    lean_outputs = model.derived_outputs
+    assert set(lean_outputs.keys()) == {"times", "incidence", "double_incidence"}
+    assert lean_outputs["incidence"][0] == 0.0
+    assert lean_outputs["incidence"][1] > 0.0
+    lean_double_incidence = list(lean_outputs["double_incidence"])
+
+    model.calculate_derived_outputs()
+    full_outputs = model.derived_outputs
+    assert set(full_outputs.keys()) == {
+        "times",
+        "incidence",
+        "infection_deathsXall",
+        "double_incidence",
+        "total_pop",
+    }
+    for idx in [1, 4]:
+        assert full_outputs["double_incidence"][idx] == lean_double_incidence[idx]
+        assert full_outputs["double_incidence"][idx] == 2 * full_outputs["incidence"][idx]
+
+
+@pytest.mark.parametrize("ModelClass", [EpiModel, StratifiedModel])
+def test_epi_model__with_vectorised_derived_output__expect_same_as_per_time(ModelClass):
+    """
+    Ensure that vectorised derived output functions give the same outputs as functions called at each time,
+    including in lean runs.
+    """
+    pop = 100
+    model = ModelClass(
+        times=_get_integration_times(2000, 2005, 1),
+        compartment_types=[Compartment.SUSCEPTIBLE, Compartment.EARLY_INFECTIOUS],
+        initial_conditions={Compartment.EARLY_INFECTIOUS: 50},
+        parameters={"infection_rate": 0.1},
+        requested_flows=[
+            {
+                "type": Flow.INFECTION_FREQUENCY,
+                "parameter": "infection_rate",
+                "origin": Compartment.SUSCEPTIBLE,
+                "to": Compartment.EARLY_INFECTIOUS,
+            },
+        ],
+        output_connections={
+            "incidence": {"origin": Compartment.SUSCEPTIBLE, "to": Compartment.EARLY_INFECTIOUS}
+        },
+        birth_approach=BirthApproach.NO_BIRTH,
+        starting_population=pop,
+    )
+
+    def get_prevalence(model, time):
+        time_idx = model.times.index(time)
+        infectious = model.compartment_values[1]
+        return infectious / sum(model.compartment_values) + model.derived_outputs["incidence"][time_idx]
+
+    @vectorised_derived_output
+    def get_prevalence_vectorised(model, times, outputs, derived_outputs):
+        return outputs[:, 1] / outputs.sum(axis=1) + derived_outputs["incidence"]
+
+    model.derived_output_functions["prevalence"] = get_prevalence
+    model.derived_output_functions["prevalence_vectorised"] = get_prevalence_vectorised
+    model.derived_output_dependencies["prevalence_vectorised"] = ["incidence"]
+    model.run_model(integration_type=IntegrationType.ODE_INT)
+    outputs = model.derived_outputs
+    assert outputs["prevalence_vectorised"] == pytest.approx(outputs["prevalence"])
+
+    model.calculate_derived_outputs(output_keys=["prevalence_vectorised"], times=[2001.0, 2004.0])
+    lean_outputs = model.derived_outputs
+    assert lean_outputs["prevalence_vectorised"][0] == 0.0
+    for idx in [1, 4]:
+        assert lean_outputs["prevalence_vectorised"][idx] == pytest.approx(outputs["prevalence"][idx])
+
+
+@pytest.mark.parametrize("ModelClass", [EpiModel, StratifiedModel])
+@pytest.mark.parametrize(
+    "integration_type",
+    [IntegrationType.EULER, IntegrationType.RUNGE_KUTTA, IntegrationType.SOLVE_IVP],
+)
+def test_epi_model__with_batch_run__expect_same_as_individual_runs(ModelClass, integration_type):
+    """
+    Ensure that models with the same structure run as a batch give the same outputs as when run individually.
+    Fixed step solvers integrate the batch together, while adaptive solvers integrate each model separately.
+    """
+    variants = [(1, 10), (2, 10), (3, 1)]
+    batch_models = [_build_batch_sir_model(ModelClass, *variant) for variant in variants]
+    run_model_batch(batch_models, integration_type, solver_args={"step_size": 0.1})
+    for variant, batch_model in zip(variants, batch_models):
+        model = _build_batch_sir_model(ModelClass, *variant)
+        model.run_model(integration_type, solver_args={"step_size": 0.1})
+        assert batch_model.outputs.shape == model.outputs.shape
+        assert batch_model.outputs == pytest.approx(model.outputs, rel=1e-9)
+        assert batch_model.derived_outputs["incidence"] == pytest.approx(
+            model.derived_outputs["incidence"], rel=1e-9
+        )
+
+
+def test_epi_model__with_adaptive_batch_run__expect_outputs_independent_of_batch():
+    """
+    Ensure that a model's outputs don't depend on the other models in its batch,
+    with an adaptive solver at its default tolerances.
+    """
+    batch_outputs = []
+    for other_variant in [(3, 1), (8, 0.01)]:
+        models = [
+            _build_batch_sir_model(EpiModel, 1, 10),
+            _build_batch_sir_model(EpiModel, *other_variant),
+        ]
+        run_model_batch(models, IntegrationType.SOLVE_IVP)
+        batch_outputs.append(models[0].outputs)
+
+    assert (batch_outputs[0] == batch_outputs[1]).all()
+
+
+def test_epi_model__with_batch_run_of_different_compartments__expect_error():
+    """
+    Ensure that models with different compartments cannot be run as a batch.
+    """
+    models = [
+        EpiModel(
+            times=_get_integration_times(2000, 2005, 1),
+            compartment_types=compartment_types,
+            initial_conditions={},
+            parameters={},
+            requested_flows=[],
+            starting_population=100,
+        )
+        for compartment_types in [
+            [Compartment.SUSCEPTIBLE, Compartment.EARLY_INFECTIOUS],
+            [Compartment.SUSCEPTIBLE, Compartment.EARLY_INFECTIOUS, Compartment.RECOVERED],
+        ]
+    ]
+    with pytest.raises(ValueError):
+        run_model_batch(models)
+
+
 def _get_integration_times(start_year: int, end_year: int, time_step: int):
     """
     Get a list of timesteps from start_year to end_year, spaced by time_step.
     """
     n_iter = int(round((end_year - start_year) / time_step)) + 1
     return np.linspace(start_year, end_year, n_iter).tolist()
+
+
+def _build_batch_sir_model(ModelClass, contact_rate, infectious):
+    return ModelClass(
+        times=_get_integration_times(2000, 2005, 1),
+        compartment_types=[
+            Compartment.SUSCEPTIBLE,
+            Compartment.EARLY_INFECTIOUS,
+            Compartment.RECOVERED,
+        ],
+        initial_conditions={Compartment.EARLY_INFECTIOUS: infectious},
+        parameters={"contact_rate": contact_rate, "recovery": 0.5},
+        requested_flows=[
+            {
+                "type": Flow.INFECTION_FREQUENCY,
+                "parameter": "contact_rate",
+                "origin": Compartment.SUSCEPTIBLE,
+                "to": Compartment.EARLY_INFECTIOUS,
+            },
+            {
+                "type": Flow.STANDARD,
+                "parameter": "recovery",
+                "origin": Compartment.EARLY_INFECTIOUS,
+                "to": Compartment.RECOVERED,
+            },
+        ],
+        output_connections={
+            "incidence": {"origin": Compartment.SUSCEPTIBLE, "to": Compartment.EARLY_INFECTIOUS}
+        },
+        birth_approach=BirthApproach.NO_BIRTH,
+        starting_population=100,
+    )
@@ -9,7 +9,7 @@ import numpy as np
 import pandas as pd
 from pandas.util.testing import assert_frame_equal
 
-from summer.model.utils.validation import ValidationException
+from summer.model.utils.validation import ValidationException, trust_model_inputs
 from summer.model import EpiModel, StratifiedModel
 from summer.constants import (
     Compartment,
@@ -246,6 +246,27 @@ def test_model_input_validation__with_bad_inputs__expect_error(ModelClass, bad_i
         ModelClass(**inputs)
 
 
+@pytest.mark.parametrize("ModelClass", [EpiModel, StratifiedModel])
+def test_model_input_validation__with_trusted_inputs__expect_no_validation(ModelClass):
+    """
+    Ensure models are not validated while their inputs are trusted.
+    """
+    inputs = {
+        "times": _get_integration_times(2000, 2005, 1),
+        "compartment_types": [Compartment.SUSCEPTIBLE, Compartment.EARLY_INFECTIOUS],
+        "initial_conditions": {Compartment.SUSCEPTIBLE: 20},
+        "parameters": {},
+        "requested_flows": [],
+        "starting_population": 100,
+        "verbose": "this should be a bool",
+    }
+    with trust_model_inputs():
+        ModelClass(**inputs)
+
+    with pytest.raises(ValidationException):
+        ModelClass(**inputs)
+
+
 def _get_integration_times(start_year: int, end_year: int, time_step: int):
     """
     Get a list of timesteps from start_year to end_year, spaced by time_step.
@@ -180,6 +180,92 @@ def test_strat_model__with_locations_and_mixing__expect_varied_transmission():
     assert (actual_output == np.array(expected_output)).all()
 
 
+def test_strat_model__with_stratified_connections__expect_incidence_by_stratum():
+    """
+    Ensure that output connections with strata conditions only sum the flows into those strata.
+    """
+    pop = 1000
+    model = StratifiedModel(
+        times=_get_integration_times(2000, 2005, 1),
+        compartment_types=[Compartment.SUSCEPTIBLE, Compartment.EARLY_INFECTIOUS],
+        initial_conditions={Compartment.EARLY_INFECTIOUS: 100},
+        parameters={"infection_rate": 0.5},
+        requested_flows=[
+            {
+                "type": Flow.INFECTION_FREQUENCY,
+                "parameter": "infection_rate",
+                "origin": Compartment.SUSCEPTIBLE,
+                "to": Compartment.EARLY_INFECTIOUS,
+            },
+        ],
+        output_connections={
+            "incidence": {"origin": Compartment.SUSCEPTIBLE, "to": Compartment.EARLY_INFECTIOUS},
+            "incidenceXage_0": {
+                "origin": Compartment.SUSCEPTIBLE,
+                "to": Compartment.EARLY_INFECTIOUS,
+                "origin_condition": "",
+                "to_condition": "age_0",
+            },
+            "incidenceXage_5": {
+                "origin": Compartment.SUSCEPTIBLE,
+                "to": Compartment.EARLY_INFECTIOUS,
+                "origin_condition": "",
+                "to_condition": "age_5",
+            },
+            "incidenceXage_5Xlocation_urban": {
+                "origin": Compartment.SUSCEPTIBLE,
+                "to": Compartment.EARLY_INFECTIOUS,
+                "origin_condition": "age_5Xlocation_urban",
+                "to_condition": "",
+            },
+        },
+        birth_approach=BirthApproach.NO_BIRTH,
+        starting_population=pop,
+    )
+    model.stratify(
+        Stratification.AGE,
+        strata_request=[0, 5],
+        compartment_types_to_stratify=[],
+        requested_proportions={},
+    )
+    model.stratify(
+        Stratification.LOCATION,
+        strata_request=["rural", "urban"],
+        compartment_types_to_stratify=[],
+        requested_proportions={"rural": 0.3, "urban": 0.7},
+    )
+    model.run_model(integration_type=IntegrationType.ODE_INT)
+
+    # Work out the expected incidence from the flows into each compartment.
+    flows = model.transition_flows
+    incidence_flow_idxs = [
+        idx
+        for idx in range(len(flows))
+        if flows.implement[idx] == len(model.all_stratifications)
+        and flows.origin[idx].startswith(Compartment.SUSCEPTIBLE)
+        and flows.to[idx].startswith(Compartment.EARLY_INFECTIOUS)
+    ]
+    assert len(incidence_flow_idxs) == 4
+    for time_idx, time in enumerate(model.times):
+        model.restore_past_state(time)
+        net_flows = {
+            flows.to[idx]: model.find_net_transition_flow(idx, time, model.compartment_values)
+            for idx in incidence_flow_idxs
+        }
+        expected_outputs = {
+            "incidence": sum(net_flows.values()),
+            "incidenceXage_0": sum(v for k, v in net_flows.items() if "Xage_0X" in k),
+            "incidenceXage_5": sum(v for k, v in net_flows.items() if "Xage_5X" in k),
+            "incidenceXage_5Xlocation_urban": net_flows[
+                f"{Compartment.EARLY_INFECTIOUS}Xage_5Xlocation_urban"
+            ],
+        }
+        for output, expected_value in expected_outputs.items():
+            assert model.derived_outputs[output][time_idx] == pytest.approx(expected_value)
+
+    assert model.derived_outputs["incidence"][1] > 0
+
+
 def _get_integration_times(start_year: int, end_year: int, time_step: int):
     """
     Get a list of timesteps from start_year to end_year, spaced by time_step.
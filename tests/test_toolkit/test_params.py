@@ -1,4 +1,4 @@
-from autumn.tool_kit.params import update_params, merge_dicts
+from autumn.tool_kit.params import update_params, merge_dicts, merge_params, materialise_params
 
 
 def test_merge_dicts__basic_merge__with_no_key():
@@ -155,3 +155,39 @@ def test_update_params__dict_in_array_request__expect_updated():
     }
     actual_new_params = update_params(old_params, update_request)
     assert actual_new_params == expected_new_params
+
+
+def test_update_params__with_nested_requests__expect_params_not_modified():
+    old_params = {
+        "foo": [{"a": 1}, {"a": 2}],
+        "bar": {"baz": 2, "boop": [7, 8, 9]},
+        "bing": {"bonk": 3},
+    }
+    update_request = {"foo(1).a": 4, "bar.boop(0)": 1, "bar.baz": 3}
+    actual_new_params = update_params(old_params, update_request)
+    assert old_params == {
+        "foo": [{"a": 1}, {"a": 2}],
+        "bar": {"baz": 2, "boop": [7, 8, 9]},
+        "bing": {"bonk": 3},
+    }
+    # Expect values which are not updated to be shared, rather than copied.
+    assert actual_new_params["bing"] is old_params["bing"]
+    assert actual_new_params["foo"][0] is old_params["foo"][0]
+
+
+def test_merge_params__nested_merge__expect_same_as_merge_dicts_without_modifying_dest():
+    base = {"mixing": {"bar": [7, 8, 9], "baz": [7, 8, 9]}, "iso3": None, "foo": {"a": 1}}
+    update = {"mixing": {"foo": [1, 2, 3], "bar": [4, 5, 6]}, "iso3": "PHL"}
+    merged = merge_params(update, base)
+    assert base == {"mixing": {"bar": [7, 8, 9], "baz": [7, 8, 9]}, "iso3": None, "foo": {"a": 1}}
+    assert merged == merge_dicts(update, base)
+    assert merged["foo"] is base["foo"]
+
+
+def test_materialise_params__expect_independent_copy():
+    params = {"foo": [{"a": 1}], "bar": {"baz": [1, 2]}, "bing": 3}
+    materialised = materialise_params(params)
+    assert materialised == params
+    materialised["foo"][0]["a"] = 2
+    materialised["bar"]["baz"].append(3)
+    assert params == {"foo": [{"a": 1}], "bar": {"baz": [1, 2]}, "bing": 3}
@@ -0,0 +1,133 @@
+import os
+
+import numpy as np
+
+from autumn.tool_kit import run_cache
+from autumn.tool_kit.scenarios import Scenario, ModelOutputs
+from summer.model import StratifiedModel
+from summer.constants import Compartment, Flow, BirthApproach
+
+PARAMS = {
+    "default": {"contact_rate": 2.0},
+    "scenario_start_time": 2002.0,
+    "scenarios": {1: {"contact_rate": 1.0}},
+}
+
+
+def test_run_cache__with_repeated_runs__expect_cached_outputs(temp_data_dir):
+    """
+    Ensure that repeated runs with the same params read the outputs from the run cache,
+    and that runs with different params are not read from the cache.
+    """
+    built_params = []
+
+    def build_model(params):
+        built_params.append(params)
+        return _build_sir_model(params)
+
+    baseline = Scenario(build_model, 0, PARAMS)
+    baseline.run(use_cache=True)
+    scenario = Scenario(build_model, 1, PARAMS)
+    scenario.run(base_model=baseline.model, use_cache=True)
+    assert len(built_params) == 2
+
+    cached_baseline = Scenario(build_model, 0, PARAMS)
+    cached_baseline.run(use_cache=True)
+    cached_scenario = Scenario(build_model, 1, PARAMS)
+    cached_scenario.run(base_model=cached_baseline.model, use_cache=True)
+    assert len(built_params) == 2
+    for model, cached_model in [
+        (baseline.model, cached_baseline.model),
+        (scenario.model, cached_scenario.model),
+    ]:
+        assert type(cached_model) is ModelOutputs
+        assert cached_model.compartment_names == model.compartment_names
+        assert cached_model.times == model.times
+        assert (cached_model.outputs == model.outputs).all()
+        assert cached_model.derived_outputs == model.derived_outputs
+
+    # Expect a new run with different params.
+    updated_baseline = Scenario(build_model, 0, PARAMS)
+    updated_baseline.run(update_func=lambda ps: {**ps, "contact_rate": 3.0}, use_cache=True)
+    assert len(built_params) == 3
+    assert built_params[-1]["contact_rate"] == 3.0
+    assert type(updated_baseline.model) is StratifiedModel
+
+
+def test_run_cache__with_full_cache__expect_least_recently_used_runs_evicted(temp_data_dir):
+    """
+    Ensure that the least recently used runs are deleted when the cache is full.
+    """
+    model = ModelOutputs(["S", "I"], [0.0, 1.0], np.ones((2, 2)), {"incidence": [0.0, 1.0]})
+    for idx, key in enumerate(["a", "b", "c"]):
+        run_cache.write_cached_run(key, model)
+        os.utime(os.path.join(run_cache.get_run_cache_dir(), f"{key}.npz"), (idx, idx))
+
+    # Use run "a", so that "b" is the least recently used.
+    assert run_cache.read_cached_run("a")["derived_outputs"] == {"incidence": [0.0, 1.0]}
+    run_bytes = os.path.getsize(os.path.join(run_cache.get_run_cache_dir(), "a.npz"))
+    run_cache.evict_cached_runs(max_bytes=2 * run_bytes)
+    assert run_cache.read_cached_run("a") is not None
+    assert run_cache.read_cached_run("b") is None
+    assert run_cache.read_cached_run("c") is not None
+
+
+def test_run_cache__with_many_writes__expect_eviction_once_enough_bytes_written(
+    temp_data_dir, monkeypatch
+):
+    """
+    Ensure that the cache is only checked for runs to evict once a fraction of its size has been written.
+    """
+    model = ModelOutputs(["S", "I"], [0.0, 1.0], np.ones((2, 2)), {"incidence": [0.0, 1.0]})
+    run_cache.write_cached_run("a", model)
+    run_bytes = os.path.getsize(os.path.join(run_cache.get_run_cache_dir(), "a.npz"))
+    monkeypatch.setattr(run_cache, "RUN_CACHE_MAX_BYTES", 2 * run_bytes)
+    monkeypatch.setattr(run_cache, "RUN_CACHE_EVICTION_FRACTION", 1.0)
+    monkeypatch.setattr(run_cache, "_bytes_since_eviction", 0)
+    for idx, key in enumerate(["b", "c"]):
+        run_cache.write_cached_run(key, model)
+        os.utime(os.path.join(run_cache.get_run_cache_dir(), f"{key}.npz"), (idx, idx))
+
+    # Nothing is evicted until more than the cache's size has been written.
+    assert len(os.listdir(run_cache.get_run_cache_dir())) == 3
+    run_cache.write_cached_run("d", model)
+    assert sorted(os.listdir(run_cache.get_run_cache_dir())) == ["a.npz", "d.npz"]
+    assert run_cache._bytes_since_eviction == 0
+
+
+def test_can_cache_runs__with_too_many_runs__expect_false(monkeypatch):
+    monkeypatch.setattr(run_cache, "RUN_CACHE_MAX_BYTES", 1000)
+    assert run_cache.can_cache_runs(10, 100)
+    assert not run_cache.can_cache_runs(11, 100)
+
+
+def _build_sir_model(params):
+    return StratifiedModel(
+        times=np.linspace(params.get("start_time", 2000), 2005, 11).tolist(),
+        compartment_types=[
+            Compartment.SUSCEPTIBLE,
+            Compartment.EARLY_INFECTIOUS,
+            Compartment.RECOVERED,
+        ],
+        initial_conditions={Compartment.EARLY_INFECTIOUS: 10},
+        parameters={"contact_rate": params["contact_rate"], "recovery": 0.5},
+        requested_flows=[
+            {
+                "type": Flow.INFECTION_FREQUENCY,
+                "parameter": "contact_rate",
+                "origin": Compartment.SUSCEPTIBLE,
+                "to": Compartment.EARLY_INFECTIOUS,
+            },
+            {
+                "type": Flow.STANDARD,
+                "parameter": "recovery",
+                "origin": Compartment.EARLY_INFECTIOUS,
+                "to": Compartment.RECOVERED,
+            },
+        ],
+        output_connections={
+            "incidence": {"origin": Compartment.SUSCEPTIBLE, "to": Compartment.EARLY_INFECTIOUS}
+        },
+        birth_approach=BirthApproach.NO_BIRTH,
+        starting_population=100,
+    )
@@ -1,3 +1,7 @@
+from unittest import mock
+
+import pytest
+
 from autumn.tool_kit import schema_builder as sb
 from typing import List, Dict
 
@@ -7,6 +11,66 @@ def test_schema_builder():
     assert cerberus_schema == EXPECTED_SCHEMA
 
 
+VALID_DATA = {
+    "region": None,
+    "translations": {"foo": "bar"},
+    "outputs_to_plot": [{"name": "incidence"}],
+    "pop_distribution_strata": ["age"],
+    "prevalence_combos": [["age", "location"]],
+    "input_function": {"start_time": 1.0, "func_names": ["foo"]},
+    "parameter_category_values": {"time": 2.0, "param_names": ["bar", "baz"]},
+}
+
+
+@pytest.mark.parametrize(
+    "bad_data",
+    [
+        {**VALID_DATA, "region": 1},
+        {**VALID_DATA, "outputs_to_plot": [{"name": "incidence"}, {"name": 2}]},
+        {**VALID_DATA, "input_function": {"start_time": 1.0}},
+        {**VALID_DATA, "translations": {"foo": 1}},
+        {**VALID_DATA, "unknown": 1.0},
+    ],
+)
+def test_validator__with_cached_valid_structure__expect_bad_data_still_invalid(bad_data):
+    validate = sb.build_validator(**INPUT_SCHEMA)
+    validate(VALID_DATA)
+    with pytest.raises(sb.ValidationException):
+        validate(bad_data)
+
+
+def test_validator__with_same_structure__expect_cerberus_run_once():
+    validate = sb.build_validator(**INPUT_SCHEMA)
+    updated_data = {
+        **VALID_DATA,
+        "region": "victoria",
+        "outputs_to_plot": [{"name": "deaths"}, {"name": "notifications"}],
+        "parameter_category_values": {"time": 3.0, "param_names": []},
+    }
+    with mock.patch.object(sb, "Validator", wraps=sb.Validator) as mock_validator:
+        validate(VALID_DATA)
+        validate(VALID_DATA)
+        assert mock_validator.call_count == 1
+        # Only the values have changed, but the region is no longer null, which is a new structure.
+        validate(updated_data)
+        assert mock_validator.call_count == 2
+        validate({**updated_data, "parameter_category_values": {"time": 4.0, "param_names": []}})
+        assert mock_validator.call_count == 2
+
+
+def test_validator__with_trusted_validation__expect_no_validation():
+    validate = sb.build_validator(**INPUT_SCHEMA)
+    with sb.trusted_validation():
+        validate({**VALID_DATA, "region": 1})
+
+    with pytest.raises(sb.ValidationException):
+        validate({**VALID_DATA, "region": 1})
+
+    with pytest.raises(sb.ValidationException):
+        with sb.trusted_validation(is_trusted=False):
+            validate({**VALID_DATA, "region": 1})
+
+
 INPUT_SCHEMA = {
     "region": sb.Nullable(str),
     "translations": sb.DictGeneric(str, str),
@@ -3,6 +3,7 @@ from unittest import mock
 
 import numpy as np
 from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
 
 
 def get_mock_model(times, outputs, derived_outputs=None):
@@ -48,10 +49,16 @@ def in_memory_db_factory():
             pass
 
         # Return an in-memory SQL Alchemy SQLite database engine.
+        # The connection is shared between threads, so that background writers see the same database.
         try:
             return databases[db_path]
         except KeyError:
-            engine = create_engine("sqlite://", echo=False)
+            engine = create_engine(
+                "sqlite://",
+                echo=False,
+                poolclass=StaticPool,
+                connect_args={"check_same_thread": False},
+            )
             databases[db_path] = engine
             return engine
 